@@ -1,31 +1,101 @@
 """文章生成 API 端點"""
 
+import hashlib
 import logging
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, status, Query
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response, status, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
-from app.models.request import ArticleGenerationRequest
+from app.models.request import ArticleGenerationRequest, BatchArticleGenerationRequest, ProviderEnum
 from app.models.response import (
     ArticleGenerationResponse,
+    BatchArticleGenerationResponse,
     ErrorResponse,
     ExamTypesResponse,
     ExamInfoResponse
 )
 from app.services.article_generator import article_generator
 from app.services.llm_service import llm_service
-from app.core.exceptions import (
-    ArticleGeneratorException,
-    ValidationError,
-    ExamTypeNotSupportedError,
-    LLMServiceError
-)
+from app.services.template_service import template_service
+from app.core.exceptions import ArticleGenerationError, ArticleGeneratorException
 
 logger = logging.getLogger(__name__)
 
 # 創建路由器
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 啟動後不會變動的資料，於載入時計算一次供高頻端點直接使用
+_CACHED_EXAM_TYPES = article_generator.get_supported_exam_types()
+_CACHED_PROVIDERS = llm_service.get_available_providers()
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "service": "文章生成服務",
+    "version": "0.2.0",
+    "supported_exam_types": _CACHED_EXAM_TYPES,
+    "available_providers": _CACHED_PROVIDERS,
+    "features": [
+        "多考試類型支援 (TOEIC, GRE, IELTS, SAT)",
+        "多 LLM 提供商支援 (OpenAI, Gemini)",
+        "動態模板系統",
+        "可配置段落數和字數",
+        "自訂寫作風格和重點"
+    ]
+})
+
+
+# 靜態端點的快取標頭，內容只會在重新部署後改變
+_STATIC_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _static_payload(data: Any) -> Tuple[bytes, str]:
+    """序列化靜態回應內容並計算對應的強 ETag"""
+    content = orjson.dumps(data)
+    return content, f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+def _static_response(request: Request, payload: Tuple[bytes, str]) -> Response:
+    """回傳靜態內容，客戶端 If-None-Match 命中時回傳 304"""
+    content, etag = payload
+    headers = {"ETag": etag, "Cache-Control": _STATIC_CACHE_CONTROL}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or etag in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _build_exam_info(exam_type: str) -> Dict[str, Any]:
+    """建立考試類型詳細資訊的回應內容"""
+    exam_info = article_generator.get_exam_info(exam_type)
+    return ExamInfoResponse(
+        exam_type=exam_info["name"],
+        full_name=exam_info["full_name"],
+        description=exam_info["description"],
+        supported_difficulties=exam_info["supported_difficulties"],
+        writing_styles=exam_info["writing_styles"],
+        common_topics=exam_info["common_topics"]
+    ).model_dump()
+
+
+# 預先序列化的靜態 GET 回應 (內容, ETag)
+_PROVIDERS_PAYLOAD = _static_payload({
+    "available_providers": _CACHED_PROVIDERS,
+    "provider_info": llm_service.get_provider_info(),
+    "default_provider": getattr(llm_service, 'default_provider', 'openai')
+})
+_EXAM_TYPES_PAYLOAD = _static_payload(ExamTypesResponse(exam_types=_CACHED_EXAM_TYPES).model_dump())
+_EXAM_INFO_PAYLOADS = {
+    exam_type: _static_payload(_build_exam_info(exam_type)) for exam_type in _CACHED_EXAM_TYPES
+}
+_TEMPLATES_PAYLOAD = _static_payload({
+    "available_templates": template_service.get_available_templates(),
+    "supported_exam_types": _CACHED_EXAM_TYPES
+})
 
 
 @router.post(
@@ -40,8 +110,8 @@ router = APIRouter()
 )
 async def generate_article(
     request: ArticleGenerationRequest,
-    provider: str = Query(None, description="LLM 提供商 (openai, gemini)")
-) -> ArticleGenerationResponse:
+    provider: Optional[ProviderEnum] = Query(None, description="LLM 提供商 (openai, gemini)")
+) -> ORJSONResponse:
     """
     生成文章的主要 API 端點
     
@@ -50,80 +120,157 @@ async def generate_article(
         provider: 指定的 LLM 提供商
         
     Returns:
-        ArticleGenerationResponse: 包含生成文章的回應
+        ORJSONResponse: 符合 ArticleGenerationResponse 結構的回應
         
     Raises:
-        HTTPException: 當參數驗證失敗或生成過程出錯時
+        ArticleGeneratorException: 當參數驗證失敗或生成過程出錯時，交由全域異常處理器處理
     """
-    try:
-        logger.info(f"收到文章生成請求: {request.exam_type} - {request.topic} (Provider: {provider})")
-        
-        # 調用文章生成服務
-        result = await article_generator.generate_article(
-            exam_type=request.exam_type,
-            topic=request.topic,
-            difficulty=request.difficulty,
-            word_count=request.word_count,
-            paragraph_count=getattr(request, 'paragraph_count', 3),
-            style=request.style,
-            focus_points=request.focus_points,
-            provider=provider
-        )
-        
-        return ArticleGenerationResponse(**result)
+    provider_name = provider.value if provider else None
+    logger.info("收到文章生成請求: %s - %s (Provider: %s)", request.exam_type, request.topic, provider_name)
+    
+    # 快取查詢與業務異常分別由文章生成服務與全域異常處理器負責
+    result = await article_generator.generate_article(**request.model_dump(), provider=provider_name)
+    
+    # 服務回傳的 dict 已符合 ArticleGenerationResponse 結構，直接以 orjson 序列化，
+    # 略過模型建構與 response_model 的重複驗證；response_model 仍用於 OpenAPI 文件
+    return ORJSONResponse(result)
+
+
+def _batch_error(error: Exception) -> Dict[str, Any]:
+    """將批量生成中單篇的失敗轉為與全域異常處理器相同的錯誤格式"""
+    if not isinstance(error, ArticleGeneratorException):
+        error = ArticleGenerationError(f"文章生成失敗: {str(error)}")
+    return {
+        "success": False,
+        "error": {
+            "code": error.error_code,
+            "message": error.user_message,
+            "details": error.details
+        }
+    }
+
+
+@router.post(
+    "/articles/batch",
+    response_model=BatchArticleGenerationResponse,
+    responses={
+        422: {"model": ErrorResponse}
+    },
+    summary="批量生成文章",
+    description="併發生成多篇文章，單篇失敗不影響其他文章"
+)
+async def generate_articles_batch(
+    request: BatchArticleGenerationRequest,
+    provider: Optional[ProviderEnum] = Query(None, description="LLM 提供商 (openai, gemini)")
+) -> ORJSONResponse:
+    """
+    批量生成文章的 API 端點
+    
+    各篇文章以有上限的併發數同時生成，結果依請求順序返回；
+    失敗的項目以 `{"success": false, "error": {...}}` 表示。
+    
+    Args:
+        request: 批量文章生成請求
+        provider: 指定的 LLM 提供商，套用於所有文章
         
-    except ValidationError as e:
-        logger.warning(f"參數驗證失敗: {e.message}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "error": "參數驗證錯誤",
-                "message": e.message,
-                "details": e.details
-            }
-        )
+    Returns:
+        ORJSONResponse: 符合 BatchArticleGenerationResponse 結構的回應
+    """
+    provider_name = provider.value if provider else None
+    logger.info("收到批量文章生成請求，共 %d 篇 (Provider: %s)", len(request.requests), provider_name)
     
-    except ExamTypeNotSupportedError as e:
-        logger.warning(f"不支援的考試類型: {e.message}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "error": "不支援的考試類型",
-                "message": e.message,
-                "details": e.details
-            }
-        )
+    outcomes = await article_generator.generate_many([
+        {**item.model_dump(), "provider": provider_name} for item in request.requests
+    ])
+    results = [
+        _batch_error(outcome) if isinstance(outcome, Exception) else outcome
+        for outcome in outcomes
+    ]
     
-    except LLMServiceError as e:
-        logger.error(f"LLM 服務錯誤: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "LLM 服務錯誤",
-                "message": str(e)
-            }
-        )
+    return ORJSONResponse({
+        "total": len(results),
+        "succeeded": sum(1 for result in results if result["success"]),
+        "results": results
+    })
+
+
+def _sse_event(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    """將資料編碼為一個 Server-Sent Events 事件"""
+    payload = b"data: " + orjson.dumps(data) + b"\n\n"
+    if event:
+        return b"event: " + event.encode() + b"\n" + payload
+    return payload
+
+
+async def _sse_generator(tokens: AsyncIterator[str], usage: Dict[str, int]) -> AsyncIterator[bytes]:
+    """
+    將文章片段轉換為 SSE 事件，串流途中的錯誤以 error 事件通知客戶端
     
+    字數隨片段累計，不保留完整文章；完成時附上 token 用量與實際字數。
+    """
+    word_count = 0
+    in_word = False
+    try:
+        async for token in tokens:
+            if token:
+                word_count += len(token.split())
+                # 片段從單字中間切開時，前後兩段屬於同一個字
+                if in_word and not token[0].isspace():
+                    word_count -= 1
+                in_word = not token[-1].isspace()
+            yield _sse_event({"token": token})
     except ArticleGeneratorException as e:
-        logger.error(f"文章生成錯誤: {e.message}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "文章生成失敗",
-                "message": e.message,
-                "details": e.details
-            }
+        logger.error("串流生成失敗: %s", e.message)
+        yield _sse_event(
+            {"code": e.error_code, "message": e.user_message, "details": e.details},
+            event="error"
         )
+        return
+    yield _sse_event({"usage": usage, "actual_word_count": word_count}, event="done")
+
+
+@router.post(
+    "/generate/stream",
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    },
+    summary="串流生成文章",
+    description="以 Server-Sent Events 逐段回傳生成中的文章，縮短首個片段的等待時間"
+)
+async def generate_article_stream(
+    request: ArticleGenerationRequest,
+    provider: Optional[ProviderEnum] = Query(None, description="LLM 提供商 (openai, gemini)")
+) -> StreamingResponse:
+    """
+    串流生成文章的 API 端點
     
-    except Exception as e:
-        logger.error(f"未預期的錯誤: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "伺服器內部錯誤",
-                "message": "發生未預期的錯誤，請稍後再試"
-            }
-        )
+    每個 `data:` 事件包含一段文章內容 `{"token": ...}`，
+    完成時送出 `event: done`（含 token 用量與實際字數 `{"usage": ..., "actual_word_count": ...}`），
+    串流途中失敗時送出 `event: error`。
+    
+    Args:
+        request: 文章生成請求
+        provider: 指定的 LLM 提供商
+        
+    Returns:
+        StreamingResponse: text/event-stream 串流回應
+    """
+    provider_name = provider.value if provider else None
+    logger.info("收到串流文章生成請求: %s - %s (Provider: %s)", request.exam_type, request.topic, provider_name)
+    
+    # 參數驗證、提供商選擇與限流在回應開始前完成，錯誤仍以一般錯誤回應返回
+    usage: Dict[str, int] = {}
+    tokens = await article_generator.generate_article_stream(
+        **request.model_dump(), provider=provider_name, usage=usage
+    )
+    
+    return StreamingResponse(
+        _sse_generator(tokens, usage),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get(
@@ -131,28 +278,14 @@ async def generate_article(
     summary="獲取可用的 LLM 提供商",
     description="返回所有可用的 LLM 提供商列表和詳細信息"
 )
-async def get_providers() -> Dict[str, Any]:
+async def get_providers(request: Request) -> Response:
     """
     獲取所有可用的 LLM 提供商
     
     Returns:
-        Dict: 包含提供商列表和詳細信息的回應
+        Response: 包含提供商列表和詳細信息的回應
     """
-    try:
-        return {
-            "available_providers": llm_service.get_available_providers(),
-            "provider_info": llm_service.get_provider_info(),
-            "default_provider": getattr(llm_service, 'default_provider', 'openai')
-        }
-    except Exception as e:
-        logger.error(f"獲取提供商列表失敗: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "伺服器內部錯誤",
-                "message": "無法獲取提供商列表"
-            }
-        )
+    return _static_response(request, _PROVIDERS_PAYLOAD)
 
 
 @router.get(
@@ -161,26 +294,14 @@ async def get_providers() -> Dict[str, Any]:
     summary="獲取支援的考試類型",
     description="返回所有支援的考試類型列表"
 )
-async def get_exam_types() -> ExamTypesResponse:
+async def get_exam_types(request: Request) -> Response:
     """
     獲取所有支援的考試類型
     
     Returns:
-        ExamTypesResponse: 包含考試類型列表的回應
+        Response: 包含考試類型列表的回應
     """
-    try:
-        exam_types = article_generator.get_supported_exam_types()
-        return ExamTypesResponse(exam_types=exam_types)
-    
-    except Exception as e:
-        logger.error(f"獲取考試類型列表失敗: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "伺服器內部錯誤",
-                "message": "無法獲取考試類型列表"
-            }
-        )
+    return _static_response(request, _EXAM_TYPES_PAYLOAD)
 
 
 @router.get(
@@ -192,7 +313,7 @@ async def get_exam_types() -> ExamTypesResponse:
     summary="獲取考試類型詳細資訊",
     description="返回指定考試類型的詳細資訊"
 )
-async def get_exam_info(exam_type: str) -> ExamInfoResponse:
+async def get_exam_info(exam_type: str, request: Request) -> Response:
     """
     獲取指定考試類型的詳細資訊
     
@@ -200,44 +321,24 @@ async def get_exam_info(exam_type: str) -> ExamInfoResponse:
         exam_type: 考試類型名稱
         
     Returns:
-        ExamInfoResponse: 包含考試詳細資訊的回應
+        Response: 預先序列化的考試詳細資訊
         
     Raises:
         HTTPException: 當考試類型不存在時
     """
-    try:
-        exam_type = exam_type.upper().strip()
-        exam_info = article_generator.get_exam_info(exam_type)
-        
-        return ExamInfoResponse(
-            exam_type=exam_info["name"],
-            full_name=exam_info["full_name"],
-            description=exam_info["description"],
-            supported_difficulties=exam_info["supported_difficulties"],
-            writing_styles=exam_info["writing_styles"],
-            common_topics=exam_info["common_topics"]
-        )
-    
-    except ExamTypeNotSupportedError as e:
-        logger.warning(f"查詢不存在的考試類型: {exam_type}")
+    exam_type = exam_type.upper().strip()
+    payload = _EXAM_INFO_PAYLOADS.get(exam_type)
+    if payload is None:
+        logger.warning("查詢不存在的考試類型: %s", exam_type)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
                 "error": "不支援的考試類型",
-                "message": e.message,
-                "details": e.details
-            }
-        )
-    
-    except Exception as e:
-        logger.error(f"獲取考試資訊失敗: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "伺服器內部錯誤",
-                "message": "無法獲取考試資訊"
+                "message": f"不支援的考試類型: {exam_type}",
+                "details": {"supported_types": _CACHED_EXAM_TYPES}
             }
         )
+    return _static_response(request, payload)
 
 
 @router.get(
@@ -245,28 +346,14 @@ async def get_exam_info(exam_type: str) -> ExamInfoResponse:
     summary="獲取可用的模板配置",
     description="返回所有可用的考試類型模板配置"
 )
-async def get_templates() -> Dict[str, Any]:
+async def get_templates(request: Request) -> Response:
     """
     獲取所有可用的模板配置
     
     Returns:
-        Dict: 包含模板配置的回應
+        Response: 包含模板配置的回應
     """
-    try:
-        from app.services.template_service import template_service
-        return {
-            "available_templates": template_service.get_available_templates(),
-            "supported_exam_types": article_generator.get_supported_exam_types()
-        }
-    except Exception as e:
-        logger.error(f"獲取模板配置失敗: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "伺服器內部錯誤",
-                "message": "無法獲取模板配置"
-            }
-        )
+    return _static_response(request, _TEMPLATES_PAYLOAD)
 
 
 @router.get(
@@ -274,24 +361,11 @@ async def get_templates() -> Dict[str, Any]:
     summary="健康檢查",
     description="檢查文章生成服務的健康狀態"
 )
-async def health_check() -> Dict[str, Any]:
+async def health_check() -> Response:
     """
     健康檢查端點
     
     Returns:
-        Dict: 包含服務狀態的回應
+        Response: 預先序列化的服務狀態
     """
-    return {
-        "status": "healthy",
-        "service": "文章生成服務",
-        "version": "0.2.0",
-        "supported_exam_types": article_generator.get_supported_exam_types(),
-        "available_providers": llm_service.get_available_providers(),
-        "features": [
-            "多考試類型支援 (TOEIC, GRE, IELTS, SAT)",
-            "多 LLM 提供商支援 (OpenAI, Gemini)",
-            "動態模板系統",
-            "可配置段落數和字數",
-            "自訂寫作風格和重點"
-        ]
-    }
\ No newline at end of file
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
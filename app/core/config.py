@@ -1,8 +1,8 @@
 """應用程式配置管理"""
 
-from typing import Optional
+from typing import List, Optional
 from pydantic import Field
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -14,7 +14,7 @@ class Settings(BaseSettings):
     
     # Gemini API 設定
     gemini_api_key: Optional[str] = Field(default=None, description="Gemini API 金鑰")
-    gemini_model: str = Field(default="gemini-2.5-flesh", description="使用的 Gemini 模型")
+    gemini_model: str = Field(default="gemini-2.5-flash", description="使用的 Gemini 模型")
     
     # LLM 提供商設定
     default_llm_provider: str = Field(default="openai", description="預設 LLM 提供商")
@@ -24,26 +24,65 @@ class Settings(BaseSettings):
     app_version: str = Field(default="0.2.0", description="應用程式版本")
     debug: bool = Field(default=False, description="是否為除錯模式")
     log_level: str = Field(default="INFO", description="日誌級別")
+    access_log: bool = Field(default=False, description="是否輸出 Uvicorn 每個請求的存取日誌（除錯模式下固定開啟）")
     
     # API 設定
     api_host: str = Field(default="0.0.0.0", description="API 主機位址")
     api_port: int = Field(default=8000, description="API 端口")
+    workers: int = Field(default=1, description="Uvicorn worker 進程數（除錯模式下固定為 1）")
+    cors_origins: List[str] = Field(
+        default=["http://localhost:3000"],
+        description="允許跨來源請求的來源列表（環境變數以 JSON 陣列設定）"
+    )
     
     # 文章生成設定
     max_article_length: int = Field(default=2000, description="文章最大長度")
     default_language: str = Field(default="zh-TW", description="預設語言")
     generation_timeout: int = Field(default=30, description="生成超時時間（秒）")
+    generation_temperature: float = Field(default=0.7, description="文章生成的 temperature（設為 0 時可命中 LLM 回應快取）")
     
     # 效能設定
     max_concurrent_requests: int = Field(default=50, description="最大併發請求數")
     request_timeout: int = Field(default=15, description="請求超時時間（秒）")
     max_retries: int = Field(default=3, description="最大重試次數")
     retry_delay: float = Field(default=1.0, description="重試延遲時間（秒）")
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    llm_requests_per_minute: int = Field(default=0, description="LLM 每分鐘請求數上限（0 表示不限制）")
+    llm_tokens_per_minute: int = Field(default=0, description="LLM 每分鐘 token 數上限（0 表示不限制）")
+    circuit_breaker_threshold: int = Field(default=5, description="提供商連續失敗幾次後開啟斷路器（0 表示停用）")
+    circuit_breaker_reset_timeout: float = Field(default=30.0, description="斷路器開啟後多久放行探測請求（秒）")
+    bulk_max_concurrency: int = Field(default=10, description="批量生成文章的最大併發數")
+
+    # HTTP 連線池設定
+    http_max_connections: int = Field(default=256, description="LLM HTTP 連線池最大連線數")
+    http_max_keepalive_connections: int = Field(default=128, description="LLM HTTP 連線池保持的閒置連線數")
+    http_keepalive_expiry: float = Field(default=300.0, description="閒置連線保持時間（秒）")
+    http_connect_timeout: float = Field(default=5.0, description="建立連線的超時時間（秒）")
+    http2_enabled: bool = Field(default=False, description="是否啟用 HTTP/2（需安裝 h2 套件）")
+    warmup_enabled: bool = Field(default=True, description="啟動時是否預熱 LLM 提供商連線")
+
+    # 快取設定
+    cache_enabled: bool = Field(default=True, description="是否啟用文章生成結果快取")
+    cache_ttl: int = Field(default=3600, description="快取存活時間（秒）")
+    cache_max_entries: int = Field(default=1024, description="快取最大項目數")
+    semantic_cache_threshold: float = Field(
+        default=1.0,
+        description="詞頻語意快取的相似度門檻（預設停用；詞頻比對不考慮詞序與否定，設為 1 以上停用）"
+    )
+    embedding_cache_enabled: bool = Field(default=False, description="快取未命中時是否以 OpenAI 嵌入向量比對同義主題")
+    embedding_model: str = Field(default="text-embedding-3-small", description="語意快取使用的 OpenAI 嵌入模型")
+    embedding_cache_threshold: float = Field(default=0.92, description="嵌入向量快取的相似度門檻（設為 1 以上停用）")
+    llm_cache_max_entries: int = Field(default=512, description="LLM 回應快取最大項目數（僅快取 temperature 為 0 的請求）")
+
+    # 微批次設定
+    batching_enabled: bool = Field(default=False, description="是否啟用 LLM 請求微批次排程")
+    batch_window_ms: int = Field(default=20, description="微批次收集窗口（毫秒）")
+    batch_max_size: int = Field(default=16, description="單一批次最大請求數")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False
+    )
 
 
 # 全域設定實例
@@ -0,0 +1,30 @@
+"""考試配置載入"""
+
+from functools import cache
+from pathlib import Path
+from typing import Any, Dict, Union
+
+import orjson
+
+from app.core.exceptions import ValidationError
+
+
+# 考試配置文件位置，以專案根目錄為基準，不受工作目錄影響
+EXAM_CONFIG_PATH = Path(__file__).resolve().parents[2] / "configs" / "exam_configs.json"
+
+
+def load_exam_configs(path: Union[str, Path] = EXAM_CONFIG_PATH) -> Dict[str, Any]:
+    """讀取並解析考試配置文件"""
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        raise ValidationError(f"考試配置文件不存在: {path}")
+    except orjson.JSONDecodeError as e:
+        raise ValidationError(f"考試配置文件格式錯誤: {str(e)}")
+
+
+@cache
+def get_exam_configs() -> Dict[str, Any]:
+    """取得共用的考試配置，整個進程只讀取一次；返回的字典不可修改"""
+    return load_exam_configs()
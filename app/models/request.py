@@ -1,16 +1,32 @@
 """請求數據模型"""
 
+from enum import Enum
 from typing import List, Optional
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+# 支援的考試類型（模組層級預先計算，避免每次驗證重建）
+_ALLOWED_EXAM_TYPES = frozenset(("TOEIC", "GRE", "IELTS", "SAT"))
+_ALLOWED_EXAM_TYPES_MSG = "考試類型必須是以下之一: TOEIC, GRE, IELTS, SAT"
+
+
+class ProviderEnum(str, Enum):
+    """支援的 LLM 提供商"""
+    
+    openai = "openai"
+    gemini = "gemini"
 
 
 class ArticleGenerationRequest(BaseModel):
     """文章生成請求模型"""
     
+    # 字串前後空白由 pydantic-core 直接去除，不需逐欄位的 Python 驗證器
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     exam_type: str = Field(
         ...,
         description="考試類型（支援：TOEIC、GRE、IELTS、SAT）",
-        example="TOEIC"
+        examples=["TOEIC"]
     )
     
     topic: str = Field(
@@ -18,13 +34,13 @@ class ArticleGenerationRequest(BaseModel):
         min_length=2,
         max_length=100,
         description="文章主題",
-        example="Business Meetings"
+        examples=["Business Meetings"]
     )
     
     difficulty: str = Field(
         ...,
         description="難度等級（依考試類型而異）",
-        example="中級"
+        examples=["中級"]
     )
     
     word_count: Optional[int] = Field(
@@ -32,58 +48,53 @@ class ArticleGenerationRequest(BaseModel):
         ge=50,
         le=600,
         description="目標字數（可選，會使用預設值）",
-        example=200
+        examples=[200]
     )
     
-    paragraph_count: Optional[int] = Field(
-        None,
+    paragraph_count: int = Field(
+        3,
         ge=1,
         le=10,
         description="段落數（可選，預設為3）",
-        example=3
+        examples=[3]
     )
     
     style: Optional[str] = Field(
         None,
         description="寫作風格（可選）",
-        example="正式商業"
+        examples=["正式商業"]
     )
     
     focus_points: Optional[List[str]] = Field(
         None,
         description="重點內容（可選）",
-        example=["team collaboration", "communication skills"]
+        examples=[["team collaboration", "communication skills"]]
     )
     
-    @validator("exam_type")
-    def validate_exam_type(cls, v):
+    @field_validator("exam_type")
+    @classmethod
+    def validate_exam_type(cls, v: str) -> str:
         """驗證考試類型格式"""
-        allowed_types = ["TOEIC", "GRE", "IELTS", "SAT"]
-        v_upper = v.upper().strip()
-        if v_upper not in allowed_types:
-            raise ValueError(f"考試類型必須是以下之一: {', '.join(allowed_types)}")
+        v_upper = v.upper()
+        if v_upper not in _ALLOWED_EXAM_TYPES:
+            raise ValueError(_ALLOWED_EXAM_TYPES_MSG)
         return v_upper
     
-    @validator("topic")
-    def validate_topic(cls, v):
-        """驗證主題格式"""
-        return v.strip()
-    
-    @validator("difficulty")
-    def validate_difficulty(cls, v):
-        """驗證難度格式"""
-        return v.strip()
-    
-    @validator("style")
-    def validate_style(cls, v):
-        """驗證風格格式"""
+    @field_validator("focus_points")
+    @classmethod
+    def validate_focus_points(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """驗證重點內容格式"""
         if v is not None:
-            return v.strip()
+            return [point for point in v if point]
         return v
+
+
+class BatchArticleGenerationRequest(BaseModel):
+    """批量文章生成請求模型"""
     
-    @validator("focus_points")
-    def validate_focus_points(cls, v):
-        """驗證重點內容格式"""
-        if v is not None:
-            return [point.strip() for point in v if point.strip()]
-        return v
\ No newline at end of file
+    requests: List[ArticleGenerationRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="文章生成請求列表（1-50 篇）"
+    )
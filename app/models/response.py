@@ -24,8 +24,27 @@ class ArticleGenerationResponse(BaseModel):
     )
     
     timestamp: datetime = Field(
-        default_factory=datetime.now,
-        description="生成時間"
+        ...,
+        description="生成時間（由文章生成服務提供）"
+    )
+
+
+class BatchArticleGenerationResponse(BaseModel):
+    """批量文章生成回應模型"""
+    
+    total: int = Field(
+        ...,
+        description="請求的文章數"
+    )
+    
+    succeeded: int = Field(
+        ...,
+        description="成功生成的文章數"
+    )
+    
+    results: List[Dict[str, Any]] = Field(
+        ...,
+        description="依請求順序排列的結果，成功項目同 ArticleGenerationResponse，失敗項目含 error"
     )
 
 
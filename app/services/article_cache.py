@@ -0,0 +1,212 @@
+"""文章生成結果快取"""
+
+import hashlib
+import logging
+import math
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _text_vector(text: str) -> Dict[str, float]:
+    """將文字轉為正規化後的詞頻向量"""
+    counts = Counter(token.lower() for token in _TOKEN_RE.findall(text))
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    if not norm:
+        return {}
+    return {token: v / norm for token, v in counts.items()}
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """計算兩個正規化向量的餘弦相似度"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(token, 0.0) for token, v in a.items())
+
+
+def _normalize(embedding: Sequence[float]) -> Tuple[float, ...]:
+    """將嵌入向量正規化為單位向量，比對時只需內積"""
+    norm = math.sqrt(math.fsum(v * v for v in embedding))
+    if not norm:
+        return ()
+    return tuple(v / norm for v in embedding)
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    """計算兩個單位向量的內積（即餘弦相似度）"""
+    return math.sumprod(a, b) if len(a) == len(b) else 0.0
+
+
+class ArticleCache:
+    """
+    文章生成結果的快取：精確比對 LRU + 主題語意相似比對
+
+    詞頻向量比對不考慮詞序與否定（"Cats are better than dogs" 與 "Dogs are better than cats"
+    相似度為 1），可能返回主題相反的文章，因此預設停用；呼叫端另外提供嵌入向量時，可再以
+    get_by_embedding 比對同義但用詞不同的主題（例如 "remote work" 與 "working from home"）。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: int = 3600,
+        semantic_threshold: float = 1.0,
+        embedding_threshold: float = 0.92
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.embedding_threshold = embedding_threshold
+        # key -> (過期時間, 回應)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # 分區 -> [(key, 文字向量)]，分區內只有主題相關欄位不同
+        self._vectors: Dict[str, List[Tuple[str, Dict[str, float]]]] = {}
+        # 分區 -> [(key, 正規化嵌入向量)]，僅包含寫入時有提供嵌入向量的項目
+        self._embeddings: Dict[str, List[Tuple[str, Tuple[float, ...]]]] = {}
+
+    @staticmethod
+    def build_key(params: Dict[str, Any]) -> str:
+        """由請求參數建立穩定的快取鍵"""
+        payload = orjson.dumps(params, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    @staticmethod
+    def _partition(params: Dict[str, Any]) -> str:
+        """語意比對的分區：除主題、風格與重點外的參數都必須完全相同"""
+        return ArticleCache.build_key({
+            k: v for k, v in params.items()
+            if k not in ("topic", "style", "focus_points")
+        })
+
+    @staticmethod
+    def semantic_text(params: Dict[str, Any]) -> str:
+        """組合用於語意比對的文字，也是計算嵌入向量的輸入"""
+        return " ".join([
+            params.get("topic") or "",
+            params.get("style") or "",
+            " ".join(params.get("focus_points") or [])
+        ])
+
+    def get(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """查詢快取，先精確比對，再以語意相似度比對"""
+        key = self.build_key(params)
+        cached = self._get_entry(key)
+        if cached is not None:
+            logger.info("文章快取命中 (精確比對)")
+            return cached
+
+        if self.semantic_threshold >= 1:
+            return None
+
+        vector = _text_vector(self.semantic_text(params))
+        best_key, best_score = None, 0.0
+        for candidate_key, candidate_vector in self._vectors.get(self._partition(params), []):
+            score = _cosine(vector, candidate_vector)
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+
+        if best_key is not None and best_score >= self.semantic_threshold:
+            cached = self._get_entry(best_key)
+            if cached is not None:
+                logger.info("文章快取命中 (語意相似度 %.3f)", best_score)
+                return cached
+        return None
+
+    def get_by_embedding(
+        self,
+        params: Dict[str, Any],
+        embedding: Sequence[float]
+    ) -> Optional[Dict[str, Any]]:
+        """以嵌入向量的餘弦相似度查詢同一分區內最相近的項目"""
+        if self.embedding_threshold >= 1:
+            return None
+
+        query = _normalize(embedding)
+        best_key, best_score = None, 0.0
+        for candidate_key, candidate in self._embeddings.get(self._partition(params), []):
+            score = _dot(query, candidate)
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+
+        if best_key is not None and best_score >= self.embedding_threshold:
+            cached = self._get_entry(best_key)
+            if cached is not None:
+                logger.info("文章快取命中 (嵌入相似度 %.3f)", best_score)
+                return cached
+        return None
+
+    def set(
+        self,
+        params: Dict[str, Any],
+        value: Dict[str, Any],
+        embedding: Optional[Sequence[float]] = None
+    ) -> None:
+        """寫入快取，超過容量時淘汰最久未使用的項目；embedding 供之後的嵌入相似度比對"""
+        key = self.build_key(params)
+        if key not in self._entries:
+            partition = self._partition(params)
+            vector = _text_vector(self.semantic_text(params))
+            self._vectors.setdefault(partition, []).append((key, vector))
+            if embedding:
+                self._embeddings.setdefault(partition, []).append((key, _normalize(embedding)))
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._drop_vector(evicted_key)
+
+    def clear(self) -> None:
+        """清空快取"""
+        self._entries.clear()
+        self._vectors.clear()
+        self._embeddings.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """取得未過期的項目並更新 LRU 順序"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._drop_vector(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _drop_vector(self, key: str) -> None:
+        """移除已淘汰項目的語意向量與嵌入向量"""
+        for index in (self._vectors, self._embeddings):
+            for partition, vectors in list(index.items()):
+                remaining = [item for item in vectors if item[0] != key]
+                if len(remaining) != len(vectors):
+                    if remaining:
+                        index[partition] = remaining
+                    else:
+                        del index[partition]
+                    break
+
+
+# 全域文章快取實例
+article_cache = ArticleCache(
+    max_entries=settings.cache_max_entries,
+    ttl=settings.cache_ttl,
+    semantic_threshold=settings.semantic_cache_threshold,
+    embedding_threshold=settings.embedding_cache_threshold
+)
@@ -1,16 +1,28 @@
 """核心文章生成邏輯"""
 
+import asyncio
 import logging
-from typing import Dict, Optional, List, Any
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional, List, Any, Tuple, Union
 from datetime import datetime
 
 from app.services.llm_service import llm_service
+from app.services.batching_scheduler import batching_scheduler
+from app.services.article_cache import article_cache
+from app.core.config import settings
 from app.utils.validators import validator
-from app.core.exceptions import ArticleGenerationError, ValidationError
+from app.core.exceptions import ArticleGenerationError, ArticleGeneratorException, ValidationError
 
 logger = logging.getLogger(__name__)
 
 
+# 批次生成中單筆請求可使用的參數；提供商由整個批次統一指定
+_BATCH_REQUIRED_KEYS = frozenset({"exam_type", "topic", "difficulty"})
+_BATCH_REQUEST_KEYS = _BATCH_REQUIRED_KEYS | {
+    "word_count", "paragraph_count", "style", "focus_points"
+}
+
+
 class ArticleGenerator:
     """核心文章生成服務"""
     
@@ -18,6 +30,8 @@ class ArticleGenerator:
         """初始化文章生成器"""
         self.llm_service = llm_service
         self.validator = validator
+        # 快取鍵 -> 進行中的生成工作，相同參數的併發請求共用同一次 LLM 調用與同一個結果
+        self._inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
     
     async def generate_article(
         self,
@@ -30,95 +44,283 @@ class ArticleGenerator:
         focus_points: Optional[List[str]] = None,
         provider: Optional[str] = None
     ) -> Dict[str, Any]:
-        """生成文章的主要方法"""
+        """
+        生成文章的主要方法
+        
+        快取命中與合併的併發請求會返回同一個結果字典，呼叫端不可修改返回值。
+        """
         
         try:
-            # 1. 驗證所有參數
-            self._validate_parameters(exam_type, topic, difficulty, word_count, paragraph_count, style)
-            
-            # 2. 處理預設值
-            final_word_count = self._process_word_count(exam_type, difficulty, word_count)
-            final_paragraph_count = paragraph_count or 3
-            final_provider = provider or self.llm_service.default_provider
-            
-            logger.info(f"開始生成文章 - 考試類型: {exam_type}, 主題: {topic}, 難度: {difficulty}, 提供商: {final_provider}")
-            
-            # 3. 使用 LLM 服務的高級介面
-            response = await self.llm_service.generate_article(
-                exam_type=exam_type,
-                topic=topic,
-                difficulty=difficulty,
-                word_count=final_word_count,
-                paragraph_count=final_paragraph_count,
-                style=style,
-                focus_points=focus_points,
-                provider=final_provider
-            )
-            
-            # 4. 構建回應元數據
-            metadata = self._build_metadata(
-                exam_type, topic, difficulty, final_word_count, 
-                final_paragraph_count, style, focus_points, response
+            # 1. 驗證參數並套用預設值
+            llm_params = self._prepare_params(
+                exam_type, topic, difficulty, word_count,
+                paragraph_count, style, focus_points, provider
             )
             
-            logger.info("文章生成成功")
+            # 2. 以套用預設值後的參數查詢快取，命中時不調用 LLM
+            embedding = None
+            if settings.cache_enabled:
+                cached = article_cache.get(llm_params)
+                if cached is None and settings.embedding_cache_enabled:
+                    embedding = await self._embed_params(llm_params)
+                    if embedding is not None:
+                        cached = article_cache.get_by_embedding(llm_params, embedding)
+                if cached is not None:
+                    return cached
+                
+                # 3. 快取未命中時，相同參數的進行中請求共用同一個生成工作；
+                # 以 shield 等待，單一呼叫端取消不會中斷其他呼叫端共用的生成
+                key = article_cache.build_key(llm_params)
+                task = self._inflight.get(key)
+                if task is None:
+                    task = asyncio.ensure_future(self._generate_uncached(llm_params, embedding))
+                    self._inflight[key] = task
+                    task.add_done_callback(lambda _: self._inflight.pop(key, None))
+                else:
+                    logger.info("合併相同參數的進行中請求 - 考試類型: %s, 主題: %s", exam_type, topic)
+                return await asyncio.shield(task)
             
-            return {
-                "success": True,
-                "article": response["content"],
-                "metadata": metadata,
-                "timestamp": datetime.now().isoformat()
-            }
+            return await self._generate_uncached(llm_params, embedding)
             
+        except ArticleGeneratorException:
+            # 業務異常保留原始錯誤碼，交由全域異常處理器對應狀態碼
+            raise
         except Exception as e:
-            logger.error(f"文章生成失敗: {str(e)}")
+            logger.error("文章生成失敗: %s", e)
             raise ArticleGenerationError(f"文章生成失敗: {str(e)}")
     
-    def _validate_parameters(
+    async def _generate_uncached(
+        self,
+        llm_params: Dict[str, Any],
+        embedding: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """調用 LLM 生成文章並寫入快取"""
+        logger.info(
+            "開始生成文章 - 考試類型: %s, 主題: %s, 難度: %s, 提供商: %s",
+            llm_params["exam_type"], llm_params["topic"], llm_params["difficulty"], llm_params["provider"]
+        )
+        
+        # 經由微批次排程調用 LLM 服務的高級介面
+        response = await batching_scheduler.submit(**llm_params)
+        
+        result = self._build_result(llm_params, response)
+        
+        logger.info("文章生成成功")
+        
+        if settings.cache_enabled:
+            article_cache.set(llm_params, result, embedding=embedding)
+        return result
+    
+    async def generate_variants(
         self,
         exam_type: str,
         topic: str,
         difficulty: str,
-        word_count: Optional[int],
-        paragraph_count: Optional[int],
-        style: Optional[str]
-    ) -> None:
-        """驗證所有輸入參數"""
+        word_count: Optional[int] = None,
+        paragraph_count: Optional[int] = None,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+        k: int = 2
+    ) -> Dict[str, Any]:
+        """
+        以單一請求生成同一主題的 k 個文章版本（例如 A/B 測試），prompt 只計費一次
+        
+        回應格式同 generate_article，article 為第一個版本，所有版本依序放在 variants；
+        元數據與 token 用量由各版本共用。
+        """
+        if k < 1 or k > 8:
+            raise ValidationError("版本數必須在 1-8 之間")
+        
+        try:
+            llm_params = self._prepare_params(
+                exam_type, topic, difficulty, word_count,
+                paragraph_count, style, focus_points, provider
+            )
+            
+            logger.info("開始生成 %d 個文章版本 - 考試類型: %s, 主題: %s, 提供商: %s", k, exam_type, topic, llm_params["provider"])
+            
+            response = await self.llm_service.generate_article(**llm_params, n=k)
+            
+            result = self._build_result(llm_params, response)
+            result["variants"] = response.get("variants") or [response["content"]]
+            return result
+            
+        except ArticleGeneratorException:
+            raise
+        except Exception as e:
+            logger.error("文章版本生成失敗: %s", e)
+            raise ArticleGenerationError(f"文章版本生成失敗: {str(e)}")
+    
+    async def generate_many(
+        self,
+        requests: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        併發生成多篇文章，每個請求的參數同 generate_article
+        
+        以 Semaphore 限制同時進行的生成數；結果依輸入順序返回，
+        失敗的項目以異常物件表示，不影響其他項目。
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.bulk_max_concurrency)
+        
+        async def _generate_one(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.generate_article(**request)
+        
+        logger.info("開始併發生成文章，共 %d 篇", len(requests))
+        return await asyncio.gather(
+            *(_generate_one(request) for request in requests),
+            return_exceptions=True
+        )
+    
+    async def generate_articles_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        provider: Optional[str] = None
+    ) -> List[Union[Dict[str, Any], ArticleGeneratorException]]:
+        """
+        以 OpenAI Batch API 批次生成多篇文章，適用於非即時的大量生成工作
+        
+        每個請求的參數同 generate_article（不含 provider）；結果依輸入順序返回，
+        驗證或生成失敗的項目以異常物件表示，不影響其他項目。
+        """
+        results: List[Union[Dict[str, Any], ArticleGeneratorException]] = []
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        
+        # 1. 逐筆驗證參數，無效的請求不送出
+        for request in requests:
+            try:
+                self._check_batch_keys(request)
+                llm_params = self._prepare_params(**request, provider=provider)
+            except ArticleGeneratorException as e:
+                results.append(e)
+                continue
+            llm_params.pop("provider")
+            pending.append((len(results), llm_params))
+            results.append(None)
         
-        # 驗證考試類型
-        self.validator.validate_exam_type(exam_type)
+        if not pending:
+            return results
         
-        # 驗證主題
-        self.validator.validate_topic(exam_type, topic)
+        logger.info("開始批次生成文章，共 %d 篇", len(pending))
         
-        # 驗證難度
-        self.validator.validate_difficulty(exam_type, difficulty)
+        # 2. 一次送出所有有效請求
+        try:
+            responses = await self.llm_service.generate_articles_batch(
+                [params for _, params in pending],
+                provider=provider
+            )
+        except ArticleGeneratorException:
+            raise
+        except Exception as e:
+            logger.error("批次生成文章失敗: %s", e)
+            raise ArticleGenerationError(f"批次生成文章失敗: {str(e)}")
+        
+        # 3. 依原始順序填入結果
+        for (index, params), response in zip(pending, responses):
+            if isinstance(response, ArticleGeneratorException):
+                results[index] = response
+            elif isinstance(response, Exception):
+                results[index] = ArticleGenerationError(f"文章生成失敗: {str(response)}")
+            else:
+                results[index] = self._build_result(params, response)
+        
+        return results
+    
+    async def generate_article_stream(
+        self,
+        exam_type: str,
+        topic: str,
+        difficulty: str,
+        word_count: Optional[int] = None,
+        paragraph_count: Optional[int] = None,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """以串流方式生成文章，參數驗證、提供商選擇與限流在返回串流前完成；串流結束後 usage 填入 token 用量"""
         
-        # 驗證字數
-        if word_count is not None:
-            self.validator.validate_word_count(exam_type, word_count)
+        llm_params = self._prepare_params(
+            exam_type, topic, difficulty, word_count,
+            paragraph_count, style, focus_points, provider
+        )
         
-        # 驗證段落數
-        if paragraph_count is not None:
-            if paragraph_count < 1 or paragraph_count > 10:
-                raise ValidationError("段落數必須在 1-10 之間")
+        logger.info("開始串流生成文章 - 考試類型: %s, 主題: %s, 難度: %s, 提供商: %s", exam_type, topic, difficulty, llm_params["provider"])
         
-        # 驗證風格
-        self.validator.validate_style(exam_type, style)
+        return await self.llm_service.generate_article_stream(**llm_params, usage=usage)
+    
+    @staticmethod
+    def _check_batch_keys(request: Dict[str, Any]) -> None:
+        """檢查批次中單筆請求的參數名稱，不支援或缺少的參數以 ValidationError 表示"""
+        unknown = request.keys() - _BATCH_REQUEST_KEYS
+        if unknown:
+            raise ValidationError(
+                f"不支援的參數: {', '.join(sorted(unknown))}",
+                details={"unsupported": sorted(unknown)}
+            )
+        missing = _BATCH_REQUIRED_KEYS - request.keys()
+        if missing:
+            raise ValidationError(
+                f"缺少必要參數: {', '.join(sorted(missing))}",
+                details={"missing": sorted(missing)}
+            )
     
-    def _process_word_count(
+    def _prepare_params(
         self,
         exam_type: str,
+        topic: str,
         difficulty: str,
-        word_count: Optional[int]
-    ) -> int:
-        """處理字數要求，返回最終使用的字數"""
+        word_count: Optional[int] = None,
+        paragraph_count: Optional[int] = None,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None,
+        provider: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """驗證參數並套用預設值，返回調用 LLM 服務的參數"""
         
-        if word_count is not None:
-            return word_count
+        resolved = self.validator.resolve(
+            exam_type, topic, difficulty, word_count,
+            paragraph_count, style, focus_points
+        )
         
-        # 使用預設字數
-        return self.validator.get_default_word_count(exam_type, difficulty)
+        return {
+            "exam_type": resolved.exam_type,
+            "topic": resolved.topic,
+            "difficulty": resolved.difficulty,
+            "word_count": resolved.word_count,
+            "paragraph_count": resolved.paragraph_count,
+            "style": resolved.style,
+            "focus_points": resolved.focus_points,
+            "provider": provider or self.llm_service.default_provider
+        }
+    
+    async def _embed_params(self, llm_params: Dict[str, Any]) -> Optional[List[float]]:
+        """計算語意快取用的嵌入向量，失敗時返回 None 並照常生成"""
+        try:
+            return await self.llm_service.embed(article_cache.semantic_text(llm_params))
+        except Exception as e:
+            logger.warning("嵌入向量計算失敗，略過語意快取: %s", e)
+            return None
+    
+    def _build_result(self, llm_params: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """由 LLM 回應構建文章生成結果，生成時間只取一次"""
+        
+        generated_at = datetime.now()
+        metadata = self._build_metadata(
+            llm_params["exam_type"], llm_params["topic"], llm_params["difficulty"],
+            llm_params["word_count"], llm_params["paragraph_count"], llm_params["style"],
+            llm_params["focus_points"], response, generated_at
+        )
+        
+        return {
+            "success": True,
+            "article": response["content"],
+            "metadata": metadata,
+            "timestamp": generated_at
+        }
     
     def _build_metadata(
         self,
@@ -129,7 +331,8 @@ class ArticleGenerator:
         paragraph_count: int,
         style: Optional[str],
         focus_points: Optional[List[str]],
-        llm_response: Dict[str, Any]
+        llm_response: Dict[str, Any],
+        generated_at: datetime
     ) -> Dict[str, Any]:
         """構建回應元數據"""
         
@@ -140,7 +343,7 @@ class ArticleGenerator:
             "target_word_count": word_count,
             "target_paragraph_count": paragraph_count,
             "actual_word_count": llm_response.get("actual_word_count", 0),
-            "generation_time": datetime.now().isoformat(),
+            "generation_time": generated_at.isoformat(),
             "provider": llm_response.get("provider", "unknown"),
             "model": llm_response.get("model", "unknown"),
             "usage": llm_response.get("usage", {})
@@ -153,22 +356,31 @@ class ArticleGenerator:
             metadata["focus_points"] = focus_points
         
         # 添加考試類型的基本資訊
-        exam_info = self.validator.get_exam_info(exam_type)
-        metadata["exam_info"] = {
-            "full_name": exam_info["full_name"],
-            "description": exam_info["description"]
-        }
+        metadata["exam_info"] = self._get_exam_summary(exam_type)
         
         return metadata
     
+    # 考試配置在啟動後不變，以 lru_cache 快取查詢結果；
+    # 快取會持有 self 的參照，僅適用於全域單例
+    @lru_cache(maxsize=1)
     def get_supported_exam_types(self) -> List[str]:
         """獲取支援的考試類型"""
         return self.validator.get_supported_exam_types()
     
+    @lru_cache(maxsize=8)
     def get_exam_info(self, exam_type: str) -> Dict[str, Any]:
         """獲取考試類型的詳細資訊"""
         return self.validator.get_exam_info(exam_type)
     
+    @lru_cache(maxsize=8)
+    def _get_exam_summary(self, exam_type: str) -> Dict[str, str]:
+        """回應元數據中的考試摘要，各回應共用同一物件，不可修改"""
+        exam_info = self.get_exam_info(exam_type)
+        return {
+            "full_name": exam_info["full_name"],
+            "description": exam_info["description"]
+        }
+    
     def get_available_providers(self) -> List[str]:
         """獲取可用的 LLM 提供商"""
         return self.llm_service.get_available_providers()
@@ -0,0 +1,113 @@
+"""LLM 請求微批次排程"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+_BatchItem = Tuple[Dict[str, Any], "asyncio.Future[Dict[str, Any]]"]
+
+
+class BatchingScheduler:
+    """
+    將短時間窗口內的併發文章生成請求合併為一批，一次併發送出
+
+    Chat Completions API 沒有單次多請求的呼叫方式，因此同批請求以 asyncio.gather
+    併發送出，共用同一個 HTTP 連線池；排程未啟動時直接調用 LLM 服務。
+    """
+
+    def __init__(self, window: float = 0.02, max_batch_size: int = 16):
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue: Optional["asyncio.Queue[_BatchItem]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 執行中的批次，保留引用避免任務被回收
+        self._batches: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        """背景工作是否執行中"""
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """啟動背景批次工作，需在事件迴圈中呼叫"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._batch_worker(self._queue))
+        logger.info("微批次排程已啟動 (窗口 %.0f ms，批次上限 %d)", self.window * 1000, self.max_batch_size)
+
+    async def stop(self) -> None:
+        """停止背景工作，已排入的請求仍會完成"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        pending: List[_BatchItem] = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            await self._dispatch(pending)
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        logger.info("微批次排程已停止")
+
+    async def submit(self, **params: Any) -> Dict[str, Any]:
+        """提交文章生成請求並等待結果，參數同 LLMService.generate_article"""
+        if not self.running or self._queue is None:
+            return await llm_service.generate_article(**params)
+
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((params, future))
+        return await future
+
+    async def _batch_worker(self, queue: "asyncio.Queue[_BatchItem]") -> None:
+        """收集窗口內的請求，湊滿批次上限或窗口結束即送出"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch: List[_BatchItem]) -> None:
+        """併發送出一批請求，並將結果或異常交回各自的呼叫端"""
+        logger.debug("送出批次請求，共 %d 筆", len(batch))
+        results = await asyncio.gather(
+            *(llm_service.generate_article(**params) for params, _ in batch),
+            return_exceptions=True
+        )
+        for (_, future), result in zip(batch, results):
+            # 呼叫端已取消時不再設定結果
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# 全域微批次排程實例
+batching_scheduler = BatchingScheduler(
+    window=settings.batch_window_ms / 1000,
+    max_batch_size=settings.batch_max_size
+)
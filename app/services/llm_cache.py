@@ -0,0 +1,91 @@
+"""LLM 回應快取"""
+
+import copy
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    以完整請求內容為鍵的 LLM 回應快取（LRU + TTL）
+
+    只快取 temperature 為 0 的確定性請求；temperature 大於 0 時每次生成結果不同，
+    cache_key 返回 None 表示略過快取。介面為非同步，以便日後替換為外部快取後端。
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (過期時間, 回應)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def cache_key(
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        n: int = 1
+    ) -> Optional[str]:
+        """由請求內容建立快取鍵，非確定性請求返回 None"""
+        if temperature > 0:
+            return None
+        payload = orjson.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "messages": messages,
+                "temperature": float(temperature),
+                "max_tokens": max_tokens,
+                "n": n
+            },
+            option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查詢快取，返回回應的副本"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        logger.info("LLM 回應快取命中")
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """寫入快取，超過容量時淘汰最久未使用的項目"""
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空快取"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全域 LLM 回應快取實例
+llm_cache = LLMCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl=settings.cache_ttl
+)
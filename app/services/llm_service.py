@@ -1,14 +1,30 @@
 """LLM 統一調用服務"""
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 import asyncio
+import math
 import os
+import random
 import time
-from functools import wraps
+from functools import lru_cache, wraps
 
-from openai import AsyncOpenAI
+import httpx
+import orjson
+from openai import (
+    NOT_GIVEN,
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError
+)
 from app.core.config import settings
+from app.services.llm_cache import llm_cache
+from app.services.template_service import template_service
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.rate_limiter import llm_rate_limiter, llm_token_limiter
 from app.core.exceptions import (
     LLMServiceError, 
     ConfigurationError, 
@@ -19,30 +35,162 @@ from app.core.exceptions import (
 logger = logging.getLogger(__name__)
 
 
-def retry_async(max_retries: int = 3, delay: float = 1.0, backoff_factor: float = 2.0):
-    """異步重試裝飾器"""
+def _http2_available() -> bool:
+    """HTTP/2 需要選用的 h2 套件，未安裝時退回 HTTP/1.1"""
+    if not settings.http2_enabled:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("未安裝 h2 套件，改用 HTTP/1.1")
+        return False
+    return True
+
+
+# 連線池設定於啟動時決定
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=settings.http_max_connections,
+    max_keepalive_connections=settings.http_max_keepalive_connections,
+    keepalive_expiry=settings.http_keepalive_expiry
+)
+_HTTP_CONNECT_TIMEOUT = settings.http_connect_timeout
+_HTTP2_ENABLED = _http2_available()
+
+def _count_words(content: Optional[str]) -> int:
+    """
+    計算英文文章字數
+    
+    str.split() 在 C 層切分，實測比逐一比對的正規表示式快數倍；
+    支援的考試皆為英文，以空白切分即為正確字數。
+    """
+    return len(content.split()) if content else 0
+
+
+# 英文文章每字約 1.3 個 token（含標點與段落分隔取 1.4），再保留 25% 餘裕避免截斷
+_TOKENS_PER_WORD = 1.4
+_MAX_TOKENS_HEADROOM = 1.25
+_MIN_MAX_TOKENS = 128
+
+
+def _target_max_tokens(word_count: int) -> int:
+    """依目標字數估算 max_tokens，避免預留過多的生成長度"""
+    return max(math.ceil(word_count * _TOKENS_PER_WORD * _MAX_TOKENS_HEADROOM), _MIN_MAX_TOKENS)
+
+
+# 斷路器設定在載入時讀取一次，各提供商的斷路器依此建立
+_CIRCUIT_FAILURE_THRESHOLD = settings.circuit_breaker_threshold
+_CIRCUIT_RESET_TIMEOUT = settings.circuit_breaker_reset_timeout
+
+
+# 整體生成時限比 SDK 請求超時多保留的緩衝（秒）
+_TIMEOUT_GRACE = 1.0
+
+
+# 預估 prompt token 數時每個 token 約對應的字元數
+_CHARS_PER_TOKEN = 4
+
+
+def _estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int], n: int = 1) -> int:
+    """預估請求會計入 TPM 的 token 數：prompt 依字元數估算，加上所有候選的輸出上限"""
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    return prompt_chars // _CHARS_PER_TOKEN + (max_tokens or 1500) * n
+
+
+@lru_cache(maxsize=64)
+def _system_message_dict(content: str) -> Dict[str, str]:
+    """
+    系統訊息只依考試類型而定，同一內容共用同一個字典
+    
+    返回的字典會被多個請求共用，呼叫端不可修改
+    """
+    return {"role": "system", "content": content}
+
+
+def _usage_dict(usage: Any) -> Dict[str, int]:
+    """將 SDK 回報的用量轉為字典，提供商未回報用量時各項為 0"""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+        "completion_tokens": getattr(usage, "completion_tokens", 0),
+        "total_tokens": getattr(usage, "total_tokens", 0)
+    }
+
+
+def _cached_tokens(usage: Any) -> int:
+    """取得 prompt 中命中提供商前綴快取的 token 數，未回報時為 0"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None)
+    return cached if isinstance(cached, int) else 0
+
+
+def _update_usage(usage: Dict[str, int], chunk_usage: Any) -> None:
+    """以串流片段回報的用量更新 usage 字典"""
+    usage.update(_usage_dict(chunk_usage))
+
+
+# Batch API 的終止狀態
+_BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+# 可重試的暫時性錯誤：速率限制、連線失敗與伺服器錯誤；驗證、參數等錯誤立即拋出
+_TRANSIENT_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """讀取錯誤回應的 Retry-After 標頭（秒）"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return max(float(response.headers.get("retry-after")), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_provider_failure(error: Exception) -> bool:
+    """是否為提供商不可用造成的失敗（重試用盡的暫時性錯誤或超時），用於斷路器計數"""
+    if isinstance(error, GenerationTimeoutError):
+        return True
+    return isinstance(error.__cause__ or error, (*_TRANSIENT_ERRORS, APITimeoutError))
+
+
+def retry_async(
+    max_retries: int = 3,
+    delay: float = 1.0,
+    backoff_factor: float = 2.0,
+    max_delay: float = 20.0
+):
+    """
+    異步重試裝飾器，只重試暫時性錯誤
+    
+    提供商將 SDK 錯誤包裝後以 `raise ... from e` 拋出，依 __cause__ 判斷原始錯誤；
+    有 Retry-After 標頭時依其等待，否則以指數退避加上完全隨機抖動，避免併發請求同步重試。
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            last_exception = None
-            
             for attempt in range(max_retries):
                 try:
                     return await func(*args, **kwargs)
+                except GenerationTimeoutError:
+                    # 單次呼叫的超時即為整體時限，超時後不再重試
+                    raise
                 except Exception as e:
-                    last_exception = e
+                    cause = e.__cause__ or e
+                    if not isinstance(cause, _TRANSIENT_ERRORS):
+                        raise
+                    if attempt == max_retries - 1:
+                        logger.error("所有重試都失敗了: %s", e)
+                        raise
                     
-                    if attempt < max_retries - 1:
-                        wait_time = delay * (backoff_factor ** attempt)
-                        logger.warning(
-                            f"調用失敗 (嘗試 {attempt + 1}/{max_retries}): {str(e)}, "
-                            f"等待 {wait_time:.2f} 秒後重試"
-                        )
-                        await asyncio.sleep(wait_time)
-                    else:
-                        logger.error(f"所有重試都失敗了: {str(e)}")
-                        
-            raise last_exception
+                    wait_time = _retry_after(cause)
+                    if wait_time is None:
+                        wait_time = random.uniform(0, delay * (backoff_factor ** attempt))
+                    wait_time = min(wait_time, max_delay)
+                    logger.warning(
+                        "調用失敗 (嘗試 %d/%d): %s, 等待 %.2f 秒後重試",
+                        attempt + 1, max_retries, e, wait_time
+                    )
+                    await asyncio.sleep(wait_time)
         return wrapper
     return decorator
 
@@ -54,29 +202,87 @@ class LLMProvider:
         self,
         messages: List[Dict[str, str]],
         max_tokens: Optional[int] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache_key: Optional[str] = None,
+        timeout: Optional[float] = None
     ) -> Dict[str, Any]:
-        """生成文本補全，返回標準化的回應"""
+        """
+        生成文本補全，返回標準化的回應
+        
+        cache_key 為共用 prompt 前綴的分區鍵，支援的提供商可據此重用前綴快取；
+        timeout 為單次請求的超時秒數，由 SDK 在傳輸層中止請求，超時拋出 GenerationTimeoutError
+        """
+        raise NotImplementedError
+    
+    def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        cache_key: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        以串流方式生成文本，逐段產出內容
+        
+        傳入 usage 字典時，串流結束後會填入最後一個片段回報的 token 用量；
+        子類以 async generator 實作，調用後直接返回非同步迭代器
+        """
+        raise NotImplementedError
+    
+    async def warmup(self, timeout: float = 5.0) -> None:
+        """以輕量請求預先建立連線，預設不做任何事"""
+        return None
+    
+    def describe(self) -> Dict[str, Any]:
+        """返回提供商的描述資訊"""
         raise NotImplementedError
 
 
 class OpenAIProvider(LLMProvider):
     """OpenAI 提供商"""
     
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini-2024-07-18"):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o-mini-2024-07-18",
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        # 重試由 retry_async 統一處理，停用 SDK 內建重試以免重複
+        self.client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
         self.model = model
     
-    @retry_async(max_retries=3, delay=1.0)
+    async def warmup(self, timeout: float = 5.0) -> None:
+        """列出模型以預先完成 TCP/TLS 交握，連線留在共用連線池供後續請求重用"""
+        await self.client.models.list(timeout=timeout)
+    
+    def describe(self) -> Dict[str, Any]:
+        """返回提供商的描述資訊"""
+        return {"provider": "OpenAI", "model": self.model, "available": True}
+    
+    @staticmethod
+    def _cache_body(cache_key: Optional[str]) -> Optional[Dict[str, str]]:
+        """以 prompt_cache_key 將相同前綴的請求導向同一快取分區"""
+        return {"prompt_cache_key": cache_key} if cache_key else None
+    
+    @retry_async(max_retries=settings.max_retries, delay=settings.retry_delay)
     async def generate_completion(
         self,
         messages: List[Dict[str, str]],
         max_tokens: Optional[int] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        n: int = 1
     ) -> Dict[str, Any]:
-        """使用 OpenAI API 生成文本"""
+        """
+        使用 OpenAI API 生成文本
+        
+        n 大於 1 時在同一請求中生成多個候選，prompt 只計費一次；
+        content 為第一個候選，所有候選依序放在 variants
+        """
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -85,78 +291,272 @@ class OpenAIProvider(LLMProvider):
                 temperature=temperature,
                 top_p=1.0,
                 frequency_penalty=0.0,
-                presence_penalty=0.0
+                presence_penalty=0.0,
+                extra_body=self._cache_body(cache_key),
+                timeout=timeout if timeout is not None else NOT_GIVEN,
+                n=n
             )
             
-            end_time = time.time()
+            end_time = time.perf_counter()
             
             result = {
                 "content": response.choices[0].message.content,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                },
+                "usage": _usage_dict(response.usage),
                 "model": self.model,
                 "provider": "openai",
                 "api_response_time": round(end_time - start_time, 3)
             }
+            if n > 1:
+                result["variants"] = [choice.message.content for choice in response.choices]
             
-            logger.info(f"OpenAI API 調用成功，耗時 {result['api_response_time']:.3f} 秒")
+            logger.info(
+                "OpenAI API 調用成功，耗時 %.3f 秒，prompt 快取命中 %d/%d tokens",
+                result["api_response_time"], _cached_tokens(response.usage), result["usage"]["prompt_tokens"]
+            )
             return result
             
+        except APITimeoutError as e:
+            raise GenerationTimeoutError(timeout) from e
         except Exception as e:
-            raise OpenAIAPIError(f"OpenAI API 調用失敗: {str(e)}", details={"error": str(e)})
+            raise OpenAIAPIError(f"OpenAI API 調用失敗: {str(e)}", details={"error": str(e)}) from e
+    
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        cache_key: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """使用 OpenAI API 串流生成文本"""
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens or 1500,
+                temperature=temperature,
+                top_p=1.0,
+                frequency_penalty=0.0,
+                presence_penalty=0.0,
+                stream=True,
+                stream_options={"include_usage": True},
+                extra_body=self._cache_body(cache_key)
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                elif chunk.usage and usage is not None:
+                    _update_usage(usage, chunk.usage)
+                    
+        except Exception as e:
+            raise OpenAIAPIError(f"OpenAI API 串流調用失敗: {str(e)}", details={"error": str(e)}) from e
+    
+    @retry_async(max_retries=settings.max_retries, delay=settings.retry_delay)
+    async def embed(self, text: str, model: str, timeout: Optional[float] = None) -> List[float]:
+        """使用 OpenAI Embeddings API 計算文字的嵌入向量"""
+        try:
+            response = await self.client.embeddings.create(
+                model=model,
+                input=text,
+                timeout=timeout if timeout is not None else NOT_GIVEN
+            )
+            return response.data[0].embedding
+            
+        except APITimeoutError as e:
+            raise GenerationTimeoutError(timeout) from e
+        except Exception as e:
+            raise OpenAIAPIError(f"OpenAI 嵌入向量調用失敗: {str(e)}", details={"error": str(e)}) from e
+    
+    async def generate_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 300.0
+    ) -> List[Union[Dict[str, Any], OpenAIAPIError]]:
+        """
+        透過 OpenAI Batch API 批次生成文本，適用於非即時的大量生成工作
+        
+        每個請求需包含 messages，可選 max_tokens、temperature；
+        結果依輸入順序返回，單筆失敗以 OpenAIAPIError 表示，不影響其他項目。
+        """
+        payload = b"".join(
+            orjson.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": request["messages"],
+                    "max_tokens": request.get("max_tokens") or 1500,
+                    "temperature": request.get("temperature", 0.7)
+                }
+            }) + b"\n"
+            for index, request in enumerate(requests)
+        )
+        
+        try:
+            input_file = await self.client.files.create(
+                file=("batch_input.jsonl", payload),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info("已建立 OpenAI 批次 %s，共 %d 筆請求", batch.id, len(requests))
+            
+            # 以指數退避輪詢批次狀態
+            wait_time = poll_interval
+            while batch.status not in _BATCH_TERMINAL_STATUSES:
+                await asyncio.sleep(wait_time)
+                wait_time = min(wait_time * 2, max_poll_interval)
+                batch = await self.client.batches.retrieve(batch.id)
+            
+            if batch.status != "completed":
+                raise OpenAIAPIError(
+                    f"OpenAI 批次未完成，狀態: {batch.status}",
+                    details={"batch_id": batch.id, "status": batch.status}
+                )
+            
+            results: List[Union[Dict[str, Any], OpenAIAPIError]] = [
+                OpenAIAPIError("批次結果缺少此項目", details={"batch_id": batch.id})
+                for _ in requests
+            ]
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                content = await self.client.files.content(file_id)
+                for line in content.content.splitlines():
+                    if line.strip():
+                        index, result = self._parse_batch_line(orjson.loads(line))
+                        results[index] = result
+            
+            logger.info("OpenAI 批次 %s 完成", batch.id)
+            return results
+            
+        except OpenAIAPIError:
+            raise
+        except Exception as e:
+            raise OpenAIAPIError(f"OpenAI 批次調用失敗: {str(e)}", details={"error": str(e)})
+    
+    def _parse_batch_line(self, item: Dict[str, Any]) -> Tuple[int, Union[Dict[str, Any], OpenAIAPIError]]:
+        """解析批次輸出檔的一行，返回 (輸入序號, 標準化回應或錯誤)"""
+        index = int(item["custom_id"])
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        
+        if response.get("status_code") != 200 or not body.get("choices"):
+            error = item.get("error") or body.get("error") or {}
+            return index, OpenAIAPIError(f"批次項目失敗: {error}", details={"error": error})
+        
+        usage = body.get("usage") or {}
+        return index, {
+            "content": body["choices"][0]["message"]["content"],
+            "usage": {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0)
+            },
+            "model": self.model,
+            "provider": "openai"
+        }
 
 
 class GeminiProvider(LLMProvider):
     """Gemini 提供商（透過 OpenAI SDK 調用）"""
     
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash"):
-        # 使用 OpenAI SDK 調用 Gemini
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        # 使用 OpenAI SDK 調用 Gemini；Gemini 會自動快取共用前綴，不需傳遞 cache_key
         self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+            http_client=http_client,
+            max_retries=0
         )
         self.model = model
     
-    @retry_async(max_retries=3, delay=1.0)
+    async def warmup(self, timeout: float = 5.0) -> None:
+        """列出模型以預先完成 TCP/TLS 交握，連線留在共用連線池供後續請求重用"""
+        await self.client.models.list(timeout=timeout)
+    
+    def describe(self) -> Dict[str, Any]:
+        """返回提供商的描述資訊"""
+        return {"provider": "Google Gemini", "model": self.model, "available": True}
+    
+    @retry_async(max_retries=settings.max_retries, delay=settings.retry_delay)
     async def generate_completion(
         self,
         messages: List[Dict[str, str]],
         max_tokens: Optional[int] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache_key: Optional[str] = None,
+        timeout: Optional[float] = None
     ) -> Dict[str, Any]:
         """使用 Gemini API（透過 OpenAI SDK）生成文本"""
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 max_tokens=max_tokens or 1500,
-                temperature=temperature
+                temperature=temperature,
+                timeout=timeout if timeout is not None else NOT_GIVEN
             )
             
-            end_time = time.time()
+            end_time = time.perf_counter()
             
             result = {
                 "content": response.choices[0].message.content,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
-                    "completion_tokens": response.usage.completion_tokens if response.usage else 0,
-                    "total_tokens": response.usage.total_tokens if response.usage else 0
-                },
+                "usage": _usage_dict(response.usage),
                 "model": self.model,
                 "provider": "gemini",
                 "api_response_time": round(end_time - start_time, 3)
             }
             
-            logger.info(f"Gemini API 調用成功，耗時 {result['api_response_time']:.3f} 秒")
+            logger.info(
+                "Gemini API 調用成功，耗時 %.3f 秒，prompt 快取命中 %d/%d tokens",
+                result["api_response_time"], _cached_tokens(response.usage), result["usage"]["prompt_tokens"]
+            )
             return result
             
+        except APITimeoutError as e:
+            raise GenerationTimeoutError(timeout) from e
         except Exception as e:
-            raise LLMServiceError(f"Gemini API 調用失敗: {str(e)}", details={"error": str(e), "provider": "gemini"})
+            raise LLMServiceError(f"Gemini API 調用失敗: {str(e)}", details={"error": str(e), "provider": "gemini"}) from e
+    
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        cache_key: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """使用 Gemini API（透過 OpenAI SDK）串流生成文本"""
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens or 1500,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                elif chunk.usage and usage is not None:
+                    _update_usage(usage, chunk.usage)
+                    
+        except Exception as e:
+            raise LLMServiceError(f"Gemini API 串流調用失敗: {str(e)}", details={"error": str(e), "provider": "gemini"}) from e
 
 
 class LLMService:
@@ -165,8 +565,31 @@ class LLMService:
     def __init__(self):
         """初始化 LLM 服務"""
         self.timeout = settings.generation_timeout
+        # 所有提供商共用同一個連線池，重用 keep-alive 連線避免重複 TLS 交握
+        self.http_client = self._build_http_client()
         self.providers = self._initialize_providers()
         self.default_provider = settings.default_llm_provider
+        # 提供商名稱 -> 斷路器，首次使用時建立
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """建立共用的 HTTP 連線池，讀取逾時沿用生成超時時間"""
+        return DefaultAsyncHttpxClient(
+            http2=_HTTP2_ENABLED,
+            limits=_HTTP_LIMITS,
+            timeout=httpx.Timeout(self.timeout, connect=_HTTP_CONNECT_TIMEOUT)
+        )
+    
+    def _ensure_open(self) -> None:
+        """
+        連線池已由 aclose 關閉時重新建立連線池與提供商
+        
+        全域服務實例在進程中只建立一次，lifespan 可能執行多次（如測試或重新啟動），
+        關閉後的下一次呼叫以新的連線池繼續服務。
+        """
+        if self.http_client.is_closed:
+            self.http_client = self._build_http_client()
+            self.providers = self._initialize_providers()
     
     def _initialize_providers(self) -> Dict[str, LLMProvider]:
         """初始化所有可用的 LLM 提供商"""
@@ -177,7 +600,8 @@ class LLMService:
             if settings.openai_api_key != "your_openai_api_key_here":
                 providers['openai'] = OpenAIProvider(
                     api_key=settings.openai_api_key,
-                    model=settings.openai_model
+                    model=settings.openai_model,
+                    http_client=self.http_client
                 )
                 logger.info("OpenAI 提供商初始化成功")
         
@@ -186,7 +610,8 @@ class LLMService:
             if settings.gemini_api_key != "your_gemini_api_key_here":
                 providers['gemini'] = GeminiProvider(
                     api_key=settings.gemini_api_key,
-                    model=settings.gemini_model
+                    model=settings.gemini_model,
+                    http_client=self.http_client
                 )
             logger.info("Gemini 提供商初始化成功")
         
@@ -195,56 +620,150 @@ class LLMService:
         
         return providers
     
+    def _select_provider(self, provider: Optional[str]) -> Tuple[str, LLMProvider]:
+        """選擇提供商，不可用時拋出 LLMServiceError"""
+        self._ensure_open()
+        # 檢查是否有可用的提供商
+        if not self.providers:
+            raise LLMServiceError("沒有可用的 LLM 提供商，請檢查 API 金鑰配置")
+        
+        provider_name = provider or self.default_provider
+        if provider_name not in self.providers:
+            available = list(self.providers.keys())
+            raise LLMServiceError(f"提供商 '{provider_name}' 不可用。可用提供商: {available}")
+        
+        return provider_name, self.providers[provider_name]
+    
+    def _breaker(self, provider_name: str) -> CircuitBreaker:
+        """取得提供商的斷路器"""
+        breaker = self._breakers.get(provider_name)
+        if breaker is None:
+            breaker = CircuitBreaker(provider_name, _CIRCUIT_FAILURE_THRESHOLD, _CIRCUIT_RESET_TIMEOUT)
+            self._breakers[provider_name] = breaker
+        return breaker
+    
+    def _select_available_provider(self, provider: Optional[str]) -> Tuple[str, LLMProvider]:
+        """
+        選擇斷路器未開啟的提供商
+        
+        使用預設提供商且其斷路器開啟時改用其他可用的提供商；
+        明確指定的提供商不會被替換，斷路器開啟時直接拋出 LLMServiceError。
+        """
+        provider_name, selected_provider = self._select_provider(provider)
+        if self._breaker(provider_name).allow():
+            return provider_name, selected_provider
+        
+        if provider is None:
+            for name, candidate in self.providers.items():
+                if name != provider_name and self._breaker(name).allow():
+                    logger.warning("%s 斷路器開啟，改用 %s", provider_name.upper(), name.upper())
+                    return name, candidate
+        
+        raise LLMServiceError(
+            f"提供商 '{provider_name}' 暫時無法使用，請稍後再試",
+            details={"provider": provider_name, "reason": "circuit_open"}
+        )
+    
+    @staticmethod
+    async def _acquire_rate_limits(
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int],
+        n: int = 1
+    ) -> None:
+        """
+        依提供商 RPM 與 TPM 上限節流，TPM 以預估 token 數預先扣除
+        
+        所有即時呼叫提供商的路徑（一般生成與串流）在送出請求前都須經過此處；
+        Batch API 的請求由提供商非同步處理且有獨立配額，不計入 RPM 與 TPM，因此不經過限流。
+        """
+        await llm_rate_limiter.acquire()
+        await llm_token_limiter.acquire(_estimate_request_tokens(messages, max_tokens, n))
+    
+    @staticmethod
+    def _build_messages(prompt: str, system_message: Optional[str] = None) -> List[Dict[str, str]]:
+        """構建對話消息，系統訊息字典依內容快取重用"""
+        user_message = {"role": "user", "content": prompt}
+        if system_message:
+            return [_system_message_dict(system_message), user_message]
+        return [user_message]
+    
     async def generate_completion(
         self,
         prompt: str,
         max_tokens: Optional[int] = None,
         temperature: float = 0.7,
         system_message: Optional[str] = None,
-        provider: Optional[str] = None
+        provider: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        n: int = 1
     ) -> Dict[str, Any]:
-        """生成文本補全"""
+        """
+        生成文本補全，n 大於 1 時於單一請求生成多個候選（僅 OpenAI 支援）
+        
+        提供商連續失敗時由斷路器直接拒絕，未指定提供商時自動改用其他提供商
+        """
         try:
-            # 檢查是否有可用的提供商
-            if not self.providers:
-                raise LLMServiceError("沒有可用的 LLM 提供商，請檢查 API 金鑰配置")
+            provider_name, selected_provider = self._select_available_provider(provider)
+            messages = self._build_messages(prompt, system_message)
             
-            # 選擇提供商
-            provider_name = provider or self.default_provider
-            if provider_name not in self.providers:
-                available = list(self.providers.keys())
-                raise LLMServiceError(f"提供商 '{provider_name}' 不可用。可用提供商: {available}")
+            # 只有需要多個候選時才傳遞 n，維持其他提供商的呼叫方式不變
+            extra_kwargs: Dict[str, Any] = {}
+            if n > 1:
+                if not isinstance(selected_provider, OpenAIProvider):
+                    raise LLMServiceError(f"提供商 '{provider_name}' 不支援單次生成多個候選")
+                extra_kwargs["n"] = n
             
-            selected_provider = self.providers[provider_name]
+            # temperature 為 0 的確定性請求先查詢回應快取，命中時不調用 API 也不佔用 RPM
+            response_key = None
+            if settings.cache_enabled:
+                response_key = llm_cache.cache_key(
+                    provider_name, selected_provider.model, messages, temperature, max_tokens, n
+                )
+            if response_key is not None:
+                cached = await llm_cache.get(response_key)
+                if cached is not None:
+                    return cached
             
-            # 構建消息
-            messages = []
-            if system_message:
-                messages.append({"role": "system", "content": system_message})
-            messages.append({"role": "user", "content": prompt})
+            await self._acquire_rate_limits(messages, max_tokens, n)
             
-            logger.info(f"發送請求到 {provider_name.upper()}")
+            logger.info("發送請求到 %s", provider_name.upper())
             
-            # 執行生成
-            response = await asyncio.wait_for(
-                selected_provider.generate_completion(
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    temperature=temperature
-                ),
-                timeout=self.timeout
-            )
+            # 執行生成，單次請求的超時由 SDK 在傳輸層處理；
+            # httpx 的讀取超時只限制兩次讀取的間隔，外層再以 asyncio.timeout 限制含重試的總時間，
+            # 並多留一點緩衝讓傳輸層超時先觸發、乾淨地釋放連線
+            breaker = self._breaker(provider_name)
+            try:
+                async with asyncio.timeout(self.timeout + _TIMEOUT_GRACE):
+                    response = await selected_provider.generate_completion(
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        cache_key=cache_key,
+                        timeout=self.timeout,
+                        **extra_kwargs
+                    )
+            except TimeoutError as e:
+                breaker.record_failure()
+                raise GenerationTimeoutError(self.timeout) from e
+            except Exception as e:
+                # 提供商有回應的錯誤（如參數錯誤）代表服務正常，只有不可用的失敗才計入
+                if _is_provider_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            breaker.record_success()
             
             if not response.get("content"):
                 raise LLMServiceError(f"{provider_name.upper()} API 返回空內容")
             
-            logger.info(f"成功獲得 {provider_name.upper()} 回應")
+            logger.info("成功獲得 %s 回應", provider_name.upper())
+            if response_key is not None:
+                await llm_cache.set(response_key, response)
             return response
             
-        except asyncio.TimeoutError:
-            raise GenerationTimeoutError(self.timeout)
         except Exception as e:
-            logger.error(f"LLM API 調用失敗: {str(e)}")
+            logger.error("LLM API 調用失敗: %s", e)
             raise
     
     async def generate_article(
@@ -256,13 +775,11 @@ class LLMService:
         paragraph_count: int = 3,
         style: Optional[str] = None,
         focus_points: Optional[List[str]] = None,
-        provider: Optional[str] = None
+        provider: Optional[str] = None,
+        n: int = 1
     ) -> Dict[str, Any]:
-        """生成文章的高級接口"""
+        """生成文章的高級接口，n 大於 1 時一次生成多個版本"""
         try:
-            # 使用動態模板服務
-            from app.services.template_service import template_service
-            
             # 建立動態模板
             template = template_service.build_dynamic_template(
                 exam_type=exam_type,
@@ -278,8 +795,11 @@ class LLMService:
             response = await self.generate_completion(
                 prompt=template["user_prompt"],
                 system_message=template["system_message"],
-                temperature=0.7,
-                provider=provider
+                max_tokens=_target_max_tokens(word_count),
+                temperature=settings.generation_temperature,
+                provider=provider,
+                cache_key=template.get("cache_key"),
+                n=n
             )
             
             # 添加生成元數據
@@ -289,36 +809,162 @@ class LLMService:
                 "difficulty": difficulty,
                 "target_word_count": word_count,
                 "paragraph_count": paragraph_count,
-                "actual_word_count": len(response["content"].split())
+                "actual_word_count": _count_words(response["content"])
             })
             
             return response
             
         except Exception as e:
-            logger.error(f"文章生成失敗: {str(e)}")
+            logger.error("文章生成失敗: %s", e)
             raise LLMServiceError(f"文章生成失敗: {str(e)}")
     
+    async def generate_article_stream(
+        self,
+        exam_type: str,
+        topic: str,
+        difficulty: str,
+        word_count: int = 200,
+        paragraph_count: int = 3,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        以串流方式生成文章
+        
+        提供商選擇（含斷路器與預設提供商容錯）、模板建立與限流在返回串流前完成，
+        錯誤可在回應開始前拋出；返回的非同步迭代器逐段產出文章內容，
+        串流結束後 usage 填入 token 用量，並依結果更新提供商的斷路器。
+        """
+        provider_name, selected_provider = self._select_available_provider(provider)
+        template = template_service.build_dynamic_template(
+            exam_type=exam_type,
+            topic=topic,
+            difficulty=difficulty,
+            word_count=word_count,
+            paragraph_count=paragraph_count,
+            style=style,
+            focus_points=focus_points
+        )
+        messages = self._build_messages(template["user_prompt"], template["system_message"])
+        max_tokens = _target_max_tokens(word_count)
+        await self._acquire_rate_limits(messages, max_tokens)
+        
+        logger.info("發送串流請求到 %s", provider_name.upper())
+        return self._track_stream(
+            provider_name,
+            selected_provider.stream_completion(
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=settings.generation_temperature,
+                cache_key=template.get("cache_key"),
+                usage=usage
+            )
+        )
+    
+    async def _track_stream(self, provider_name: str, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        """逐段轉交串流內容，串流完成或失敗時記錄提供商斷路器的結果"""
+        breaker = self._breaker(provider_name)
+        try:
+            async for token in tokens:
+                yield token
+        except Exception as e:
+            # 與一般生成相同，只有提供商不可用的失敗才計入斷路器
+            if _is_provider_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+    
+    async def generate_articles_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        provider: Optional[str] = None
+    ) -> List[Union[Dict[str, Any], LLMServiceError]]:
+        """
+        以 Batch API 批次生成多篇文章，每個請求的參數同 generate_article（不含 provider）
+        
+        目前僅 OpenAI 提供商支援；結果依輸入順序返回，單筆失敗以異常物件表示。
+        Batch API 有獨立的配額，不計入即時請求的 RPM 與 TPM，因此不經過 _acquire_rate_limits。
+        """
+        provider_name, selected_provider = self._select_provider(provider)
+        if not isinstance(selected_provider, OpenAIProvider):
+            raise LLMServiceError(f"提供商 '{provider_name}' 不支援批次生成")
+        
+        batch_requests = []
+        for request in requests:
+            template = template_service.build_dynamic_template(**request)
+            batch_requests.append({
+                "messages": self._build_messages(template["user_prompt"], template["system_message"]),
+                "max_tokens": _target_max_tokens(request["word_count"]),
+                "temperature": settings.generation_temperature
+            })
+        
+        logger.info("發送批次請求到 %s，共 %d 篇", provider_name.upper(), len(requests))
+        responses = await selected_provider.generate_batch(batch_requests)
+        
+        for request, response in zip(requests, responses):
+            if isinstance(response, Exception):
+                continue
+            # 添加生成元數據
+            response.update({
+                "exam_type": request["exam_type"],
+                "topic": request["topic"],
+                "difficulty": request["difficulty"],
+                "target_word_count": request.get("word_count"),
+                "paragraph_count": request.get("paragraph_count"),
+                "actual_word_count": _count_words(response["content"])
+            })
+        
+        return responses
+    
+    async def embed(self, text: str) -> List[float]:
+        """以 OpenAI 嵌入模型計算文字的嵌入向量，供語意快取比對"""
+        self._ensure_open()
+        provider = self.providers.get("openai")
+        if not isinstance(provider, OpenAIProvider):
+            raise LLMServiceError("嵌入向量需要 OpenAI 提供商")
+        return await provider.embed(text, model=settings.embedding_model, timeout=_HTTP_CONNECT_TIMEOUT)
+    
+    async def warmup(self, timeout: float = 5.0) -> None:
+        """
+        併發預熱所有提供商的連線，讓首個使用者請求不必負擔交握延遲
+        
+        預熱失敗只記錄警告，不影響啟動。
+        """
+        self._ensure_open()
+        if not self.providers:
+            return
+        
+        results = await asyncio.gather(
+            *(provider.warmup(timeout=timeout) for provider in self.providers.values()),
+            return_exceptions=True
+        )
+        for name, result in zip(self.providers, results):
+            if isinstance(result, Exception):
+                logger.warning("%s 連線預熱失敗: %s", name.upper(), result)
+            else:
+                logger.info("%s 連線預熱完成", name.upper())
+    
+    async def aclose(self) -> None:
+        """關閉共用的 HTTP 連線池，之後的呼叫會重新建立連線池"""
+        await self.http_client.aclose()
+    
+    async def __aenter__(self) -> "LLMService":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
     def get_available_providers(self) -> List[str]:
         """獲取可用的提供商列表"""
         return list(self.providers.keys())
     
     def get_provider_info(self) -> Dict[str, Dict[str, Any]]:
         """獲取提供商信息"""
-        info = {}
-        for name, provider in self.providers.items():
-            if isinstance(provider, OpenAIProvider):
-                info[name] = {
-                    "provider": "OpenAI",
-                    "model": provider.model,
-                    "available": True
-                }
-            elif isinstance(provider, GeminiProvider):
-                info[name] = {
-                    "provider": "Google Gemini",
-                    "model": provider.model,
-                    "available": True
-                }
-        return info
+        return {name: provider.describe() for name, provider in self.providers.items()}
 
 
 # 全域 LLM 服務實例
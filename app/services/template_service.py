@@ -1,28 +1,130 @@
 """動態模板服務"""
 
-import json
-from typing import Dict, List, Optional, Any
-from pathlib import Path
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
+from app.core.exam_configs import EXAM_CONFIG_PATH, get_exam_configs, load_exam_configs
 from app.core.exceptions import ValidationError
 
 
+# 所有考試類型共用的系統訊息開頭，固定放在最前面以拉長提供商可快取的共同前綴；
+# 考試類型相關內容接在其後，請求參數一律放在使用者訊息
+_SHARED_SYSTEM_PREFIX = """You are an experienced writer of reading passages for standardized English proficiency tests. \
+Your passages are used as practice material for reading comprehension, so they must read like authentic test passages.
+
+General writing rules:
+- Write original content. Do not copy or closely paraphrase published test passages.
+- Keep every fact, date, name and statistic plausible and internally consistent; avoid real private individuals.
+- Stay on the requested topic from the first sentence to the last, without digressions.
+- Keep the vocabulary and grammar consistent with the requested difficulty level throughout the passage.
+- Give each paragraph a single main idea, introduced clearly and supported with specific details or examples.
+- Use transitions so the paragraphs connect logically and the passage reads as one coherent text.
+- Vary sentence length and structure; avoid repeating the same sentence openings.
+- Keep the length within about ten percent of the requested word count.
+- Produce exactly the requested number of paragraphs.
+
+Output format:
+- Output only the passage body as plain text.
+- Separate paragraphs with a single blank line.
+- Do not add a title, headings, bullet points, numbering, Markdown, questions, answer keys, word counts or any commentary before or after the passage."""
+
+
+# 使用者訊息的固定開頭，與系統訊息一起構成各請求相同的前綴；
+# 主題等請求參數一律接在任務分隔標記之後
+_TASK_DELIMITER = "<<<TASK>>>"
+_USER_PROMPT_HEADER = f"""Write the reading passage described by the task specification below, following all of the system instructions.
+請直接輸出文章內容，不需要標題或額外說明。
+
+{_TASK_DELIMITER}
+"""
+
+# 基礎模板只在載入時組合一次
+_BASE_TEMPLATE = {
+    "system": _SHARED_SYSTEM_PREFIX + """
+
+Exam-specific guidance for {exam_type} passages:
+{exam_specific_instructions}
+
+The article should include:
+{exam_specific_requirements}""",
+    "user": _USER_PROMPT_HEADER + """請生成一篇關於「{topic}」的 {exam_type} 考試文章。
+
+Generate a {exam_type} reading passage about {topic} of approximately {word_count} words, 
+targeted at a difficulty level of {difficulty}.
+Structure the text into {paragraph_count} clear paragraphs."""
+}
+
+
+# 各考試類型的專屬寫作指令與要求，只在建立系統訊息時讀取
+_EXAM_SPECIFIC_INSTRUCTIONS = {
+    "TOEIC": "Use vocabulary and grammar patterns typical of TOEIC Part VII. Focus on realistic workplace and daily life scenarios. Avoid overly specialized technical terms and ensure the content is appropriate for business English learners.",
+    "GRE": "Use sophisticated vocabulary and complex sentence structures typical of GRE reading comprehension. Present academic arguments with logical reasoning and evidence-based conclusions.",
+    "IELTS": "Use clear, well-structured prose appropriate for IELTS Academic Reading. Balance accessibility with intellectual rigor, covering the topic in a comprehensive yet approachable manner.",
+    "SAT": "Create content suitable for SAT Reading passages, focusing on analytical reasoning and evidence-based thinking expected of college-bound students."
+}
+
+_EXAM_SPECIFIC_REQUIREMENTS = {
+    "TOEIC": """- Clear topic sentences for each paragraph
+- Practical business vocabulary appropriate for the topic
+- Realistic scenarios related to the topic
+- Appropriate sentence complexity for the target TOEIC level
+- Professional tone suitable for workplace contexts""",
+    "GRE": """- Academic vocabulary and terminology relevant to the topic
+- Complex sentence structures with varied syntax
+- Logical argument development with supporting evidence
+- Analytical depth appropriate for graduate-level study
+- Formal academic tone and style""",
+    "IELTS": """- Clear main ideas with supporting details
+- Varied vocabulary relevant to the topic
+- Logical paragraph structure with smooth transitions
+- Balanced presentation of different perspectives
+- International English style avoiding regional idioms""",
+    "SAT": """- College-level vocabulary in context
+- Clear argumentative or informational structure
+- Evidence-based reasoning and examples
+- Appropriate complexity for high school students
+- Formal but accessible academic tone"""
+}
+
+
+@lru_cache(maxsize=1024)
+def _build_user_prompt(
+    exam_type: str,
+    topic: str,
+    difficulty: str,
+    word_count: int,
+    paragraph_count: int,
+    style: Optional[str],
+    focus_points: Optional[Tuple[str, ...]]
+) -> str:
+    """組合使用者訊息，相同參數重用已建立的字串；focus_points 以 tuple 傳入以便雜湊"""
+    user_prompt = _BASE_TEMPLATE["user"].format(
+        exam_type=exam_type,
+        topic=topic,
+        word_count=word_count,
+        paragraph_count=paragraph_count,
+        difficulty=difficulty
+    )
+    
+    # 添加可選參數
+    if style:
+        user_prompt += f"\n寫作風格：{style}"
+    
+    if focus_points:
+        points_text = "、".join(focus_points)
+        user_prompt += f"\n\n請特別關注以下要點：{points_text}"
+    
+    return user_prompt
+
+
 class TemplateService:
     """動態模板管理服務"""
     
-    def __init__(self):
-        """初始化模板服務"""
-        self.config_path = Path("configs/exam_configs.json")
-        self.exam_configs = self._load_exam_configs()
-    
-    def _load_exam_configs(self) -> Dict[str, Any]:
-        """載入考試配置文件"""
-        try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            raise ValidationError(f"考試配置文件不存在: {self.config_path}")
-        except json.JSONDecodeError as e:
-            raise ValidationError(f"考試配置文件格式錯誤: {str(e)}")
+    def __init__(self, exam_configs: Optional[Dict[str, Any]] = None):
+        """初始化模板服務，未傳入考試配置時從配置文件載入"""
+        self.config_path = EXAM_CONFIG_PATH
+        self.exam_configs = exam_configs if exam_configs is not None else load_exam_configs(self.config_path)
+        # 考試類型 -> 系統訊息
+        self._system_messages: Dict[str, str] = {}
     
     def build_dynamic_template(
         self,
@@ -40,98 +142,44 @@ class TemplateService:
         if exam_type not in self.exam_configs["exam_types"]:
             raise ValidationError(f"不支援的考試類型: {exam_type}")
         
-        exam_config = self.exam_configs["exam_types"][exam_type]
-        
-        # 建立基礎模板
-        base_template = self._get_base_template(exam_type, topic, word_count, paragraph_count)
-        
-        # 添加考試特定指令
-        exam_specific = self._get_exam_specific_instructions(exam_type, exam_config)
-        
-        # 添加考試特定要求
-        exam_requirements = self._get_exam_specific_requirements(exam_type, topic)
+        # 系統訊息只依考試類型而定，作為各請求共用的固定前綴以利提供商的 prompt 快取；
+        # 主題、字數等每次請求不同的內容一律放在使用者訊息的任務分隔標記之後
+        system_message = self._get_system_message(exam_type)
         
-        # 組合最終模板
-        system_message = base_template["system"].format(
-            exam_type=exam_type,
-            topic=topic,
-            word_count=word_count,
-            paragraph_count=paragraph_count,
-            difficulty=difficulty,
-            exam_specific_instructions=exam_specific,
-            exam_specific_requirements=exam_requirements
+        user_prompt = _build_user_prompt(
+            exam_type, topic, difficulty, word_count, paragraph_count,
+            style, tuple(focus_points) if focus_points else None
         )
         
-        user_prompt = base_template["user"].format(
-            exam_type=exam_type,
-            topic=topic
-        )
-        
-        # 添加可選參數
-        if style:
-            system_message += f"\n- 寫作風格：{style}"
-        
-        if focus_points:
-            points_text = "、".join(focus_points)
-            user_prompt += f"\n\n請特別關注以下要點：{points_text}"
-        
-        user_prompt += "\n\n請直接輸出文章內容，不需要標題或額外說明。"
-        
         return {
             "system_message": system_message,
-            "user_prompt": user_prompt
+            "user_prompt": user_prompt,
+            "cache_key": f"exam:{exam_type}"
         }
     
-    def _get_base_template(self, exam_type: str, topic: str, word_count: int, paragraph_count: int) -> Dict[str, str]:
+    def _get_system_message(self, exam_type: str) -> str:
+        """取得考試類型的系統訊息，首次建立後快取重用"""
+        system_message = self._system_messages.get(exam_type)
+        if system_message is None:
+            system_message = self._get_base_template()["system"].format(
+                exam_type=exam_type,
+                exam_specific_instructions=self._get_exam_specific_instructions(exam_type),
+                exam_specific_requirements=self._get_exam_specific_requirements(exam_type)
+            )
+            self._system_messages[exam_type] = system_message
+        return system_message
+    
+    def _get_base_template(self) -> Dict[str, str]:
         """獲取基礎模板"""
-        return {
-            "system": """Generate a {exam_type} reading passage about {topic} of approximately {word_count} words, 
-targeted at a difficulty level of {difficulty}.
-
-Structure the text into {paragraph_count} clear paragraphs with content appropriate for {exam_type} test format.
-
-{exam_specific_instructions}
-
-The article should include:
-{exam_specific_requirements}""",
-            "user": "請生成一篇關於「{topic}」的 {exam_type} 考試文章。"
-        }
+        return _BASE_TEMPLATE
     
-    def _get_exam_specific_instructions(self, exam_type: str, exam_config: Dict[str, Any]) -> str:
+    def _get_exam_specific_instructions(self, exam_type: str) -> str:
         """獲取考試特定指令"""
-        instructions = {
-            "TOEIC": "Use vocabulary and grammar patterns typical of TOEIC Part VII. Focus on realistic workplace and daily life scenarios. Avoid overly specialized technical terms and ensure the content is appropriate for business English learners.",
-            "GRE": "Use sophisticated vocabulary and complex sentence structures typical of GRE reading comprehension. Present academic arguments with logical reasoning and evidence-based conclusions.",
-            "IELTS": "Use clear, well-structured prose appropriate for IELTS Academic Reading. Balance accessibility with intellectual rigor, covering the topic in a comprehensive yet approachable manner.",
-            "SAT": "Create content suitable for SAT Reading passages, focusing on analytical reasoning and evidence-based thinking expected of college-bound students."
-        }
-        return instructions.get(exam_type, "")
+        return _EXAM_SPECIFIC_INSTRUCTIONS.get(exam_type, "")
     
-    def _get_exam_specific_requirements(self, exam_type: str, topic: str) -> str:
+    def _get_exam_specific_requirements(self, exam_type: str) -> str:
         """獲取考試特定要求"""
-        requirements = {
-            "TOEIC": f"""- Clear topic sentences for each paragraph
-- Practical business vocabulary appropriate for the topic
-- Realistic scenarios related to {topic}
-- Appropriate sentence complexity for the target TOEIC level
-- Professional tone suitable for workplace contexts""",
-            "GRE": f"""- Academic vocabulary and terminology relevant to {topic}
-- Complex sentence structures with varied syntax
-- Logical argument development with supporting evidence
-- Analytical depth appropriate for graduate-level study
-- Formal academic tone and style""",
-            "IELTS": f"""- Clear main ideas with supporting details
-- Varied vocabulary relevant to {topic}
-- Logical paragraph structure with smooth transitions
-- Balanced presentation of different perspectives
-- International English style avoiding regional idioms""",
-            "SAT": f"""- College-level vocabulary in context
-- Clear argumentative or informational structure
-- Evidence-based reasoning and examples
-- Appropriate complexity for high school students
-- Formal but accessible academic tone"""
-        }
-        return requirements.get(exam_type, "")
+        return _EXAM_SPECIFIC_REQUIREMENTS.get(exam_type, "")
     
     def get_available_templates(self) -> Dict[str, List[str]]:
         """獲取可用的模板類型"""
@@ -175,5 +223,5 @@ The article should include:
         return True
 
 
-# 全域模板服務實例
-template_service = TemplateService()
\ No newline at end of file
+# 全域模板服務實例，與驗證器共用同一份考試配置
+template_service = TemplateService(get_exam_configs())
\ No newline at end of file
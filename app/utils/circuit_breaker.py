@@ -0,0 +1,65 @@
+"""提供商斷路器"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    連續失敗達門檻後短暫停止呼叫的斷路器
+
+    開啟後的 reset_timeout 秒內直接拒絕呼叫；時間到後放行一個探測請求並重新計時，
+    探測成功即關閉斷路器，失敗則維持開啟。failure_threshold 為 0 時不啟用。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """是否啟用斷路器"""
+        return self.failure_threshold > 0
+
+    @property
+    def is_open(self) -> bool:
+        """斷路器是否處於開啟狀態（含等待探測）"""
+        return self._failures >= self.failure_threshold > 0
+
+    def allow(self) -> bool:
+        """是否允許呼叫；開啟中且已到重試時間時放行一個探測請求"""
+        if not self.is_open:
+            return True
+
+        now = time.monotonic()
+        if now < self._opened_until:
+            return False
+
+        # 半開：放行本次呼叫作為探測，並重新計時避免同時放行多個請求
+        self._opened_until = now + self.reset_timeout
+        logger.info("%s 斷路器半開，放行探測請求", self.name.upper())
+        return True
+
+    def record_success(self) -> None:
+        """記錄成功，關閉斷路器"""
+        if self.is_open:
+            logger.info("%s 斷路器關閉", self.name.upper())
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        """記錄失敗，連續失敗達門檻時開啟斷路器"""
+        if not self.enabled:
+            return
+
+        self._failures += 1
+        if self._failures == self.failure_threshold:
+            self._opened_until = time.monotonic() + self.reset_timeout
+            logger.warning(
+                "%s 連續失敗 %d 次，斷路器開啟 %.0f 秒",
+                self.name.upper(), self._failures, self.reset_timeout
+            )
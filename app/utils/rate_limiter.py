@@ -0,0 +1,65 @@
+"""非同步請求速率限制"""
+
+import asyncio
+import time
+
+from app.core.config import settings
+
+
+class AsyncRateLimiter:
+    """
+    權杖桶限流器：每 period 秒最多放行 max_rate 個權杖
+
+    權杖依經過時間連續補充，桶滿時允許短暫突發；max_rate 為 0 時不限制。
+    等待中的呼叫依到達順序放行。
+    """
+
+    def __init__(self, max_rate: float, period: float = 60.0):
+        self.max_rate = max_rate
+        self.period = period
+        self._tokens = float(max_rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """是否啟用限流"""
+        return self.max_rate > 0
+
+    async def acquire(self, amount: float = 1) -> None:
+        """取得權杖，不足時等待補充"""
+        if not self.enabled:
+            return
+
+        # 單次需求超過桶容量時以桶容量計，避免永遠等不到
+        amount = min(amount, self.max_rate)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) * self.period / self.max_rate)
+
+    def _refill(self) -> None:
+        """依經過時間補充權杖"""
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.max_rate),
+            self._tokens + (now - self._updated) * self.max_rate / self.period
+        )
+        self._updated = now
+
+    async def __aenter__(self) -> "AsyncRateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+
+# 全域 LLM 請求限流器實例；由 LLMService._acquire_rate_limits 統一取用，Batch API 不受限
+llm_rate_limiter = AsyncRateLimiter(settings.llm_requests_per_minute)
+
+# 全域 LLM token 限流器實例，每次請求依預估 token 數取用
+llm_token_limiter = AsyncRateLimiter(settings.llm_tokens_per_minute)
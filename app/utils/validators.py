@@ -1,66 +1,150 @@
 """參數驗證工具"""
 
-import json
-import os
-from typing import Dict, List, Optional, Any
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Any
 
+from app.core.exam_configs import EXAM_CONFIG_PATH, get_exam_configs, load_exam_configs
 from app.core.exceptions import ValidationError, ExamTypeNotSupportedError
 
 
+@dataclass(frozen=True, slots=True)
+class ResolvedParams:
+    """驗證並套用預設值後的文章生成參數"""
+    
+    exam_type: str
+    topic: str
+    difficulty: str
+    word_count: int
+    paragraph_count: int
+    style: Optional[str]
+    focus_points: Optional[List[str]]
+    exam_info: Dict[str, Any]
+
+
 class ExamConfigValidator:
     """考試配置驗證器"""
     
-    def __init__(self):
-        """初始化驗證器，載入考試配置"""
-        self.config_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            "configs",
-            "exam_configs.json"
-        )
-        self.exam_configs = self._load_exam_configs()
-    
-    def _load_exam_configs(self) -> Dict[str, Any]:
-        """載入考試配置文件"""
-        try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            raise ValidationError(f"考試配置文件不存在: {self.config_path}")
-        except json.JSONDecodeError as e:
-            raise ValidationError(f"考試配置文件格式錯誤: {str(e)}")
+    def __init__(self, exam_configs: Optional[Dict[str, Any]] = None):
+        """初始化驗證器，未傳入考試配置時從配置文件載入"""
+        self.config_path = str(EXAM_CONFIG_PATH)
+        self.exam_configs = exam_configs if exam_configs is not None else load_exam_configs(self.config_path)
+        
+        # 難度與風格的集合只建立一次，驗證時以雜湊查詢
+        exam_types = self.exam_configs["exam_types"]
+        self._difficulties: Dict[str, FrozenSet[str]] = {
+            name: frozenset(config["supported_difficulties"]) for name, config in exam_types.items()
+        }
+        self._styles: Dict[str, FrozenSet[str]] = {
+            name: frozenset(config["writing_styles"]) for name, config in exam_types.items()
+        }
     
-    def validate_exam_type(self, exam_type: str) -> bool:
-        """驗證考試類型是否支援"""
-        if exam_type not in self.exam_configs["exam_types"]:
+    def _get_config(self, exam_type: str) -> Dict[str, Any]:
+        """取得考試類型的配置，不支援時拋出異常"""
+        config = self.exam_configs["exam_types"].get(exam_type)
+        if config is None:
             raise ExamTypeNotSupportedError(
                 f"不支援的考試類型: {exam_type}",
                 {"supported_types": list(self.exam_configs["exam_types"].keys())}
             )
+        return config
+    
+    def validate_exam_type(self, exam_type: str) -> bool:
+        """驗證考試類型是否支援"""
+        self._get_config(exam_type)
         return True
     
     def validate_difficulty(self, exam_type: str, difficulty: str) -> bool:
         """驗證難度等級是否有效"""
-        self.validate_exam_type(exam_type)
+        self._check_difficulty(exam_type, self._get_config(exam_type), difficulty)
+        return True
+    
+    def validate_topic(self, exam_type: str, topic: str) -> bool:
+        """驗證主題是否有效"""
+        self._check_topic(self._get_config(exam_type), topic)
+        return True
+    
+    def validate_word_count(self, exam_type: str, word_count: Optional[int]) -> int:
+        """驗證並返回字數要求"""
+        config = self._get_config(exam_type)
         
-        config = self.exam_configs["exam_types"][exam_type]
-        supported_difficulties = config["supported_difficulties"]
+        if word_count is None:
+            # 返回預設字數（使用中級難度的預設值）
+            default_word_counts = config["default_word_count"]
+            if "中級" in default_word_counts:
+                return default_word_counts["中級"]
+            else:
+                # 如果沒有中級，取第一個值
+                return list(default_word_counts.values())[0]
         
-        if difficulty not in supported_difficulties:
+        self._check_word_count(config, word_count)
+        return word_count
+    
+    def validate_style(self, exam_type: str, style: Optional[str]) -> bool:
+        """驗證寫作風格是否有效"""
+        if style is None:
+            return True
+        
+        self._check_style(exam_type, self._get_config(exam_type), style)
+        return True
+    
+    def resolve(
+        self,
+        exam_type: str,
+        topic: str,
+        difficulty: str,
+        word_count: Optional[int] = None,
+        paragraph_count: Optional[int] = None,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None
+    ) -> ResolvedParams:
+        """
+        一次驗證所有文章生成參數並套用預設值
+        
+        考試配置只查詢一次，驗證順序與錯誤訊息同各 validate_* 方法。
+        """
+        config = self._get_config(exam_type)
+        
+        self._check_topic(config, topic)
+        self._check_difficulty(exam_type, config, difficulty)
+        
+        if word_count is not None:
+            self._check_word_count(config, word_count)
+        else:
+            word_count = config["default_word_count"][difficulty]
+        
+        if paragraph_count is not None:
+            if paragraph_count < 1 or paragraph_count > 10:
+                raise ValidationError("段落數必須在 1-10 之間")
+        
+        if style is not None:
+            self._check_style(exam_type, config, style)
+        
+        return ResolvedParams(
+            exam_type=exam_type,
+            topic=topic,
+            difficulty=difficulty,
+            word_count=word_count,
+            paragraph_count=paragraph_count or 3,
+            style=style,
+            focus_points=focus_points,
+            exam_info=config
+        )
+    
+    def _check_difficulty(self, exam_type: str, config: Dict[str, Any], difficulty: str) -> None:
+        """依考試配置檢查難度等級"""
+        if difficulty not in self._difficulties[exam_type]:
             raise ValidationError(
                 f"{exam_type} 不支援的難度等級: {difficulty}",
                 {
                     "exam_type": exam_type,
                     "provided_difficulty": difficulty,
-                    "supported_difficulties": supported_difficulties
+                    "supported_difficulties": config["supported_difficulties"]
                 }
             )
-        return True
     
-    def validate_topic(self, exam_type: str, topic: str) -> bool:
-        """驗證主題是否有效"""
-        self.validate_exam_type(exam_type)
-        
-        config = self.exam_configs["exam_types"][exam_type]
+    @staticmethod
+    def _check_topic(config: Dict[str, Any], topic: str) -> None:
+        """依考試配置檢查主題長度"""
         validation_rules = config["validation_rules"]
         
         # 檢查主題長度
@@ -76,26 +160,12 @@ class ExamConfigValidator:
                 f"主題太長，最多允許 {validation_rules['topic_max_length']} 個字符",
                 {"topic": topic, "length": topic_length}
             )
-        
-        return True
     
-    def validate_word_count(self, exam_type: str, word_count: Optional[int]) -> int:
-        """驗證並返回字數要求"""
-        self.validate_exam_type(exam_type)
-        
-        config = self.exam_configs["exam_types"][exam_type]
+    @staticmethod
+    def _check_word_count(config: Dict[str, Any], word_count: int) -> None:
+        """依考試配置檢查字數範圍"""
         validation_rules = config["validation_rules"]
         
-        if word_count is None:
-            # 返回預設字數（使用中級難度的預設值）
-            default_word_counts = config["default_word_count"]
-            if "中級" in default_word_counts:
-                return default_word_counts["中級"]
-            else:
-                # 如果沒有中級，取第一個值
-                return list(default_word_counts.values())[0]
-        
-        # 驗證字數範圍
         if word_count < validation_rules["word_count_min"]:
             raise ValidationError(
                 f"字數太少，最少需要 {validation_rules['word_count_min']} 字",
@@ -107,35 +177,22 @@ class ExamConfigValidator:
                 f"字數太多，最多允許 {validation_rules['word_count_max']} 字",
                 {"word_count": word_count}
             )
-        
-        return word_count
     
-    def validate_style(self, exam_type: str, style: Optional[str]) -> bool:
-        """驗證寫作風格是否有效"""
-        if style is None:
-            return True
-        
-        self.validate_exam_type(exam_type)
-        
-        config = self.exam_configs["exam_types"][exam_type]
-        supported_styles = config["writing_styles"]
-        
-        if style not in supported_styles:
+    def _check_style(self, exam_type: str, config: Dict[str, Any], style: str) -> None:
+        """依考試配置檢查寫作風格"""
+        if style not in self._styles[exam_type]:
             raise ValidationError(
                 f"{exam_type} 不支援的寫作風格: {style}",
                 {
                     "exam_type": exam_type,
                     "provided_style": style,
-                    "supported_styles": supported_styles
+                    "supported_styles": config["writing_styles"]
                 }
             )
-        
-        return True
     
     def get_exam_info(self, exam_type: str) -> Dict[str, Any]:
         """獲取考試類型的詳細資訊"""
-        self.validate_exam_type(exam_type)
-        return self.exam_configs["exam_types"][exam_type]
+        return self._get_config(exam_type)
     
     def get_supported_exam_types(self) -> List[str]:
         """獲取所有支援的考試類型"""
@@ -143,12 +200,10 @@ class ExamConfigValidator:
     
     def get_default_word_count(self, exam_type: str, difficulty: str) -> int:
         """獲取預設字數"""
-        self.validate_exam_type(exam_type)
-        self.validate_difficulty(exam_type, difficulty)
-        
-        config = self.exam_configs["exam_types"][exam_type]
+        config = self._get_config(exam_type)
+        self._check_difficulty(exam_type, config, difficulty)
         return config["default_word_count"][difficulty]
 
 
-# 全域驗證器實例
-validator = ExamConfigValidator()
\ No newline at end of file
+# 全域驗證器實例，與模板服務共用同一份考試配置
+validator = ExamConfigValidator(get_exam_configs())
\ No newline at end of file
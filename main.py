@@ -6,41 +6,54 @@ import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 import asyncio
+import atexit
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import orjson
 import time
 
 from app.core.config import settings
 from app.core.exceptions import ArticleGeneratorException
 from app.api.routes.generate import router as generate_router
+from app.services.batching_scheduler import batching_scheduler
+from app.services.llm_service import llm_service
 
 
 # 確保日誌目錄存在
 os.makedirs("logs", exist_ok=True)
 
-# 配置結構化日誌
+# 配置結構化日誌：請求路徑上的日誌只放入佇列，
+# 由背景執行緒的 QueueListener 寫入終端與檔案，避免同步寫檔阻塞事件迴圈
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+log_listener = QueueListener(
+    log_queue,
+    logging.StreamHandler(),
+    logging.FileHandler("logs/app.log", encoding="utf-8"),
+    respect_handler_level=True
+)
+log_listener.start()
+# 監聽器與進程同生命週期；lifespan 可能在同一進程中執行多次（如測試），不在其中停止
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper()),
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("logs/app.log", encoding="utf-8")
-    ]
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
 
-# 全域信號量控制併發請求數
-request_semaphore = asyncio.Semaphore(settings.max_concurrent_requests)
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """應用程式生命週期管理"""
-    logger.info(f"啟動 {settings.app_name} v{settings.app_version}")
+    logger.info("啟動 %s v%s", settings.app_name, settings.app_version)
     
     # 啟動時的初始化邏輯
     try:
@@ -48,14 +61,25 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         if not settings.openai_api_key or settings.openai_api_key == "your_openai_api_key_here":
             logger.warning("OpenAI API 金鑰未正確設定，請檢查環境變數")
         
+        # 在當前事件迴圈上建立併發控制信號量，每次啟動（含各測試的 TestClient）各自獨立
+        app.state.request_semaphore = asyncio.Semaphore(settings.max_concurrent_requests)
+        
+        if settings.batching_enabled:
+            batching_scheduler.start()
+        
+        if settings.warmup_enabled:
+            await llm_service.warmup(timeout=settings.http_connect_timeout)
+        
         logger.info("應用程式初始化完成")
         yield
         
     except Exception as e:
-        logger.error(f"應用程式啟動失敗: {e}")
+        logger.error("應用程式啟動失敗: %s", e)
         raise
     finally:
         # 關閉時的清理邏輯
+        await batching_scheduler.stop()
+        await llm_service.aclose()
         logger.info("應用程式關閉")
 
 
@@ -65,64 +89,103 @@ app = FastAPI(
     description="支援多種考試類型的文章生成器，包括 TOEIC、IELTS、托福等",
     version=settings.app_version,
     debug=settings.debug,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# 設定 CORS
+# 設定 CORS，來源列表於啟動時由設定讀取
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # 在生產環境中應該限制來源
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 
-# 併發控制中間件
-@app.middleware("http")
-async def concurrency_control_middleware(request: Request, call_next):
-    """併發控制中間件"""
-    start_time = time.time()
+# 需要併發控制的生成 API 路徑前綴
+_GENERATE_PREFIX = "/api/v1/generate"
+
+
+class ConcurrencyControlMiddleware:
+    """
+    併發控制中間件（純 ASGI）
     
-    # 對於生成 API 端點進行併發控制
-    if request.url.path.startswith("/api/v1/generate"):
-        async with request_semaphore:
-            response = await call_next(request)
-    else:
-        response = await call_next(request)
+    只處理生成 API 端點：以 app.state 上的信號量限制併發數並加上 X-Process-Time 標頭；
+    不經過 BaseHTTPMiddleware，避免每個請求額外建立任務與 Request/Response 物件。
+    """
     
-    # 添加回應時間標頭
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(round(process_time, 4))
+    def __init__(self, app: ASGIApp):
+        self.app = app
     
-    return response
+    @staticmethod
+    def _semaphore(scope: Scope) -> asyncio.Semaphore:
+        """取得 lifespan 建立的信號量；未經 lifespan 啟動時於首個請求補建"""
+        state = scope["app"].state
+        semaphore = getattr(state, "request_semaphore", None)
+        if semaphore is None:
+            semaphore = state.request_semaphore = asyncio.Semaphore(settings.max_concurrent_requests)
+        return semaphore
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 非生成端點（健康檢查、文件等）直接放行，不計時也不包裝 send
+        if scope["type"] != "http" or not scope["path"].startswith(_GENERATE_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        
+        async def send_with_process_time(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = f"{time.perf_counter() - start_time:.4f}".encode()
+                message["headers"] = [*message.get("headers", []), (b"x-process-time", process_time)]
+            await send(message)
+        
+        # 對於生成 API 端點進行併發控制
+        async with self._semaphore(scope):
+            await self.app(scope, receive, send_with_process_time)
+
+
+app.add_middleware(ConcurrencyControlMiddleware)
+# 壓縮放在併發控制外層，壓縮時不佔用生成端點的併發名額；SSE 串流不會被壓縮
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
 
 
 # 全域異常處理器
+# 自定義異常錯誤代碼對應的 HTTP 狀態碼，未列出者以 INVALID_ 前綴判斷為 422，其餘為 400
+_STATUS_BY_CODE = {
+    "CONFIGURATION_ERROR": 500,
+    "LLM_SERVICE_ERROR": 500,
+    "TEMPLATE_ERROR": 500,
+    "OPENAI_API_ERROR": 500,
+    "ARTICLE_GENERATION_ERROR": 500,
+    "GENERATION_TIMEOUT": 408
+}
+
+
 @app.exception_handler(ArticleGeneratorException)
 async def article_generator_exception_handler(request, exc: ArticleGeneratorException):
     """處理自定義異常"""
-    logger.error(
-        f"應用程式異常: {exc.message}",
-        extra={
-            "error_code": exc.error_code,
-            "details": exc.details,
-            "user_message": exc.user_message,
-            "request_path": str(request.url),
-            "request_method": request.method
-        }
-    )
+    # 日誌級別高於 ERROR 時略過 extra 字典的建立
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            "應用程式異常: %s",
+            exc.message,
+            extra={
+                "error_code": exc.error_code,
+                "details": exc.details,
+                "user_message": exc.user_message,
+                "request_path": request.url.path,
+                "request_method": request.method
+            }
+        )
     
     # 根據錯誤類型設置不同的狀態碼
-    status_code = 400
-    if exc.error_code in ["CONFIGURATION_ERROR", "LLM_SERVICE_ERROR", "TEMPLATE_ERROR"]:
-        status_code = 500
-    elif exc.error_code == "GENERATION_TIMEOUT":
-        status_code = 408
-    elif exc.error_code.startswith("INVALID_"):
-        status_code = 422
+    status_code = _STATUS_BY_CODE.get(exc.error_code)
+    if status_code is None:
+        status_code = 422 if exc.error_code.startswith("INVALID_") else 400
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={
             "success": False,
@@ -138,15 +201,17 @@ async def article_generator_exception_handler(request, exc: ArticleGeneratorExce
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc: HTTPException):
     """處理 HTTP 異常"""
-    logger.error(
-        f"HTTP 異常: {exc.detail}",
-        extra={
-            "status_code": exc.status_code,
-            "request_path": str(request.url),
-            "request_method": request.method
-        }
-    )
-    return JSONResponse(
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            "HTTP 異常: %s",
+            exc.detail,
+            extra={
+                "status_code": exc.status_code,
+                "request_path": request.url.path,
+                "request_method": request.method
+            }
+        )
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -162,16 +227,21 @@ async def http_exception_handler(request, exc: HTTPException):
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc: Exception):
     """處理一般異常"""
-    logger.error(
-        f"未預期的錯誤: {str(exc)}",
-        exc_info=True,
-        extra={
-            "exception_type": type(exc).__name__,
-            "request_path": str(request.url),
-            "request_method": request.method
-        }
-    )
-    return JSONResponse(
+    # 日誌級別高於 ERROR 時連同 traceback 格式化一併略過；QueueHandler 會在呼叫端執行緒格式化
+    # traceback，因此只在除錯模式或 DEBUG 級別時附上，其餘情況只記錄異常類型
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            "未預期的錯誤: %s: %s",
+            type(exc).__name__,
+            exc,
+            exc_info=settings.debug or logger.isEnabledFor(logging.DEBUG),
+            extra={
+                "exception_type": type(exc).__name__,
+                "request_path": request.url.path,
+                "request_method": request.method
+            }
+        )
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -188,34 +258,47 @@ async def general_exception_handler(request, exc: Exception):
 app.include_router(generate_router, prefix="/api/v1", tags=["文章生成"])
 
 
+# 健康檢查端點的回應內容在啟動後不變，預先序列化為 bytes 直接回傳
+_ROOT_BYTES = orjson.dumps({
+    "message": f"歡迎使用 {settings.app_name}",
+    "version": settings.app_version,
+    "status": "正常運行"
+})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "app_name": settings.app_name,
+    "version": settings.app_version
+})
+
+
 # 健康檢查端點
 @app.get("/", tags=["健康檢查"])
-async def root():
+async def root() -> Response:
     """根端點 - 健康檢查"""
-    return {
-        "message": f"歡迎使用 {settings.app_name}",
-        "version": settings.app_version,
-        "status": "正常運行"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health", tags=["健康檢查"])
-async def health_check():
+async def health_check() -> Response:
     """健康檢查端點"""
-    return {
-        "status": "healthy",
-        "app_name": settings.app_name,
-        "version": settings.app_version
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     
+    # 明確使用 uvicorn[standard] 提供的 uvloop 與 httptools，缺少時啟動即失敗（uvloop 不支援 Windows，改用 asyncio）；
+    # 多 worker 時每個進程各自持有快取與併發信號量
     uvicorn.run(
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         reload=settings.debug,
-        log_level=settings.log_level.lower()
+        workers=1 if settings.debug else settings.workers,
+        # 正式環境只輸出 uvicorn 的警告以上日誌，並略過每個請求都要格式化的存取日誌
+        log_level=settings.log_level.lower() if settings.debug else "warning",
+        access_log=settings.debug or settings.access_log
     )
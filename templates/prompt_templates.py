@@ -1,22 +1,13 @@
 """Prompt 模板定義"""
 
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 
-class PromptTemplates:
-    """提示模板類，包含各種考試類型的模板"""
-    
-    @staticmethod
-    def get_toeic_template(
-        topic: str,
-        difficulty: str,
-        word_count: int,
-        style: Optional[str] = None,
-        focus_points: Optional[List[str]] = None
-    ) -> Dict[str, str]:
-        """獲取 TOEIC 考試的提示模板"""
-        
-        system_message = f"""你是一個專業的 TOEIC 考試文章生成助手。請根據要求生成高質量的商務英語文章。
+# 各考試類型的系統訊息固定前綴，同一考試類型的所有請求逐位元組相同，
+# 讓提供商的 prompt 快取能重用整段前綴
+_STATIC_PREFIXES = {
+    "TOEIC": """你是一個專業的 TOEIC 考試文章生成助手。請根據要求生成高質量的商務英語文章。
 
 TOEIC 考試特點：
 - 注重商務和職場情境
@@ -26,38 +17,10 @@ TOEIC 考試特點：
 - 內容積極正面
 
 文章要求：
-- 難度等級：{difficulty}
-- 目標字數：約 {word_count} 字
 - 語言自然流暢，符合商務溝通標準
-- 結構完整，邏輯清晰"""
-
-        if style:
-            system_message += f"\n- 寫作風格：{style}"
-        
-        user_prompt = f"請生成一篇關於「{topic}」的 TOEIC 考試文章。"
-        
-        if focus_points:
-            points_text = "、".join(focus_points)
-            user_prompt += f"\n\n請特別關注以下要點：{points_text}"
-        
-        user_prompt += "\n\n請直接輸出文章內容，不需要標題或額外說明。"
-        
-        return {
-            "system_message": system_message,
-            "user_prompt": user_prompt
-        }
-
-    @staticmethod
-    def get_gre_template(
-        topic: str,
-        difficulty: str,
-        word_count: int,
-        style: Optional[str] = None,
-        focus_points: Optional[List[str]] = None
-    ) -> Dict[str, str]:
-        """獲取 GRE 考試的提示模板"""
-        
-        system_message = f"""你是一個專業的 GRE 考試文章生成助手。請根據要求生成高質量的學術英語文章。
+- 結構完整，邏輯清晰
+""",
+    "GRE": """你是一個專業的 GRE 考試文章生成助手。請根據要求生成高質量的學術英語文章。
 
 GRE 考試特點：
 - 學術詞彙豐富複雜
@@ -67,39 +30,11 @@ GRE 考試特點：
 - 適合研究生水準
 
 文章要求：
-- 難度等級：{difficulty}
-- 目標字數：約 {word_count} 字
 - 使用複雜的學術詞彙和句式結構
 - 呈現邏輯嚴謹的學術論證
-- 適合研究生入學考試標準"""
-
-        if style:
-            system_message += f"\n- 寫作風格：{style}"
-        
-        user_prompt = f"請生成一篇關於「{topic}」的 GRE 考試文章。"
-        
-        if focus_points:
-            points_text = "、".join(focus_points)
-            user_prompt += f"\n\n請特別關注以下要點：{points_text}"
-        
-        user_prompt += "\n\n請直接輸出文章內容，不需要標題或額外說明。"
-        
-        return {
-            "system_message": system_message,
-            "user_prompt": user_prompt
-        }
-    
-    @staticmethod
-    def get_ielts_template(
-        topic: str,
-        difficulty: str,
-        word_count: int,
-        style: Optional[str] = None,
-        focus_points: Optional[List[str]] = None
-    ) -> Dict[str, str]:
-        """獲取 IELTS 考試的提示模板"""
-        
-        system_message = f"""你是一個專業的 IELTS 考試文章生成助手。請根據要求生成高質量的學術英語文章。
+- 適合研究生入學考試標準
+""",
+    "IELTS": """你是一個專業的 IELTS 考試文章生成助手。請根據要求生成高質量的學術英語文章。
 
 IELTS 考試特點：
 - 學術性和正式性
@@ -109,38 +44,10 @@ IELTS 考試特點：
 - 觀點表達明確
 
 文章要求：
-- 難度等級：{difficulty}
-- 目標字數：約 {word_count} 字
 - 語言正式學術，符合 IELTS 標準
-- 論證邏輯清晰，結構完整"""
-
-        if style:
-            system_message += f"\n- 寫作風格：{style}"
-        
-        user_prompt = f"請生成一篇關於「{topic}」的 IELTS 考試文章。"
-        
-        if focus_points:
-            points_text = "、".join(focus_points)
-            user_prompt += f"\n\n請特別關注以下要點：{points_text}"
-        
-        user_prompt += "\n\n請直接輸出文章內容，不需要標題或額外說明。"
-        
-        return {
-            "system_message": system_message,
-            "user_prompt": user_prompt
-        }
-    
-    @staticmethod
-    def get_sat_template(
-        topic: str,
-        difficulty: str,
-        word_count: int,
-        style: Optional[str] = None,
-        focus_points: Optional[List[str]] = None
-    ) -> Dict[str, str]:
-        """獲取 SAT 考試的提示模板"""
-        
-        system_message = f"""你是一個專業的 SAT 考試文章生成助手。請根據要求生成高質量的學術英語文章。
+- 論證邏輯清晰，結構完整
+""",
+    "SAT": """你是一個專業的 SAT 考試文章生成助手。請根據要求生成高質量的學術英語文章。
 
 SAT 考試特點：
 - 大學預備水準
@@ -150,28 +57,107 @@ SAT 考試特點：
 - 正式學術語調
 
 文章要求：
-- 難度等級：{difficulty}
-- 目標字數：約 {word_count} 字
 - 使用大學水準詞彙
 - 清晰的論證或資訊結構
 - 基於證據的推理和例證
-- 適合高中生的複雜度"""
+- 適合高中生的複雜度
+"""
+}
+
+# 動態欄位一律接在固定前綴之後；不可在前綴中插入任何隨請求變動的內容，否則前綴快取失效
+_DYNAMIC_SUFFIX = "- 難度等級：{difficulty}\n- 目標字數：約 {word_count} 字{style_line}"
+
+_USER_TEMPLATE = "請生成一篇關於「{topic}」的 {exam_type} 考試文章。{focus_block}\n\n請直接輸出文章內容，不需要標題或額外說明。"
+
+
+@lru_cache(maxsize=1024)
+def _render_messages(
+    exam_type: str,
+    topic: str,
+    difficulty: str,
+    word_count: int,
+    style: Optional[str],
+    focus_points: Optional[Tuple[str, ...]]
+) -> Tuple[str, str]:
+    """組合系統訊息與使用者訊息，相同參數重用已建立的字串；focus_points 以 tuple 傳入以便雜湊"""
+    system_message = _STATIC_PREFIXES[exam_type] + _DYNAMIC_SUFFIX.format(
+        difficulty=difficulty,
+        word_count=word_count,
+        style_line=f"\n- 寫作風格：{style}" if style else ""
+    )
+    user_prompt = _USER_TEMPLATE.format(
+        topic=topic,
+        exam_type=exam_type,
+        focus_block=f"\n\n請特別關注以下要點：{'、'.join(focus_points)}" if focus_points else ""
+    )
+    return system_message, user_prompt
+
+
+def _render_template(
+    exam_type: str,
+    topic: str,
+    difficulty: str,
+    word_count: int,
+    style: Optional[str] = None,
+    focus_points: Optional[List[str]] = None
+) -> Dict[str, str]:
+    """以預先建立的模板組合提示，每次返回新的字典供呼叫端修改"""
+    system_message, user_prompt = _render_messages(
+        exam_type, topic, difficulty, word_count, style,
+        tuple(focus_points) if focus_points else None
+    )
+    return {
+        "system_message": system_message,
+        "user_prompt": user_prompt
+    }
 
-        if style:
-            system_message += f"\n- 寫作風格：{style}"
-        
-        user_prompt = f"請生成一篇關於「{topic}」的 SAT 考試文章。"
-        
-        if focus_points:
-            points_text = "、".join(focus_points)
-            user_prompt += f"\n\n請特別關注以下要點：{points_text}"
-        
-        user_prompt += "\n\n請直接輸出文章內容，不需要標題或額外說明。"
-        
-        return {
-            "system_message": system_message,
-            "user_prompt": user_prompt
-        }
+
+class PromptTemplates:
+    """提示模板類，包含各種考試類型的模板"""
+    
+    @staticmethod
+    def get_toeic_template(
+        topic: str,
+        difficulty: str,
+        word_count: int,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """獲取 TOEIC 考試的提示模板"""
+        return _render_template("TOEIC", topic, difficulty, word_count, style, focus_points)
+    
+    @staticmethod
+    def get_gre_template(
+        topic: str,
+        difficulty: str,
+        word_count: int,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """獲取 GRE 考試的提示模板"""
+        return _render_template("GRE", topic, difficulty, word_count, style, focus_points)
+    
+    @staticmethod
+    def get_ielts_template(
+        topic: str,
+        difficulty: str,
+        word_count: int,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """獲取 IELTS 考試的提示模板"""
+        return _render_template("IELTS", topic, difficulty, word_count, style, focus_points)
+    
+    @staticmethod
+    def get_sat_template(
+        topic: str,
+        difficulty: str,
+        word_count: int,
+        style: Optional[str] = None,
+        focus_points: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """獲取 SAT 考試的提示模板"""
+        return _render_template("SAT", topic, difficulty, word_count, style, focus_points)
     
     @staticmethod
     def get_template_by_exam_type(
@@ -184,20 +170,7 @@ SAT 考試特點：
     ) -> Dict[str, str]:
         """根據考試類型獲取對應的模板"""
         
-        template_map = {
-            "TOEIC": PromptTemplates.get_toeic_template,
-            "GRE": PromptTemplates.get_gre_template,
-            "IELTS": PromptTemplates.get_ielts_template,
-            "SAT": PromptTemplates.get_sat_template
-        }
-        
-        if exam_type not in template_map:
+        if exam_type not in _STATIC_PREFIXES:
             raise ValueError(f"不支援的考試類型: {exam_type}")
         
-        return template_map[exam_type](
-            topic=topic,
-            difficulty=difficulty,
-            word_count=word_count,
-            style=style,
-            focus_points=focus_points
-        )
\ No newline at end of file
+        return _render_template(exam_type, topic, difficulty, word_count, style, focus_points)
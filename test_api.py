@@ -4,14 +4,15 @@
 測試 /generate API 端點
 """
 
-import requests
 import json
 
+import httpx
+
 def test_generate_api():
     """測試文章生成 API"""
     
-    # API 端點
-    url = "http://localhost:8000/api/v1/generate"
+    # API 服務位址
+    base_url = "http://localhost:8000"
     
     # 測試數據
     test_data = {
@@ -29,12 +30,13 @@ def test_generate_api():
         print("測試 /generate API 端點...")
         print(f"請求數據: {json.dumps(test_data, ensure_ascii=False, indent=2)}")
         
-        response = requests.post(
-            url, 
-            json=test_data, 
-            headers=headers,
-            timeout=30
-        )
+        # 以 Client 共用連線池，擴充為多次請求時可重用連線
+        with httpx.Client(base_url=base_url, timeout=30.0) as client:
+            response = client.post(
+                "/api/v1/generate",
+                json=test_data,
+                headers=headers
+            )
         
         print(f"狀態碼: {response.status_code}")
         print(f"回應: {json.dumps(response.json(), ensure_ascii=False, indent=2)}")
@@ -44,7 +46,7 @@ def test_generate_api():
         else:
             print("❌ API 測試失敗!")
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ 請求失敗: {e}")
     except json.JSONDecodeError as e:
         print(f"❌ JSON 解析失敗: {e}")
@@ -0,0 +1,23 @@
+"""測試共用 fixture"""
+
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app():
+    """FastAPI 應用程式，整個測試階段只匯入一次；不需要應用程式的測試模組不會觸發 main 的匯入"""
+    from main import app as _app
+    return _app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """同步測試客戶端，整個測試階段共用並只執行一次 lifespan 啟動與關閉；停用連線預熱避免測試連外"""
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+
+    with patch.object(settings, "warmup_enabled", False):
+        with TestClient(app) as c:
+            yield c
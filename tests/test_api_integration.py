@@ -1,9 +1,19 @@
 """API 整合測試"""
 
+import asyncio
+from datetime import datetime
+
+import orjson
 import pytest
-from unittest.mock import patch
-from fastapi.testclient import TestClient
-from main import app
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+import httpx
+from httpx import ASGITransport, AsyncClient
+from openai import AsyncOpenAI
+from app.core.config import settings
+from app.core.exam_configs import get_exam_configs
+from app.services.article_cache import article_cache
+from app.services.llm_service import llm_service
 from app.core.exceptions import (
     LLMServiceError,
     GenerationTimeoutError,
@@ -11,377 +21,499 @@ from app.core.exceptions import (
 )
 
 
+# 以 pytest -n auto --dist=loadgroup 執行時，需要 FastAPI 應用程式的測試集中在同一個 worker
+pytestmark = pytest.mark.xdist_group("api_integration")
+
+
+# 生成端點測試共用的請求內容
+_BASE_REQUEST = {
+    "exam_type": "TOEIC",
+    "topic": "Business Meetings",
+    "difficulty": "Intermediate",
+    "word_count": 200,
+    "paragraph_count": 3
+}
+
+# 預先序列化的共用請求內容，相同請求直接以 content= 送出，不必每次重新編碼
+_BASE_BODY = orjson.dumps(_BASE_REQUEST)
+_JSON_HEADERS = {"content-type": "application/json"}
+
+# LLM 替身的預設回應
+_DEFAULT_LLM_RESPONSE = {
+    "content": "This is a test article about business meetings.",
+    "usage": {
+        "prompt_tokens": 50,
+        "completion_tokens": 100,
+        "total_tokens": 150
+    },
+    "model": "gpt-4o-mini-2024-07-18",
+    "provider": "openai",
+    "exam_type": "TOEIC",
+    "topic": "Business Meetings",
+    "difficulty": "Intermediate",
+    "target_word_count": 200,
+    "paragraph_count": 3,
+    "actual_word_count": 10
+}
+
+
+def _make_llm_response(**overrides):
+    """以預設回應為基礎建立 LLM 替身的回應"""
+    return {**_DEFAULT_LLM_RESPONSE, **overrides}
+
+
+# OpenAI Chat Completions API 的模擬回應
+_CHAT_COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 1735689600,
+    "model": "gpt-4o-mini-2024-07-18",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "This is a test article about business meetings."},
+            "finish_reason": "stop"
+        }
+    ],
+    "usage": {"prompt_tokens": 50, "completion_tokens": 100, "total_tokens": 150}
+}
+
+# 回應格式基準：生成時間固定後，成功回應的位元組內容（含欄位順序）應與此完全相同
+_FROZEN_NOW = datetime(2025, 1, 1, 9, 30)
+_GOLDEN_RESPONSE = orjson.dumps({
+    "success": True,
+    "article": "Test article",
+    "metadata": {
+        "exam_type": "TOEIC",
+        "topic": "Business Meetings",
+        "difficulty": "Intermediate",
+        "target_word_count": 200,
+        "target_paragraph_count": 3,
+        "actual_word_count": 2,
+        "generation_time": _FROZEN_NOW.isoformat(),
+        "provider": "openai",
+        "model": "gpt-4o-mini-2024-07-18",
+        "usage": _DEFAULT_LLM_RESPONSE["usage"],
+        "exam_info": {
+            "full_name": get_exam_configs()["exam_types"]["TOEIC"]["full_name"],
+            "description": get_exam_configs()["exam_types"]["TOEIC"]["description"]
+        }
+    },
+    "timestamp": _FROZEN_NOW
+})
+
+
 class TestAPIIntegration:
     """API 整合測試"""
     
+    @pytest_asyncio.fixture
+    async def client(self, app):
+        """測試客戶端，透過 ASGITransport 在測試的事件迴圈內直接呼叫應用程式，不經過執行緒轉交"""
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            yield c
+    
+    @pytest.fixture(scope="module", autouse=True)
+    def llm_stub(self):
+        """整個模組共用一個可設定的 generate_article 替身，避免每個測試重新 patch；模組結束時還原"""
+        stub = AsyncMock()
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(llm_service, "generate_article", stub)
+            yield stub
+    
+    @pytest.fixture(autouse=True)
+    def mock_generate(self, llm_stub):
+        """每個測試前重設替身的返回值、副作用與呼叫紀錄"""
+        llm_stub.reset_mock(return_value=True, side_effect=True)
+        return llm_stub
+    
     @pytest.fixture
-    def client(self):
-        """測試客戶端"""
-        return TestClient(app)
+    def openai_transport(self, llm_stub, monkeypatch):
+        """
+        以 httpx.MockTransport 攔截 OpenAI 的 HTTP 請求，返回送出的請求內容列表
+        
+        暫時移除 generate_article 替身，讓真實的服務、SDK 請求建構與回應解析都在測試中執行，不連網路
+        """
+        sent = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(orjson.loads(request.content))
+            return httpx.Response(200, json=_CHAT_COMPLETION)
+        
+        sdk_client = AsyncOpenAI(
+            api_key="test-key",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            max_retries=0
+        )
+        # 測試結束時 monkeypatch 還原替身與原本的 SDK 客戶端
+        monkeypatch.delattr(llm_service, "generate_article")
+        monkeypatch.setattr(llm_service.providers["openai"], "client", sdk_client)
+        return sent
     
-    def test_health_check(self, client):
-        """測試健康檢查端點"""
-        response = client.get("/")
-        assert response.status_code == 200
-        data = response.json()
+    @pytest.fixture(autouse=True)
+    def clear_article_cache(self):
+        """每個測試前清空文章快取，避免測試間互相影響"""
+        article_cache.clear()
+        yield
+        article_cache.clear()
+    
+    @pytest.mark.asyncio
+    async def test_health_endpoints(self, client):
+        """測試根路徑與健康狀態端點，兩個請求併發送出"""
+        root, health = await asyncio.gather(client.get("/"), client.get("/health"))
+        
+        assert root.status_code == 200
+        data = orjson.loads(root.content)
         assert "message" in data
         assert "version" in data
         assert "status" in data
         assert data["status"] == "正常運行"
-    
-    def test_health_endpoint(self, client):
-        """測試健康狀態端點"""
-        response = client.get("/health")
-        assert response.status_code == 200
-        data = response.json()
+        
+        assert health.status_code == 200
+        data = orjson.loads(health.content)
         assert data["status"] == "healthy"
         assert "app_name" in data
         assert "version" in data
     
-    def test_generate_article_success(self, client):
-        """測試成功生成文章"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.asyncio
+    async def test_process_time_header(self, client):
+        """測試只有生成端點的回應帶有處理時間標頭"""
+        response = await client.post("/api/v1/generate", json={})
+        assert response.status_code == 422
+        assert float(response.headers["x-process-time"]) >= 0
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.return_value = {
-                "content": "This is a test article about business meetings.",
-                "usage": {
-                    "prompt_tokens": 50,
-                    "completion_tokens": 100,
-                    "total_tokens": 150
-                },
-                "model": "gpt-4o-mini-2024-07-18",
-                "provider": "openai",
-                "exam_type": "TOEIC",
-                "topic": "Business Meetings",
-                "difficulty": "Intermediate",
-                "target_word_count": 200,
-                "paragraph_count": 3,
-                "actual_word_count": 10
-            }
+        response = await client.get("/health")
+        assert response.status_code == 200
+        assert "x-process-time" not in response.headers
+    
+    @pytest.mark.asyncio
+    async def test_request_semaphore_on_app_state(self, app, client):
+        """測試生成端點使用 app.state 上的併發信號量"""
+        await client.post("/api/v1/generate", json={})
+        assert isinstance(app.state.request_semaphore, asyncio.Semaphore)
+        assert app.state.request_semaphore._value == settings.max_concurrent_requests
+    
+    @pytest.mark.asyncio
+    async def test_service_health_and_exam_types(self, client):
+        """測試預先計算的服務健康狀態與考試類型端點"""
+        response = await client.get("/api/v1/health")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        data = orjson.loads(response.content)
+        assert data["status"] == "healthy"
+        assert "TOEIC" in data["supported_exam_types"]
+        assert "openai" in data["available_providers"]
+        
+        response = await client.get("/api/v1/exam-types")
+        assert response.status_code == 200
+        assert orjson.loads(response.content)["exam_types"] == data["supported_exam_types"]
+    
+    @pytest.mark.asyncio
+    async def test_static_endpoints_etag(self, client):
+        """測試靜態 GET 端點的 ETag 與 304 回應"""
+        for path in ["/api/v1/exam-types", "/api/v1/exam-types/TOEIC",
+                     "/api/v1/providers", "/api/v1/templates"]:
+            response = await client.get(path)
+            assert response.status_code == 200
+            assert response.headers["cache-control"] == "public, max-age=3600"
+            etag = response.headers["etag"]
             
-            response = client.post("/api/v1/generate", json=request_data)
+            response = await client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.content == b""
             
+            response = await client.get(path, headers={"If-None-Match": '"stale"'})
             assert response.status_code == 200
-            data = response.json()
-            assert data["success"] == True
-            assert "article" in data
-            assert data["article"] == "This is a test article about business meetings."
-            assert data["metadata"]["exam_type"] == "TOEIC"
-            assert data["metadata"]["topic"] == "Business Meetings"
     
-    def test_generate_article_invalid_exam_type(self, client):
-        """測試無效考試類型"""
-        request_data = {
-            "exam_type": "INVALID",
-            "topic": "Test Topic",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.asyncio
+    async def test_generate_article_success(self, client, openai_transport):
+        """測試成功生成文章，實際經過 LLM 服務與 OpenAI SDK 的請求與回應解析"""
+        response = await client.post("/api/v1/generate", content=_BASE_BODY, headers=_JSON_HEADERS)
         
-        response = client.post("/api/v1/generate", json=request_data)
+        assert response.status_code == 200
+        data = orjson.loads(response.content)
+        assert data["success"] == True
+        assert "article" in data
+        assert data["article"] == "This is a test article about business meetings."
+        assert data["metadata"]["exam_type"] == "TOEIC"
+        assert data["metadata"]["topic"] == "Business Meetings"
+        assert data["metadata"]["provider"] == "openai"
+        assert data["metadata"]["usage"] == _CHAT_COMPLETION["usage"]
         
-        assert response.status_code == 422
-        data = response.json()
-        # FastAPI 的 422 錯誤格式
-        assert "detail" in data
+        # 送出的請求使用設定的模型，並包含系統與使用者訊息
+        assert len(openai_transport) == 1
+        sent = openai_transport[0]
+        assert sent["model"] == llm_service.providers["openai"].model
+        assert [message["role"] for message in sent["messages"]] == ["system", "user"]
+        assert "Business Meetings" in sent["messages"][1]["content"]
     
-    def test_generate_article_missing_fields(self, client):
-        """測試缺少必要欄位"""
-        request_data = {
-            "exam_type": "TOEIC",
-            # 缺少 topic, difficulty 等
-        }
+    @pytest.mark.asyncio
+    async def test_generate_article_prompt_options(self, client, openai_transport):
+        """測試風格與重點實際寫入送往 OpenAI 的提示"""
+        request_data = {**_BASE_REQUEST, "style": "formal", "focus_points": ["agenda", "teamwork"]}
         
-        response = client.post("/api/v1/generate", json=request_data)
+        response = await client.post("/api/v1/generate", json=request_data)
         
-        assert response.status_code == 422
-        data = response.json()
-        assert "detail" in data or "error" in data
+        assert response.status_code == 200
+        user_prompt = openai_transport[0]["messages"][1]["content"]
+        assert "formal" in user_prompt
+        assert "agenda、teamwork" in user_prompt
     
-    def test_generate_article_invalid_word_count(self, client):
-        """測試無效字數"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 2000,  # 超過最大值
-            "paragraph_count": 3
+    @pytest.mark.asyncio
+    async def test_generate_article_gzip(self, client, mock_generate):
+        """測試較大的文章回應以 gzip 壓縮"""
+        request_data = {**_BASE_REQUEST, "topic": "Office Relocation"}
+        content = "The office will move to a new building next month. " * 40
+        
+        mock_generate.return_value = {
+            "content": content,
+            "usage": {"prompt_tokens": 50, "completion_tokens": 400, "total_tokens": 450},
+            "model": "gpt-4o-mini-2024-07-18",
+            "provider": "openai"
         }
         
-        response = client.post("/api/v1/generate", json=request_data)
+        response = await client.post(
+            "/api/v1/generate", json=request_data, headers={"Accept-Encoding": "gzip"}
+        )
         
-        assert response.status_code == 422
-        data = response.json()
-        # FastAPI 的 422 錯誤格式
-        assert "detail" in data
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert orjson.loads(response.content)["article"] == content
     
-    def test_generate_article_invalid_paragraph_count(self, client):
-        """測試無效段落數"""
+    @pytest.mark.asyncio
+    async def test_generate_article_cache_hit(self, client, mock_generate):
+        """測試相同請求命中快取，不再調用 LLM"""
         request_data = {
             "exam_type": "TOEIC",
             "topic": "Business Meetings",
             "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 15  # 超過最大值
+            "word_count": 200
+        }
+        
+        mock_generate.return_value = {
+            "content": "Cached article.",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+            "model": "gpt-4o-mini-2024-07-18",
+            "provider": "openai",
+            "actual_word_count": 2
         }
         
-        response = client.post("/api/v1/generate", json=request_data)
+        first = await client.post("/api/v1/generate", json=request_data)
+        # 段落數預設為 3，明確指定相同值也應命中
+        second = await client.post("/api/v1/generate", json={**request_data, "paragraph_count": 3})
         
-        assert response.status_code == 422
-        data = response.json()
-        # FastAPI 的 422 錯誤格式
-        assert "detail" in data
+        assert first.status_code == second.status_code == 200
+        assert orjson.loads(first.content) == orjson.loads(second.content)
+        mock_generate.assert_called_once()
     
-    def test_generate_article_llm_service_error(self, client):
-        """測試 LLM 服務錯誤"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.asyncio
+    async def test_invalid_requests_rejected(self, client, mock_generate):
+        """測試無效請求經由例外處理返回 422 且不呼叫 LLM；各欄位的驗證規則由 test_request_models 直接測試"""
+        requests = [
+            # 缺少 topic, difficulty 等必要欄位
+            client.post("/api/v1/generate", json={"exam_type": "TOEIC"}),
+            # 非 JSON 內容
+            client.post("/api/v1/generate", content="not json"),
+            # 空的批量請求
+            client.post("/api/v1/articles/batch", json={"requests": []})
+        ]
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.side_effect = LLMServiceError("Service unavailable")
-            
-            response = client.post("/api/v1/generate", json=request_data)
-            
-            assert response.status_code == 500
-            data = response.json()
-            assert data["success"] == False
-            assert "error" in data
-            assert data["error"]["code"] == "HTTP_ERROR"
+        responses = await asyncio.gather(*requests)
+        
+        for response in responses:
+            assert response.status_code == 422
+            data = orjson.loads(response.content)
+            # FastAPI 的 422 錯誤格式或應用程式的錯誤格式
+            assert "detail" in data or "error" in data
+        mock_generate.assert_not_called()
     
-    def test_generate_article_timeout_error(self, client):
-        """測試生成超時錯誤"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.parametrize(
+        "exc,expected_status,expected_code",
+        [
+            (LLMServiceError("Service unavailable"), 500, "LLM_SERVICE_ERROR"),
+            (GenerationTimeoutError(30), 408, "GENERATION_TIMEOUT"),
+            (OpenAIAPIError("API quota exceeded"), 500, "OPENAI_API_ERROR")
+        ],
+        ids=["llm_service_error", "timeout_error", "openai_error"]
+    )
+    @pytest.mark.asyncio
+    async def test_generate_article_error_mapping(self, client, mock_generate, exc, expected_status, expected_code):
+        """測試 LLM 錯誤對應的狀態碼與錯誤代碼"""
+        mock_generate.side_effect = exc
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.side_effect = GenerationTimeoutError(30)
-            
-            response = client.post("/api/v1/generate", json=request_data)
-            
-            assert response.status_code == 500
-            data = response.json()
-            assert data["success"] == False
-            assert "error" in data
-            assert data["error"]["code"] == "HTTP_ERROR"
+        response = await client.post("/api/v1/generate", content=_BASE_BODY, headers=_JSON_HEADERS)
+        
+        assert response.status_code == expected_status
+        data = orjson.loads(response.content)
+        assert data["success"] == False
+        assert "error" in data
+        assert data["error"]["code"] == expected_code
     
-    def test_generate_article_openai_error(self, client):
-        """測試 OpenAI API 錯誤"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.parametrize(
+        "request_extra,overrides",
+        [
+            (
+                {"provider": "gemini"},
+                {"content": "This is a test article generated by Gemini.", "model": "gemini-2.5-flash", "provider": "gemini"}
+            ),
+            (
+                {"style": "formal"},
+                {"content": "This is a formal business article.", "actual_word_count": 8}
+            ),
+            (
+                {"focus_points": ["agenda", "teamwork", "decision making"]},
+                {"content": "This article focuses on agenda, teamwork, and decision making.", "actual_word_count": 12}
+            )
+        ],
+        ids=["provider", "style", "focus_points"]
+    )
+    @pytest.mark.asyncio
+    async def test_generate_article_with_options(self, client, mock_generate, request_extra, overrides):
+        """測試指定提供商、風格或重點生成文章"""
+        mock_generate.return_value = _make_llm_response(**overrides)
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.side_effect = OpenAIAPIError("API quota exceeded")
-            
-            response = client.post("/api/v1/generate", json=request_data)
-            
-            assert response.status_code == 500
-            data = response.json()
-            assert data["success"] == False
-            assert "error" in data
-            assert data["error"]["code"] == "HTTP_ERROR"
+        response = await client.post("/api/v1/generate", json={**_BASE_REQUEST, **request_extra})
+        
+        assert response.status_code == 200
+        data = orjson.loads(response.content)
+        assert data["success"] == True
+        assert data["article"] == overrides["content"]
     
-    def test_generate_article_with_provider(self, client):
-        """測試指定提供商生成文章"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3,
-            "provider": "gemini"
-        }
+    @pytest.mark.asyncio
+    async def test_generate_article_stream(self, client):
+        """測試 SSE 串流生成文章"""
+        async def fake_stream():
+            for token in ["This is ", "a stream", "ed article."]:
+                yield token
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.return_value = {
-                "content": "This is a test article generated by Gemini.",
-                "usage": {
-                    "prompt_tokens": 45,
-                    "completion_tokens": 95,
-                    "total_tokens": 140
-                },
-                "model": "gemini-2.5-flash",
-                "provider": "gemini",
-                "exam_type": "TOEIC",
-                "topic": "Business Meetings",
-                "difficulty": "Intermediate",
-                "target_word_count": 200,
-                "paragraph_count": 3,
-                "actual_word_count": 10
-            }
+        with patch('app.services.llm_service.llm_service.generate_article_stream') as mock_stream:
+            mock_stream.return_value = fake_stream()
             
-            response = client.post("/api/v1/generate", json=request_data)
+            response = await client.post("/api/v1/generate/stream", content=_BASE_BODY, headers=_JSON_HEADERS)
             
             assert response.status_code == 200
-            data = response.json()
-            assert data["success"] == True
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = [e for e in response.text.split("\n\n") if e]
+            assert events[0] == 'data: {"token":"This is "}'
+            assert len(events) == 4
+            assert events[-1].startswith("event: done")
+            assert events[-1].endswith('"actual_word_count":5}')
     
-    def test_generate_article_with_style(self, client):
-        """測試指定風格生成文章"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3,
-            "style": "formal"
-        }
+    @pytest.mark.asyncio
+    async def test_generate_article_stream_error_event(self, client):
+        """測試串流途中失敗時送出 error 事件"""
+        async def failing_stream():
+            yield "partial "
+            raise LLMServiceError("Service unavailable")
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.return_value = {
-                "content": "This is a formal business article.",
-                "usage": {
-                    "prompt_tokens": 50,
-                    "completion_tokens": 100,
-                    "total_tokens": 150
-                },
-                "model": "gpt-4o-mini-2024-07-18",
-                "provider": "openai",
-                "exam_type": "TOEIC",
-                "topic": "Business Meetings",
-                "difficulty": "Intermediate",
-                "target_word_count": 200,
-                "paragraph_count": 3,
-                "actual_word_count": 8
-            }
+        with patch('app.services.llm_service.llm_service.generate_article_stream') as mock_stream:
+            mock_stream.return_value = failing_stream()
             
-            response = client.post("/api/v1/generate", json=request_data)
+            response = await client.post("/api/v1/generate/stream", content=_BASE_BODY, headers=_JSON_HEADERS)
             
             assert response.status_code == 200
-            data = response.json()
-            assert data["success"] == True
-            assert data["article"] == "This is a formal business article."
+            assert "event: error" in response.text
+            assert "LLM_SERVICE_ERROR" in response.text
+    
+    @pytest.mark.asyncio
+    async def test_generate_article_stream_unavailable_provider(self, client):
+        """測試串流時指定未設定的提供商，於回應開始前返回錯誤"""
+        with patch.dict('app.services.llm_service.llm_service.providers', clear=True):
+            response = await client.post("/api/v1/generate/stream?provider=gemini", content=_BASE_BODY, headers=_JSON_HEADERS)
+        
+        assert response.status_code == 500
+        assert orjson.loads(response.content)["error"]["code"] == "LLM_SERVICE_ERROR"
+    
+    @pytest.mark.asyncio
+    async def test_generate_article_unknown_provider(self, client, mock_generate):
+        """測試未知的提供商在進入端點前即被拒絕"""
+        response = await client.post("/api/v1/generate?provider=unknown", content=_BASE_BODY, headers=_JSON_HEADERS)
+        
+        assert response.status_code == 422
+        mock_generate.assert_not_called()
     
-    def test_generate_article_with_focus_points(self, client):
-        """測試包含重點的文章生成"""
+    @pytest.mark.asyncio
+    async def test_generate_articles_batch(self, client, mock_generate):
+        """測試批量生成，單篇驗證失敗不影響其他文章"""
         request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3,
-            "focus_points": ["agenda", "teamwork", "decision making"]
+            "requests": [
+                _BASE_REQUEST,
+                {**_BASE_REQUEST, "topic": "Office Work", "difficulty": "Impossible"}
+            ]
         }
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.return_value = {
-                "content": "This article focuses on agenda, teamwork, and decision making.",
-                "usage": {
-                    "prompt_tokens": 60,
-                    "completion_tokens": 120,
-                    "total_tokens": 180
-                },
-                "model": "gpt-4o-mini-2024-07-18",
-                "provider": "openai",
-                "exam_type": "TOEIC",
-                "topic": "Business Meetings",
-                "difficulty": "Intermediate",
-                "target_word_count": 200,
-                "paragraph_count": 3,
-                "actual_word_count": 12
-            }
-            
-            response = client.post("/api/v1/generate", json=request_data)
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] == True
+        mock_generate.return_value = {
+            "content": "Batch article.",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+            "model": "gpt-4o-mini-2024-07-18",
+            "provider": "openai",
+            "actual_word_count": 2
+        }
+        
+        response = await client.post("/api/v1/articles/batch", json=request_data)
+        
+        assert response.status_code == 200
+        data = orjson.loads(response.content)
+        assert data["total"] == 2
+        assert data["succeeded"] == 1
+        assert data["results"][0]["article"] == "Batch article."
+        assert data["results"][1]["success"] is False
+        assert data["results"][1]["error"]["code"] == "VALIDATION_ERROR"
+        mock_generate.assert_called_once()
     
-    def test_cors_headers(self, client):
+    @pytest.mark.asyncio
+    async def test_cors_headers(self, client, mock_generate):
         """測試 CORS 標頭"""
-        response = client.get("/api/v1/generate", headers={"Origin": "http://localhost:3000"})
+        mock_generate.return_value = _make_llm_response()
+        
+        response = await client.get("/api/v1/generate", headers={"Origin": "http://localhost:3000"})
         assert response.status_code == 405  # Method not allowed for GET
         
         # 測試正確的 POST 請求的 CORS
-        response = client.post("/api/v1/generate", 
-                             json={"exam_type": "TOEIC", "topic": "Test", "difficulty": "Intermediate"},
+        response = await client.post("/api/v1/generate", 
+                             json={**_BASE_REQUEST, "topic": "Test"},
                              headers={"Origin": "http://localhost:3000"})
         # 這會失敗但應該有 CORS 標頭
         assert "access-control-allow-origin" in response.headers or response.status_code in [422, 500]
     
-    def test_content_type_validation(self, client):
-        """測試內容類型驗證"""
-        # 測試非 JSON 內容
-        response = client.post("/api/v1/generate", data="not json")
-        assert response.status_code == 422
+    @pytest.mark.asyncio
+    async def test_cors_only_allows_configured_origins(self, client):
+        """測試只有設定中的來源會取得 CORS 允許標頭"""
+        headers = {"Access-Control-Request-Method": "POST"}
+        
+        response = await client.options("/api/v1/generate", headers={**headers, "Origin": "http://localhost:3000"})
+        assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+        
+        response = await client.options("/api/v1/generate", headers={**headers, "Origin": "https://evil.example"})
+        assert "access-control-allow-origin" not in response.headers
     
-    def test_response_format_consistency(self, client):
-        """測試回應格式一致性"""
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "Business Meetings",
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.asyncio
+    async def test_cors_preflight_restricts_methods_and_headers(self, client):
+        """測試預檢請求只允許設定的方法與標頭"""
+        origin = {"Origin": "http://localhost:3000"}
         
-        with patch('app.services.llm_service.llm_service.generate_article') as mock_generate:
-            mock_generate.return_value = {
-                "content": "Test article",
-                "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
-                "model": "gpt-4o-mini-2024-07-18",
-                "provider": "openai",
-                "exam_type": "TOEIC",
-                "topic": "Business Meetings",
-                "difficulty": "Intermediate",
-                "target_word_count": 200,
-                "paragraph_count": 3,
-                "actual_word_count": 2
-            }
-            
-            response = client.post("/api/v1/generate", json=request_data)
-            
-            assert response.status_code == 200
-            data = response.json()
-            
-            # 檢查必要欄位
-            assert "success" in data
-            assert "article" in data
-            assert "metadata" in data
-            
-            # 檢查數據結構
-            metadata = data["metadata"]
-            for field in ["exam_type", "topic", "difficulty", 
-                "target_word_count", "actual_word_count"]:
-                assert field in metadata
-                
+        response = await client.options(
+            "/api/v1/generate",
+            headers={**origin, "Access-Control-Request-Method": "POST", "Access-Control-Request-Headers": "content-type"}
+        )
+        assert response.status_code == 200
+        
+        response = await client.options("/api/v1/generate", headers={**origin, "Access-Control-Request-Method": "DELETE"})
+        assert response.status_code == 400
+        
+        response = await client.options(
+            "/api/v1/generate",
+            headers={**origin, "Access-Control-Request-Method": "POST", "Access-Control-Request-Headers": "x-custom"}
+        )
+        assert response.status_code == 400
     
-    def test_large_request_handling(self, client):
-        """測試大型請求處理"""
-        # 測試超大主題
-        request_data = {
-            "exam_type": "TOEIC",
-            "topic": "A" * 1000,  # 超長主題
-            "difficulty": "Intermediate",
-            "word_count": 200,
-            "paragraph_count": 3
-        }
+    @pytest.mark.asyncio
+    async def test_response_format_consistency(self, client, mock_generate):
+        """測試回應格式一致性：固定生成時間後，回應位元組與欄位順序須與基準完全相同"""
+        mock_generate.return_value = _make_llm_response(content="Test article", actual_word_count=2)
         
-        response = client.post("/api/v1/generate", json=request_data)
+        with patch("app.services.article_generator.datetime") as mock_datetime:
+            mock_datetime.now.return_value = _FROZEN_NOW
+            response = await client.post("/api/v1/generate", content=_BASE_BODY, headers=_JSON_HEADERS)
         
-        assert response.status_code == 422
-        data = response.json()
-        # FastAPI 的 422 錯誤格式
-        assert "detail" in data
\ No newline at end of file
+        assert response.status_code == 200
+        assert response.content == _GOLDEN_RESPONSE
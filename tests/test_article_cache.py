@@ -0,0 +1,123 @@
+"""測試文章生成結果快取"""
+
+import pytest
+from unittest.mock import patch
+from app.services.article_cache import ArticleCache
+
+
+BASE_PARAMS = {
+    "exam_type": "TOEIC",
+    "topic": "Business Meetings",
+    "difficulty": "Intermediate",
+    "word_count": 200,
+    "paragraph_count": 3,
+    "style": None,
+    "focus_points": None,
+    "provider": "openai"
+}
+
+
+class TestArticleCache:
+    """測試兩層文章快取"""
+    
+    @pytest.fixture
+    def cache(self):
+        """測試用快取"""
+        return ArticleCache(max_entries=2, ttl=60, semantic_threshold=0.9)
+    
+    def test_exact_match_hit(self, cache):
+        """測試精確比對命中"""
+        cache.set(BASE_PARAMS, {"article": "cached"})
+        assert cache.get(dict(BASE_PARAMS)) == {"article": "cached"}
+    
+    def test_miss_on_different_parameters(self, cache):
+        """測試非主題參數不同時不命中"""
+        cache.set(BASE_PARAMS, {"article": "cached"})
+        assert cache.get({**BASE_PARAMS, "word_count": 300}) is None
+        assert cache.get({**BASE_PARAMS, "provider": "gemini"}) is None
+    
+    def test_semantic_match_hit(self, cache):
+        """測試主題相近時以語意相似度命中"""
+        cache.set(BASE_PARAMS, {"article": "cached"})
+        assert cache.get({**BASE_PARAMS, "topic": "business meetings!"}) == {"article": "cached"}
+    
+    def test_semantic_match_below_threshold(self, cache):
+        """測試主題差異過大時不命中"""
+        cache.set(BASE_PARAMS, {"article": "cached"})
+        assert cache.get({**BASE_PARAMS, "topic": "Office Work"}) is None
+    
+    def test_semantic_match_disabled(self):
+        """測試門檻設為 1 以上時停用語意比對"""
+        cache = ArticleCache(semantic_threshold=1.0)
+        cache.set(BASE_PARAMS, {"article": "cached"})
+        assert cache.get({**BASE_PARAMS, "topic": "business meetings!"}) is None
+    
+    @pytest.mark.parametrize("topic", [
+        "Dogs are better than cats",
+        "Cats are not better than dogs"
+    ])
+    def test_default_cache_rejects_permuted_and_negated_topics(self, topic):
+        """測試預設設定下詞序調換或加上否定的主題不會命中其他主題的文章"""
+        cache = ArticleCache()
+        params = {**BASE_PARAMS, "topic": "Cats are better than dogs"}
+        cache.set(params, {"metadata": {"topic": params["topic"]}})
+        
+        assert cache.get({**BASE_PARAMS, "topic": topic}) is None
+    
+    def test_semantic_cache_disabled_by_default(self):
+        """測試詞頻語意快取預設停用"""
+        from app.core.config import Settings
+        
+        assert Settings.model_fields["semantic_cache_threshold"].default >= 1
+    
+    def test_embedding_match_hit(self, cache):
+        """測試用詞不同但嵌入向量相近時命中"""
+        cache.set(BASE_PARAMS, {"article": "cached"}, embedding=[1.0, 0.0, 0.1])
+        params = {**BASE_PARAMS, "topic": "Team Discussions"}
+        assert cache.get(params) is None
+        assert cache.get_by_embedding(params, [0.9, 0.05, 0.1]) == {"article": "cached"}
+    
+    def test_embedding_match_below_threshold(self, cache):
+        """測試嵌入向量差異過大或分區不同時不命中"""
+        cache.set(BASE_PARAMS, {"article": "cached"}, embedding=[1.0, 0.0, 0.0])
+        params = {**BASE_PARAMS, "topic": "Office Work"}
+        assert cache.get_by_embedding(params, [0.0, 1.0, 0.0]) is None
+        assert cache.get_by_embedding({**params, "word_count": 300}, [1.0, 0.0, 0.0]) is None
+    
+    def test_evicted_entry_drops_embedding(self, cache):
+        """測試淘汰項目時一併移除嵌入向量"""
+        cache.set({**BASE_PARAMS, "word_count": 100}, {"article": "1"}, embedding=[1.0, 0.0])
+        cache.set({**BASE_PARAMS, "word_count": 200}, {"article": "2"})
+        cache.set({**BASE_PARAMS, "word_count": 300}, {"article": "3"})
+        
+        assert cache.get_by_embedding({**BASE_PARAMS, "word_count": 100}, [1.0, 0.0]) is None
+        assert cache._embeddings == {}
+    
+    def test_lru_eviction(self, cache):
+        """測試超過容量時淘汰最久未使用的項目"""
+        first = {**BASE_PARAMS, "word_count": 100}
+        second = {**BASE_PARAMS, "word_count": 200}
+        third = {**BASE_PARAMS, "word_count": 300}
+        cache.set(first, {"article": "1"})
+        cache.set(second, {"article": "2"})
+        cache.get(first)
+        cache.set(third, {"article": "3"})
+        
+        assert len(cache) == 2
+        assert cache.get(second) is None
+        assert cache.get(first) == {"article": "1"}
+        assert cache.get(third) == {"article": "3"}
+    
+    def test_expired_entry(self, cache):
+        """測試過期項目不會被返回"""
+        with patch("app.services.article_cache.time.monotonic", return_value=1000.0):
+            cache.set(BASE_PARAMS, {"article": "cached"})
+        with patch("app.services.article_cache.time.monotonic", return_value=1061.0):
+            assert cache.get(BASE_PARAMS) is None
+        assert len(cache) == 0
+    
+    def test_clear(self, cache):
+        """測試清空快取"""
+        cache.set(BASE_PARAMS, {"article": "cached"})
+        cache.clear()
+        assert cache.get(BASE_PARAMS) is None
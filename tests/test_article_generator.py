@@ -0,0 +1,110 @@
+"""測試文章生成器"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.article_generator import article_generator
+from app.services.article_cache import article_cache
+from app.core.exceptions import LLMServiceError, ValidationError
+
+
+class TestInflightDeduplication:
+    """測試相同參數的併發請求合併"""
+
+    @pytest.fixture(autouse=True)
+    def clear_article_cache(self):
+        """測試前後清空文章快取"""
+        article_cache.clear()
+        yield
+        article_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_one_call(self):
+        """測試相同參數的併發請求只調用一次 LLM，不同參數各自調用"""
+        async def fake_generate(**params):
+            await asyncio.sleep(0.01)
+            return {"content": f"Article about {params['topic']}", "provider": "openai"}
+
+        request = {"exam_type": "TOEIC", "topic": "Business Meetings", "difficulty": "Intermediate"}
+        with patch('app.services.llm_service.llm_service.generate_article',
+                   side_effect=fake_generate) as mock_generate:
+            results = await asyncio.gather(
+                article_generator.generate_article(**request),
+                article_generator.generate_article(**request),
+                article_generator.generate_article(**{**request, "topic": "Office Work"})
+            )
+
+        assert mock_generate.call_count == 2
+        assert results[0] == results[1]
+        assert results[2]["article"] == "Article about Office Work"
+        assert article_generator._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_shared_failure_reaches_all_callers(self):
+        """測試共用的生成失敗時所有等待者都收到錯誤"""
+        async def failing_generate(**params):
+            await asyncio.sleep(0.01)
+            raise LLMServiceError("Service unavailable")
+
+        request = {"exam_type": "TOEIC", "topic": "Business Meetings", "difficulty": "Intermediate"}
+        with patch('app.services.llm_service.llm_service.generate_article',
+                   side_effect=failing_generate) as mock_generate:
+            results = await asyncio.gather(
+                article_generator.generate_article(**request),
+                article_generator.generate_article(**request),
+                return_exceptions=True
+            )
+
+        assert mock_generate.call_count == 1
+        assert all(isinstance(result, LLMServiceError) for result in results)
+
+
+class TestBatchGeneration:
+    """測試批次生成的逐筆驗證"""
+
+    @pytest.mark.asyncio
+    async def test_unsupported_keys_fail_only_their_item(self):
+        """測試單筆請求含 provider 或未知參數時僅該筆記錄 ValidationError"""
+        request = {"exam_type": "TOEIC", "topic": "Business Meetings", "difficulty": "Intermediate"}
+        with patch('app.services.llm_service.llm_service.generate_articles_batch',
+                   return_value=[{"content": "Batch article", "provider": "openai"}]) as mock_batch:
+            results = await article_generator.generate_articles_batch([
+                request,
+                {**request, "provider": "gemini"},
+                {**request, "foo": 1},
+                {"exam_type": "TOEIC", "topic": "Business Meetings"}
+            ])
+
+        assert len(mock_batch.call_args.args[0]) == 1
+        assert results[0]["article"] == "Batch article"
+        assert all(isinstance(result, ValidationError) for result in results[1:])
+        assert results[1].details == {"unsupported": ["provider"]}
+        assert results[3].details == {"missing": ["difficulty"]}
+
+
+class TestGenerateMany:
+    """測試併發生成多篇文章"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """測試同時進行的生成數不超過上限，結果依輸入順序返回"""
+        running = 0
+        peak = 0
+
+        async def fake_generate(**params):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if params["topic"] == "bad":
+                raise LLMServiceError("Service unavailable")
+            return {"article": params["topic"]}
+
+        requests = [{"topic": str(i)} for i in range(6)] + [{"topic": "bad"}]
+        with patch.object(article_generator, 'generate_article', side_effect=fake_generate):
+            results = await article_generator.generate_many(requests, max_concurrency=2)
+
+        assert peak == 2
+        assert [r["article"] for r in results[:6]] == [str(i) for i in range(6)]
+        assert isinstance(results[6], LLMServiceError)
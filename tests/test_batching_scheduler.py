@@ -0,0 +1,86 @@
+"""測試 LLM 請求微批次排程"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.services.batching_scheduler import BatchingScheduler
+from app.core.exceptions import LLMServiceError
+
+
+class TestBatchingScheduler:
+    """測試微批次排程"""
+
+    @pytest.mark.asyncio
+    async def test_submit_without_worker_calls_directly(self):
+        """測試排程未啟動時直接調用 LLM 服務"""
+        scheduler = BatchingScheduler()
+
+        with patch('app.services.llm_service.llm_service.generate_article',
+                   new_callable=AsyncMock, return_value={"content": "direct"}) as mock_generate:
+            result = await scheduler.submit(exam_type="TOEIC", topic="Travel")
+
+            assert result == {"content": "direct"}
+            mock_generate.assert_called_once_with(exam_type="TOEIC", topic="Travel")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        """測試窗口內的併發請求合併為同一批次"""
+        scheduler = BatchingScheduler(window=0.05, max_batch_size=8)
+
+        async def fake_generate(**params):
+            return {"content": params["topic"]}
+
+        with patch('app.services.llm_service.llm_service.generate_article', side_effect=fake_generate):
+            with patch.object(scheduler, '_dispatch', wraps=scheduler._dispatch) as mock_dispatch:
+                scheduler.start()
+                try:
+                    results = await asyncio.gather(
+                        *(scheduler.submit(topic=f"topic-{i}") for i in range(3))
+                    )
+                finally:
+                    await scheduler.stop()
+
+            assert [r["content"] for r in results] == ["topic-0", "topic-1", "topic-2"]
+            mock_dispatch.assert_called_once()
+            assert len(mock_dispatch.call_args.args[0]) == 3
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self):
+        """測試超過批次上限時拆成多個批次"""
+        scheduler = BatchingScheduler(window=0.05, max_batch_size=2)
+
+        with patch('app.services.llm_service.llm_service.generate_article',
+                   new_callable=AsyncMock, return_value={"content": "ok"}):
+            with patch.object(scheduler, '_dispatch', wraps=scheduler._dispatch) as mock_dispatch:
+                scheduler.start()
+                try:
+                    await asyncio.gather(*(scheduler.submit(topic=str(i)) for i in range(5)))
+                finally:
+                    await scheduler.stop()
+
+            assert [len(call.args[0]) for call in mock_dispatch.call_args_list] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_returned_to_each_caller(self):
+        """測試批次中單一請求失敗只影響該呼叫端"""
+        scheduler = BatchingScheduler(window=0.05)
+
+        async def fake_generate(**params):
+            if params["topic"] == "bad":
+                raise LLMServiceError("Service unavailable")
+            return {"content": params["topic"]}
+
+        with patch('app.services.llm_service.llm_service.generate_article', side_effect=fake_generate):
+            scheduler.start()
+            try:
+                good, bad = await asyncio.gather(
+                    scheduler.submit(topic="good"),
+                    scheduler.submit(topic="bad"),
+                    return_exceptions=True
+                )
+            finally:
+                await scheduler.stop()
+
+        assert good == {"content": "good"}
+        assert isinstance(bad, LLMServiceError)
+        assert not scheduler.running
@@ -0,0 +1,98 @@
+"""測試提供商斷路器"""
+
+import pytest
+from unittest.mock import Mock, patch, AsyncMock
+from app.utils.circuit_breaker import CircuitBreaker
+from app.services.llm_service import LLMService
+from app.core.exceptions import GenerationTimeoutError, LLMServiceError
+
+
+class TestCircuitBreaker:
+    """測試斷路器狀態轉換"""
+
+    def test_opens_after_consecutive_failures(self):
+        """測試連續失敗達門檻後拒絕呼叫"""
+        breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=30)
+
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.is_open
+        assert not breaker.allow()
+
+    def test_success_resets_failure_count(self):
+        """測試成功後重新計算連續失敗次數"""
+        breaker = CircuitBreaker("openai", failure_threshold=2, reset_timeout=30)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.allow()
+
+    def test_half_open_allows_single_probe(self):
+        """測試開啟時間過後只放行一個探測請求，探測成功即關閉"""
+        breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30)
+
+        with patch("app.utils.circuit_breaker.time.monotonic", return_value=1000.0):
+            breaker.record_failure()
+        with patch("app.utils.circuit_breaker.time.monotonic", return_value=1031.0):
+            assert breaker.allow()
+            assert not breaker.allow()
+
+        breaker.record_success()
+        assert not breaker.is_open
+        assert breaker.allow()
+
+    def test_disabled_breaker_never_opens(self):
+        """測試門檻為 0 時不啟用"""
+        breaker = CircuitBreaker("openai", failure_threshold=0)
+
+        for _ in range(10):
+            breaker.record_failure()
+        assert breaker.allow()
+
+
+class TestProviderFailover:
+    """測試斷路器開啟時的提供商切換"""
+
+    @pytest.fixture
+    def service(self):
+        """兩個提供商皆可用的 LLM 服務"""
+        with patch('app.services.llm_service.settings') as mock_settings, \
+             patch('app.services.llm_service._CIRCUIT_FAILURE_THRESHOLD', 1):
+            mock_settings.generation_timeout = 30
+            mock_settings.default_llm_provider = "openai"
+            mock_settings.cache_enabled = False
+
+            service = LLMService()
+            openai_provider = Mock()
+            openai_provider.generate_completion = AsyncMock(side_effect=GenerationTimeoutError(30))
+            gemini_provider = Mock()
+            gemini_provider.generate_completion = AsyncMock(
+                return_value={"content": "From Gemini", "provider": "gemini"}
+            )
+            service.providers = {"openai": openai_provider, "gemini": gemini_provider}
+            yield service
+
+    @pytest.mark.asyncio
+    async def test_default_provider_fails_over(self, service):
+        """測試預設提供商斷路器開啟後改用其他提供商，不再呼叫故障的提供商"""
+        with pytest.raises(GenerationTimeoutError):
+            await service.generate_completion(prompt="Generate article")
+
+        result = await service.generate_completion(prompt="Generate article")
+
+        assert result["provider"] == "gemini"
+        assert service.providers["openai"].generate_completion.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_explicit_provider_is_not_replaced(self, service):
+        """測試明確指定的提供商斷路器開啟時直接拒絕"""
+        with pytest.raises(GenerationTimeoutError):
+            await service.generate_completion(prompt="Generate article", provider="openai")
+
+        with pytest.raises(LLMServiceError) as exc_info:
+            await service.generate_completion(prompt="Generate article", provider="openai")
+
+        assert exc_info.value.details["reason"] == "circuit_open"
+        service.providers["gemini"].generate_completion.assert_not_called()
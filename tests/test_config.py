@@ -1,35 +1,64 @@
 """測試配置管理"""
 
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import patch
 import os
+from pydantic import ValidationError
 from app.core.config import Settings
 
 
+# 測試期間停用 .env 前保存的原始配置
+_MODEL_CONFIG = Settings.model_config
+
+# 設定欄位對應的環境變數名稱（不區分大小寫）
+_SETTING_KEYS = frozenset(Settings.model_fields)
+
+
+def _use_env(monkeypatch, env_vars):
+    """只移除與設定欄位同名的環境變數並設定指定值，不複製整個 os.environ"""
+    for key in [key for key in os.environ if key.lower() in _SETTING_KEYS]:
+        monkeypatch.delenv(key)
+    for key, value in env_vars.items():
+        monkeypatch.setenv(key, value)
+
+
 class TestSettings:
     """測試配置設定"""
     
-    def test_default_settings(self):
+    @pytest.fixture(scope="module", autouse=True)
+    def ignore_env_file(self):
+        """停用 .env 讀取，測試結果只取決於測試設定的環境變數，也省去每次建立設定時的檔案讀取"""
+        with patch.object(Settings, "model_config", {**_MODEL_CONFIG, "env_file": None}):
+            yield
+    
+    @pytest.fixture(scope="module")
+    def default_settings(self):
+        """只設定最小環境變數的設定實例，整個模組的唯讀測試共用"""
+        with pytest.MonkeyPatch.context() as mp:
+            _use_env(mp, {"OPENAI_API_KEY": "test-key"})
+            return Settings()
+    
+    def test_default_settings(self, default_settings):
         """測試預設設定"""
-        with patch.dict(os.environ, {}, clear=True):
-            # 模擬最小環境變數
-            with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
-                settings = Settings()
-                assert settings.openai_api_key == "test-key"
-                assert settings.openai_model == "gpt-4o-mini-2024-07-18"
-                assert settings.gemini_model == "gemini-2.5-flash"
-                assert settings.default_llm_provider == "openai"
-                assert settings.app_name == "ArticleGenerator"
-                assert settings.app_version == "0.1.0"
-                assert settings.debug == True  # .env 文件中 DEBUG=true
-                assert settings.log_level == "INFO"
-                assert settings.api_host == "0.0.0.0"
-                assert settings.api_port == 8000
-                assert settings.max_article_length == 2000
-                assert settings.default_language == "zh-TW"
-                assert settings.generation_timeout == 30
+        settings = default_settings
+        expected = {
+            "openai_api_key": "test-key",
+            "openai_model": "gpt-4o-mini-2024-07-18",
+            "gemini_model": "gemini-2.5-flash",
+            "default_llm_provider": "openai",
+            "app_name": "ArticleGenerator",
+            "app_version": "0.2.0",
+            "debug": False,
+            "log_level": "INFO",
+            "api_host": "0.0.0.0",
+            "api_port": 8000,
+            "max_article_length": 2000,
+            "default_language": "zh-TW",
+            "generation_timeout": 30
+        }
+        assert {key: getattr(settings, key) for key in expected} == expected
     
-    def test_environment_variable_override(self):
+    def test_environment_variable_override(self, monkeypatch):
         """測試環境變數覆蓋"""
         env_vars = {
             "OPENAI_API_KEY": "test-openai-key",
@@ -48,41 +77,43 @@ class TestSettings:
             "GENERATION_TIMEOUT": "60"
         }
         
-        with patch.dict(os.environ, env_vars, clear=True):
-            settings = Settings()
-            assert settings.openai_api_key == "test-openai-key"
-            assert settings.gemini_api_key == "test-gemini-key"
-            assert settings.openai_model == "gpt-4"
-            assert settings.gemini_model == "gemini-2.0-pro"
-            assert settings.default_llm_provider == "gemini"
-            assert settings.app_name == "TestApp"
-            assert settings.app_version == "1.0.0"
-            assert settings.debug == True
-            assert settings.log_level == "DEBUG"
-            assert settings.api_host == "127.0.0.1"
-            assert settings.api_port == 9000
-            assert settings.max_article_length == 3000
-            assert settings.default_language == "en-US"
-            assert settings.generation_timeout == 60
+        _use_env(monkeypatch, env_vars)
+        settings = Settings()
+        expected = {
+            "openai_api_key": "test-openai-key",
+            "gemini_api_key": "test-gemini-key",
+            "openai_model": "gpt-4",
+            "gemini_model": "gemini-2.0-pro",
+            "default_llm_provider": "gemini",
+            "app_name": "TestApp",
+            "app_version": "1.0.0",
+            "debug": True,
+            "log_level": "DEBUG",
+            "api_host": "127.0.0.1",
+            "api_port": 9000,
+            "max_article_length": 3000,
+            "default_language": "en-US",
+            "generation_timeout": 60
+        }
+        assert {key: getattr(settings, key) for key in expected} == expected
     
-    def test_missing_required_fields(self):
+    def test_missing_required_fields(self, monkeypatch):
         """測試缺少必要欄位"""
-        with patch.dict(os.environ, {}, clear=True):
-            # OPENAI_API_KEY 是必要欄位，沒有設定應該要有預設值或錯誤
-            # 由於有 .env 文件，這裡可能會載入預設值
-            settings = Settings()
-            assert settings.openai_api_key is not None
+        _use_env(monkeypatch, {})
+        # OPENAI_API_KEY 是必要欄位，沒有設定時應驗證失敗
+        with pytest.raises(ValidationError):
+            Settings()
     
-    def test_field_validation(self):
+    def test_field_validation(self, monkeypatch):
         """測試欄位驗證"""
-        with patch.dict(os.environ, {
+        _use_env(monkeypatch, {
             "OPENAI_API_KEY": "test-key",
             "API_PORT": "invalid_port"
-        }, clear=True):
-            with pytest.raises(Exception):  # Pydantic validation error for invalid port
-                Settings()
+        })
+        with pytest.raises(Exception):  # Pydantic validation error for invalid port
+            Settings()
     
-    def test_case_insensitive_env_vars(self):
+    def test_case_insensitive_env_vars(self, monkeypatch):
         """測試環境變數不區分大小寫"""
         env_vars = {
             "openai_api_key": "test-key",
@@ -90,21 +121,21 @@ class TestSettings:
             "log_level": "debug"
         }
         
-        with patch.dict(os.environ, env_vars, clear=True):
-            settings = Settings()
-            assert settings.openai_api_key == "test-key"
-            assert settings.debug == True
-            assert settings.log_level == "debug"
+        _use_env(monkeypatch, env_vars)
+        settings = Settings()
+        assert settings.openai_api_key == "test-key"
+        assert settings.debug == True
+        assert settings.log_level == "debug"
     
-    def test_optional_fields(self):
+    def test_optional_fields(self, monkeypatch):
         """測試可選欄位"""
-        with patch.dict(os.environ, {
+        _use_env(monkeypatch, {
             "OPENAI_API_KEY": "test-key",
             "GEMINI_API_KEY": ""  # 設為空字串
-        }, clear=True):
-            settings = Settings()
-            # gemini_api_key 是可選的，但由於有 .env 文件，可能會有預設值
-            assert hasattr(settings, 'gemini_api_key')
+        })
+        settings = Settings()
+        # gemini_api_key 是可選的
+        assert hasattr(settings, 'gemini_api_key')
     
     def test_field_descriptions(self):
         """測試欄位描述"""
@@ -120,7 +151,7 @@ class TestSettings:
     
     def test_config_class_attributes(self):
         """測試配置類別屬性"""
-        config = Settings.model_config
+        config = _MODEL_CONFIG
         assert config.get("env_file") == ".env"
         assert config.get("env_file_encoding") == "utf-8"
         assert config.get("case_sensitive") == False
\ No newline at end of file
@@ -45,100 +45,60 @@ class TestArticleGeneratorException:
         assert exc.user_message == "User friendly message"
 
 
+# (異常類別, 位置參數, 關鍵字參數, 錯誤代碼, 應包含的詳細資訊, 使用者訊息應包含的片段, 是否須完全相同)
+_EXCEPTION_CASES = [
+    (ConfigurationError, ("Config missing",), {}, "CONFIGURATION_ERROR", {}, "系統配置錯誤，請聯絡管理員", True),
+    (LLMServiceError, ("API down",), {}, "LLM_SERVICE_ERROR", {}, "AI 服務暫時無法使用，請稍後再試", True),
+    (ValidationError, ("Invalid value",), {"field": "exam_type"}, "VALIDATION_ERROR", {"field": "exam_type"}, "Invalid value", False),
+    (
+        InvalidExamTypeError, ("INVALID", ["TOEIC", "GRE", "IELTS", "SAT"]), {}, "INVALID_EXAM_TYPE",
+        {"exam_type": "INVALID", "supported_types": ["TOEIC", "GRE", "IELTS", "SAT"]}, "INVALID", False
+    ),
+    (
+        InvalidTopicError, ("Art", "TOEIC", ["Business", "Technology"]), {}, "INVALID_TOPIC",
+        {"topic": "Art", "exam_type": "TOEIC", "supported_topics": ["Business", "Technology"]}, None, False
+    ),
+    (
+        InvalidDifficultyScoreError, (1000, "TOEIC", 10, 990), {}, "INVALID_DIFFICULTY_SCORE",
+        {"score": 1000, "exam_type": "TOEIC", "min_score": 10, "max_score": 990}, None, False
+    ),
+    (
+        InvalidWordCountError, (2000,), {}, "INVALID_WORD_COUNT",
+        {"word_count": 2000, "min_count": 50, "max_count": 1500}, None, False
+    ),
+    (
+        InvalidParagraphCountError, (15,), {}, "INVALID_PARAGRAPH_COUNT",
+        {"paragraph_count": 15, "min_count": 1, "max_count": 10}, None, False
+    ),
+    (OpenAIAPIError, ("Rate limit exceeded",), {}, "OPENAI_API_ERROR", {}, "AI 服務暫時無法使用，請稍後再試", True),
+    (GenerationTimeoutError, (30,), {}, "GENERATION_TIMEOUT", {"timeout_seconds": 30}, "30", False),
+    (
+        TemplateError, ("Template not found",), {"template_name": "toeic"}, "TEMPLATE_ERROR",
+        {"template_name": "toeic"}, "模板處理錯誤，請聯絡管理員", True
+    ),
+    (ArticleGenerationError, ("Generation failed",), {}, "ARTICLE_GENERATION_ERROR", {}, "文章生成失敗，請稍後再試", True),
+    (
+        APIError, ("Request failed",), {"status_code": 422}, "API_ERROR",
+        {"status_code": 422}, "API 請求處理失敗，請檢查請求參數", True
+    ),
+]
+
+
 class TestSpecificExceptions:
     """測試特定異常類"""
     
-    def test_configuration_error(self):
-        """測試配置錯誤異常"""
-        exc = ConfigurationError("Config missing")
-        assert exc.error_code == "CONFIGURATION_ERROR"
-        assert exc.user_message == "系統配置錯誤，請聯絡管理員"
-    
-    def test_llm_service_error(self):
-        """測試 LLM 服務異常"""
-        exc = LLMServiceError("API down")
-        assert exc.error_code == "LLM_SERVICE_ERROR"
-        assert exc.user_message == "AI 服務暫時無法使用，請稍後再試"
-    
-    def test_validation_error(self):
-        """測試驗證錯誤異常"""
-        exc = ValidationError("Invalid value", field="exam_type")
-        assert exc.error_code == "VALIDATION_ERROR"
-        assert exc.details["field"] == "exam_type"
-        assert "Invalid value" in exc.user_message
-    
-    def test_invalid_exam_type_error(self):
-        """測試無效考試類型異常"""
-        supported_types = ["TOEIC", "GRE", "IELTS", "SAT"]
-        exc = InvalidExamTypeError("INVALID", supported_types)
-        assert exc.error_code == "INVALID_EXAM_TYPE"
-        assert exc.details["exam_type"] == "INVALID"
-        assert exc.details["supported_types"] == supported_types
-        assert "INVALID" in exc.user_message
-    
-    def test_invalid_topic_error(self):
-        """測試無效主題異常"""
-        supported_topics = ["Business", "Technology"]
-        exc = InvalidTopicError("Art", "TOEIC", supported_topics)
-        assert exc.error_code == "INVALID_TOPIC"
-        assert exc.details["topic"] == "Art"
-        assert exc.details["exam_type"] == "TOEIC"
-        assert exc.details["supported_topics"] == supported_topics
-    
-    def test_invalid_difficulty_score_error(self):
-        """測試無效難度分數異常"""
-        exc = InvalidDifficultyScoreError(1000, "TOEIC", 10, 990)
-        assert exc.error_code == "INVALID_DIFFICULTY_SCORE"
-        assert exc.details["score"] == 1000
-        assert exc.details["exam_type"] == "TOEIC"
-        assert exc.details["min_score"] == 10
-        assert exc.details["max_score"] == 990
-    
-    def test_invalid_word_count_error(self):
-        """測試無效字數異常"""
-        exc = InvalidWordCountError(2000)
-        assert exc.error_code == "INVALID_WORD_COUNT"
-        assert exc.details["word_count"] == 2000
-        assert exc.details["min_count"] == 50
-        assert exc.details["max_count"] == 1500
-    
-    def test_invalid_paragraph_count_error(self):
-        """測試無效段落數異常"""
-        exc = InvalidParagraphCountError(15)
-        assert exc.error_code == "INVALID_PARAGRAPH_COUNT"
-        assert exc.details["paragraph_count"] == 15
-        assert exc.details["min_count"] == 1
-        assert exc.details["max_count"] == 10
-    
-    def test_openai_api_error(self):
-        """測試 OpenAI API 異常"""
-        exc = OpenAIAPIError("Rate limit exceeded")
-        assert exc.error_code == "OPENAI_API_ERROR"
-        assert exc.user_message == "AI 服務暫時無法使用，請稍後再試"
-    
-    def test_generation_timeout_error(self):
-        """測試生成超時異常"""
-        exc = GenerationTimeoutError(30)
-        assert exc.error_code == "GENERATION_TIMEOUT"
-        assert exc.details["timeout_seconds"] == 30
-        assert "30" in exc.user_message
-    
-    def test_template_error(self):
-        """測試模板錯誤異常"""
-        exc = TemplateError("Template not found", template_name="toeic")
-        assert exc.error_code == "TEMPLATE_ERROR"
-        assert exc.details["template_name"] == "toeic"
-        assert exc.user_message == "模板處理錯誤，請聯絡管理員"
-    
-    def test_article_generation_error(self):
-        """測試文章生成異常"""
-        exc = ArticleGenerationError("Generation failed")
-        assert exc.error_code == "ARTICLE_GENERATION_ERROR"
-        assert exc.user_message == "文章生成失敗，請稍後再試"
-    
-    def test_api_error(self):
-        """測試 API 異常"""
-        exc = APIError("Request failed", status_code=422)
-        assert exc.error_code == "API_ERROR"
-        assert exc.details["status_code"] == 422
-        assert exc.user_message == "API 請求處理失敗，請檢查請求參數"
\ No newline at end of file
+    @pytest.mark.parametrize(
+        "exc_class,args,kwargs,error_code,details,user_message,exact",
+        _EXCEPTION_CASES,
+        ids=[case[0].__name__ for case in _EXCEPTION_CASES]
+    )
+    def test_specific_exception(self, exc_class, args, kwargs, error_code, details, user_message, exact):
+        """測試各異常的錯誤代碼、詳細資訊與使用者訊息"""
+        exc = exc_class(*args, **kwargs)
+        assert exc.error_code == error_code
+        for key, value in details.items():
+            assert exc.details[key] == value
+        if exact:
+            assert exc.user_message == user_message
+        elif user_message is not None:
+            assert user_message in exc.user_message
@@ -0,0 +1,75 @@
+"""測試 LLM 回應快取"""
+
+import pytest
+from unittest.mock import patch, Mock, AsyncMock
+from app.services.llm_cache import LLMCache
+from app.services.llm_service import LLMService
+
+
+MESSAGES = [
+    {"role": "system", "content": "You are a writer."},
+    {"role": "user", "content": "Write about travel."}
+]
+
+
+class TestLLMCache:
+    """測試 LLM 回應快取"""
+    
+    @pytest.fixture
+    def cache(self):
+        """測試用快取"""
+        return LLMCache(max_entries=2, ttl=60)
+    
+    def test_nondeterministic_requests_bypass_cache(self):
+        """測試 temperature 大於 0 時不建立快取鍵"""
+        assert LLMCache.cache_key("openai", "gpt-4", MESSAGES, 0.7, 350) is None
+        
+        key = LLMCache.cache_key("openai", "gpt-4", MESSAGES, 0, 350)
+        assert key == LLMCache.cache_key("openai", "gpt-4", list(MESSAGES), 0.0, 350)
+        assert key != LLMCache.cache_key("openai", "gpt-4", MESSAGES, 0, 500)
+    
+    @pytest.mark.asyncio
+    async def test_get_returns_copy(self, cache):
+        """測試命中時返回副本，呼叫端修改不影響快取內容"""
+        await cache.set("key", {"content": "cached", "usage": {"total_tokens": 10}})
+        
+        first = await cache.get("key")
+        first["usage"]["total_tokens"] = 0
+        
+        assert (await cache.get("key"))["usage"]["total_tokens"] == 10
+    
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_ttl(self, cache):
+        """測試超過容量淘汰最久未使用的項目，過期項目不再命中"""
+        await cache.set("a", {"content": "a"})
+        await cache.set("b", {"content": "b"})
+        await cache.get("a")
+        await cache.set("c", {"content": "c"})
+        
+        assert await cache.get("b") is None
+        assert await cache.get("a") is not None
+        
+        with patch("app.services.llm_cache.time.monotonic", return_value=10 ** 9):
+            assert await cache.get("a") is None
+    
+    @pytest.mark.asyncio
+    async def test_deterministic_completion_served_from_cache(self):
+        """測試 temperature 為 0 的重複請求只調用一次提供商"""
+        mock_provider = Mock()
+        mock_provider.model = "gpt-4"
+        mock_provider.generate_completion = AsyncMock(return_value={
+            "content": "Deterministic article",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+            "model": "gpt-4",
+            "provider": "openai"
+        })
+        
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        
+        with patch("app.services.llm_service.llm_cache", LLMCache()):
+            first = await service.generate_completion(prompt="Write about travel.", temperature=0)
+            second = await service.generate_completion(prompt="Write about travel.", temperature=0)
+        
+        assert first == second
+        mock_provider.generate_completion.assert_called_once()
@@ -3,6 +3,11 @@
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 import asyncio
+import json
+from types import SimpleNamespace
+import httpx
+from openai import APITimeoutError, RateLimitError
+from app.core.config import settings
 from app.services.llm_service import LLMService, OpenAIProvider, GeminiProvider
 from app.core.exceptions import (
     LLMServiceError,
@@ -11,140 +16,446 @@ from app.core.exceptions import (
 )
 
 
-class TestOpenAIProvider:
-    """測試 OpenAI 提供商"""
+# 以 pytest -n auto --dist=loadgroup 執行時，純單元測試集中在同一個 worker
+pytestmark = pytest.mark.xdist_group("llm_unit")
+
+
+def _make_completion(*contents, prompt_tokens=0, completion_tokens=0, total_tokens=0):
+    """建立與 SDK 聊天完成回應結構相同的輕量物件，每段內容對應一個候選"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content)) for content in contents],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=total_tokens
+        )
+    )
+
+
+def _stub_create(monkeypatch, completions, result):
+    """以假的 create 取代 SDK 方法並返回呼叫參數列表；result 為例外時改為拋出"""
+    calls = []
+    
+    async def fake_create(**kwargs):
+        calls.append(kwargs)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    
+    monkeypatch.setattr(completions, "create", fake_create)
+    return calls
+
+
+# 各提供商共通行為的測試參數：提供商類別、預設模型、提供商名稱、API 錯誤的例外類別與錯誤碼
+_PROVIDER_CASES = [
+    pytest.param(
+        OpenAIProvider, "gpt-4o-mini-2024-07-18", "openai", OpenAIAPIError, "OPENAI_API_ERROR",
+        id="openai"
+    ),
+    pytest.param(
+        GeminiProvider, "gemini-2.5-flash", "gemini", LLMServiceError, "LLM_SERVICE_ERROR",
+        id="gemini"
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "provider_cls, expected_model, expected_provider, error_cls, error_code", _PROVIDER_CASES
+)
+class TestProviderCommon:
+    """測試 OpenAI 與 Gemini 提供商的共通行為"""
     
-    def test_provider_initialization(self):
+    def test_provider_initialization(
+        self, provider_cls, expected_model, expected_provider, error_cls, error_code
+    ):
         """測試提供商初始化"""
-        provider = OpenAIProvider("test-key", "gpt-4")
-        assert provider.model == "gpt-4"
+        provider = provider_cls("test-key", "custom-model")
+        assert provider.model == "custom-model"
         assert provider.client is not None
     
     @pytest.mark.asyncio
-    async def test_successful_completion(self):
+    async def test_successful_completion(
+        self, monkeypatch, provider_cls, expected_model, expected_provider, error_cls, error_code
+    ):
         """測試成功的文本生成"""
+        provider = provider_cls("test-key")
+        mock_response = _make_completion(
+            "Test article content", prompt_tokens=10, completion_tokens=50, total_tokens=60
+        )
+        
+        calls = _stub_create(monkeypatch, provider.client.chat.completions, mock_response)
+        result = await provider.generate_completion(
+            messages=[{"role": "user", "content": "Generate article"}],
+            max_tokens=100,
+            temperature=0.7
+        )
+        
+        assert result["content"] == "Test article content"
+        assert result["usage"] == {"prompt_tokens": 10, "completion_tokens": 50, "total_tokens": 60}
+        assert result["model"] == expected_model
+        assert result["provider"] == expected_provider
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_api_error_handling(
+        self, monkeypatch, provider_cls, expected_model, expected_provider, error_cls, error_code
+    ):
+        """測試 API 錯誤處理，非暫時性錯誤不重試"""
+        provider = provider_cls("test-key")
+        
+        calls = _stub_create(monkeypatch, provider.client.chat.completions, Exception("API Error"))
+        with pytest.raises(error_cls) as exc_info:
+            await provider.generate_completion(
+                messages=[{"role": "user", "content": "Generate article"}]
+            )
+        
+        assert "API Error" in str(exc_info.value)
+        assert exc_info.value.error_code == error_code
+        assert len(calls) == 1
+
+
+class TestOpenAIProvider:
+    """測試 OpenAI 提供商"""
+    
+    @pytest.mark.asyncio
+    async def test_rate_limit_retried_with_retry_after(self):
+        """測試速率限制錯誤會重試，並依 Retry-After 標頭等待"""
         provider = OpenAIProvider("test-key")
         
-        # Mock OpenAI response
-        mock_response = Mock()
-        mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = "Test article content"
-        mock_response.usage.prompt_tokens = 10
-        mock_response.usage.completion_tokens = 50
-        mock_response.usage.total_tokens = 60
-        
-        with patch.object(provider.client.chat.completions, 'create', 
-                         new_callable=AsyncMock, return_value=mock_response) as mock_create:
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        rate_limit = RateLimitError(
+            "Rate limit reached",
+            response=httpx.Response(429, headers={"retry-after": "2"}, request=request),
+            body=None
+        )
+        mock_response = _make_completion("Recovered")
+        
+        with patch.object(provider.client.chat.completions, 'create', new_callable=AsyncMock,
+                          side_effect=[rate_limit, mock_response]) as mock_create, \
+             patch('app.services.llm_service.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
             result = await provider.generate_completion(
-                messages=[{"role": "user", "content": "Generate article"}],
-                max_tokens=100,
-                temperature=0.7
+                messages=[{"role": "user", "content": "Generate article"}]
             )
-            
-            assert result["content"] == "Test article content"
-            assert result["usage"]["prompt_tokens"] == 10
-            assert result["usage"]["completion_tokens"] == 50
-            assert result["usage"]["total_tokens"] == 60
-            assert result["model"] == "gpt-4o-mini-2024-07-18"
-            assert result["provider"] == "openai"
-            
-            mock_create.assert_called_once()
+        
+        assert result["content"] == "Recovered"
+        assert mock_create.call_count == 2
+        mock_sleep.assert_awaited_once_with(2.0)
     
     @pytest.mark.asyncio
-    async def test_api_error_handling(self):
-        """測試 API 錯誤處理"""
+    async def test_completion_with_multiple_choices(self, monkeypatch):
+        """測試 n 大於 1 時單一請求返回多個候選"""
         provider = OpenAIProvider("test-key")
         
-        with patch.object(provider.client.chat.completions, 'create', side_effect=Exception("API Error")):
-            with pytest.raises(OpenAIAPIError) as exc_info:
-                await provider.generate_completion(
-                    messages=[{"role": "user", "content": "Generate article"}]
-                )
-            
-            assert "API Error" in str(exc_info.value)
-            assert exc_info.value.error_code == "OPENAI_API_ERROR"
-
-
-class TestGeminiProvider:
-    """測試 Gemini 提供商"""
-    
-    def test_provider_initialization(self):
-        """測試 Gemini 提供商初始化"""
-        provider = GeminiProvider("test-key", "gemini-pro")
-        assert provider.model == "gemini-pro"
-        assert provider.client is not None
+        mock_response = _make_completion(
+            "Version A", "Version B", prompt_tokens=10, completion_tokens=100, total_tokens=110
+        )
+        
+        calls = _stub_create(monkeypatch, provider.client.chat.completions, mock_response)
+        result = await provider.generate_completion(
+            messages=[{"role": "user", "content": "Generate article"}],
+            n=2
+        )
+        
+        assert calls[0]["n"] == 2
+        assert result["content"] == "Version A"
+        assert result["variants"] == ["Version A", "Version B"]
     
     @pytest.mark.asyncio
-    async def test_successful_completion(self):
-        """測試成功的文本生成"""
-        provider = GeminiProvider("test-key")
+    async def test_sdk_timeout_is_not_retried(self, monkeypatch):
+        """測試 SDK 超時轉為 GenerationTimeoutError 且不重試"""
+        provider = OpenAIProvider("test-key")
+        timeout_error = APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
         
-        # Mock Gemini response
-        mock_response = Mock()
-        mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = "Test article content"
-        mock_response.usage.prompt_tokens = 15
-        mock_response.usage.completion_tokens = 45
-        mock_response.usage.total_tokens = 60
-        
-        with patch.object(provider.client.chat.completions, 'create', 
-                         new_callable=AsyncMock, return_value=mock_response) as mock_create:
-            result = await provider.generate_completion(
+        calls = _stub_create(monkeypatch, provider.client.chat.completions, timeout_error)
+        with pytest.raises(GenerationTimeoutError):
+            await provider.generate_completion(
                 messages=[{"role": "user", "content": "Generate article"}],
-                max_tokens=100,
-                temperature=0.7
+                timeout=5
             )
-            
-            assert result["content"] == "Test article content"
-            assert result["usage"]["prompt_tokens"] == 15
-            assert result["usage"]["completion_tokens"] == 45
-            assert result["usage"]["total_tokens"] == 60
-            assert result["model"] == "gemini-2.5-flash"
-            assert result["provider"] == "gemini"
-            
-            mock_create.assert_called_once()
+        
+        assert len(calls) == 1
+        assert calls[0]["timeout"] == 5
     
     @pytest.mark.asyncio
-    async def test_api_error_handling(self):
-        """測試 API 錯誤處理"""
-        provider = GeminiProvider("test-key")
-        
-        with patch.object(provider.client.chat.completions, 'create', side_effect=Exception("API Error")):
-            with pytest.raises(LLMServiceError) as exc_info:
-                await provider.generate_completion(
-                    messages=[{"role": "user", "content": "Generate article"}]
-                )
+    async def test_stream_completion(self):
+        """測試串流生成文本"""
+        provider = OpenAIProvider("test-key")
+        
+        def make_chunk(content):
+            chunk = Mock()
+            chunk.choices = [Mock()]
+            chunk.choices[0].delta.content = content
+            return chunk
+        
+        async def fake_stream():
+            for content in ["Hello", None, " world"]:
+                yield make_chunk(content)
+            # include_usage 時最後一個片段不含 choices，只回報用量
+            usage_chunk = Mock()
+            usage_chunk.choices = []
+            usage_chunk.usage.prompt_tokens = 10
+            usage_chunk.usage.completion_tokens = 2
+            usage_chunk.usage.total_tokens = 12
+            yield usage_chunk
+        
+        usage = {}
+        with patch.object(provider.client.chat.completions, 'create',
+                         new_callable=AsyncMock, return_value=fake_stream()) as mock_create:
+            tokens = [token async for token in provider.stream_completion(
+                messages=[{"role": "user", "content": "Generate article"}],
+                usage=usage
+            )]
             
-            assert "API Error" in str(exc_info.value)
-            assert exc_info.value.error_code == "LLM_SERVICE_ERROR"
+            assert tokens == ["Hello", " world"]
+            assert usage == {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+            assert mock_create.call_args.kwargs["stream"] is True
+            assert mock_create.call_args.kwargs["stream_options"] == {"include_usage": True}
+    
+    @pytest.mark.asyncio
+    async def test_generate_batch(self):
+        """測試透過 Batch API 批次生成，結果依輸入順序返回"""
+        provider = OpenAIProvider("test-key")
+        
+        output_lines = [
+            json.dumps({"custom_id": "1", "response": {"status_code": 400, "body": {"error": {"message": "bad"}}}}),
+            json.dumps({"custom_id": "0", "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": "First article"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}
+            }}})
+        ]
+        
+        with patch.object(provider.client.files, 'create', new_callable=AsyncMock,
+                          return_value=Mock(id="file-in")) as mock_upload, \
+             patch.object(provider.client.batches, 'create', new_callable=AsyncMock,
+                          return_value=Mock(id="batch-1", status="validating")), \
+             patch.object(provider.client.batches, 'retrieve', new_callable=AsyncMock,
+                          return_value=Mock(id="batch-1", status="completed",
+                                            output_file_id="file-out", error_file_id=None)), \
+             patch.object(provider.client.files, 'content', new_callable=AsyncMock,
+                          return_value=Mock(content="\n".join(output_lines).encode())), \
+             patch('app.services.llm_service.asyncio.sleep', new_callable=AsyncMock):
+            results = await provider.generate_batch([
+                {"messages": [{"role": "user", "content": "one"}]},
+                {"messages": [{"role": "user", "content": "two"}]}
+            ])
+        
+        assert mock_upload.call_args.kwargs["purpose"] == "batch"
+        assert results[0]["content"] == "First article"
+        assert results[0]["usage"]["total_tokens"] == 30
+        assert isinstance(results[1], OpenAIAPIError)
+    
+    @pytest.mark.asyncio
+    async def test_embed(self):
+        """測試計算嵌入向量"""
+        provider = OpenAIProvider("test-key")
+        
+        mock_response = Mock()
+        mock_response.data = [Mock(embedding=[0.1, 0.2, 0.3])]
+        
+        with patch.object(provider.client.embeddings, 'create',
+                          new_callable=AsyncMock, return_value=mock_response) as mock_create:
+            embedding = await provider.embed("remote work", model="text-embedding-3-small")
+        
+        assert embedding == [0.1, 0.2, 0.3]
+        assert mock_create.call_args.kwargs["model"] == "text-embedding-3-small"
+        assert mock_create.call_args.kwargs["input"] == "remote work"
 
 
 class TestLLMService:
     """測試 LLM 服務"""
     
+    @pytest.fixture(autouse=True)
+    def mock_settings(self, monkeypatch):
+        """以測試用設定取代 LLM 服務讀取的設定，個別測試可直接修改返回的設定"""
+        test_settings = settings.model_copy(update={
+            "generation_timeout": 30,
+            "default_llm_provider": "openai",
+            "openai_api_key": "test-key",
+            "openai_model": "gpt-4",
+            "gemini_api_key": None
+        })
+        monkeypatch.setattr("app.services.llm_service.settings", test_settings)
+        return test_settings
+    
     def test_service_initialization(self):
         """測試服務初始化"""
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            mock_settings.openai_api_key = "test-key"
-            mock_settings.openai_model = "gpt-4"
-            
-            service = LLMService()
-            assert service.timeout == 30
-            assert service.default_provider == "openai"
-            assert len(service.providers) >= 1
+        service = LLMService()
+        assert service.timeout == 30
+        assert service.default_provider == "openai"
+        assert len(service.providers) >= 1
+    
+    @pytest.mark.asyncio
+    async def test_providers_share_http_client(self, mock_settings):
+        """測試所有提供商共用同一個 HTTP 連線池"""
+        mock_settings.gemini_api_key = "test-gemini-key"
+        mock_settings.gemini_model = "gemini-pro"
+        
+        service = LLMService()
+        for provider in service.providers.values():
+            assert provider.client._client is service.http_client
+            assert provider.client.timeout.read == 30
+        
+        await service.aclose()
+        assert service.http_client.is_closed
+    
+    @pytest.mark.asyncio
+    async def test_async_context_manager_closes_http_client(self):
+        """測試以 async with 使用時離開區塊即關閉連線池"""
+        async with LLMService() as service:
+            assert not service.http_client.is_closed
+        assert service.http_client.is_closed
+    
+    @pytest.mark.asyncio
+    async def test_reopens_http_client_after_aclose(self):
+        """測試連線池關閉後，下一次選擇提供商時以新的連線池重建提供商"""
+        service = LLMService()
+        closed_client = service.http_client
+        await service.aclose()
+        
+        _, provider = service._select_provider(None)
+        
+        assert closed_client.is_closed
+        assert not service.http_client.is_closed
+        assert provider.client._client is service.http_client
+        await service.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_generate_articles_batch_requires_openai(self):
+        """測試非 OpenAI 提供商不支援批次生成"""
+        service = LLMService()
+        service.providers = {"gemini": GeminiProvider("test-key")}
+        
+        with pytest.raises(LLMServiceError) as exc_info:
+            await service.generate_articles_batch([], provider="gemini")
+        
+        assert "不支援批次生成" in str(exc_info.value)
+    
+    @pytest.mark.asyncio
+    async def test_multiple_choices_require_openai(self):
+        """測試非 OpenAI 提供商不支援單次生成多個候選"""
+        mock_provider = Mock()
+        mock_provider.generate_completion = AsyncMock()
+        
+        service = LLMService()
+        service.providers = {"gemini": mock_provider}
+        
+        with pytest.raises(LLMServiceError):
+            await service.generate_completion(prompt="Generate article", provider="gemini", n=3)
+        
+        mock_provider.generate_completion.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_warmup_tolerates_provider_failure(self):
+        """測試連線預熱併發執行，單一提供商失敗不影響其他提供商"""
+        healthy = OpenAIProvider("test-key")
+        failing = GeminiProvider("test-key")
+        
+        service = LLMService()
+        service.providers = {"openai": healthy, "gemini": failing}
+        
+        with patch.object(healthy.client.models, 'list', new_callable=AsyncMock) as mock_list, \
+             patch.object(failing.client.models, 'list', new_callable=AsyncMock,
+                          side_effect=Exception("Connection refused")):
+            await service.warmup(timeout=1.0)
+        
+        mock_list.assert_awaited_once_with(timeout=1.0)
     
-    def test_no_providers_available(self):
+    @pytest.mark.asyncio
+    async def test_generate_article_sizes_max_tokens_from_word_count(self):
+        """測試 max_tokens 依目標字數估算"""
+        mock_provider = Mock()
+        mock_provider.generate_completion = AsyncMock(return_value={
+            "content": "Test article",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+            "model": "gpt-4",
+            "provider": "openai"
+        })
+        
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        
+        await service.generate_article(
+            exam_type="TOEIC", topic="Travel", difficulty="Intermediate",
+            word_count=200, provider="openai"
+        )
+        
+        assert mock_provider.generate_completion.call_args.kwargs["max_tokens"] == 350
+    
+    @pytest.mark.asyncio
+    async def test_generate_article_stream_fails_over_and_acquires_rate_limits(self):
+        """測試串流生成在預設提供商斷路器開啟時改用其他提供商，並在返回串流前取用限流器"""
+        async def fake_stream(**kwargs):
+            yield "Streamed"
+        
+        healthy = Mock()
+        healthy.stream_completion = Mock(side_effect=fake_stream)
+        
+        service = LLMService()
+        service.providers = {"openai": Mock(), "gemini": healthy}
+        breaker = service._breaker("openai")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        
+        with patch('app.services.llm_service.llm_rate_limiter.acquire', new_callable=AsyncMock) as rpm, \
+             patch('app.services.llm_service.llm_token_limiter.acquire', new_callable=AsyncMock) as tpm:
+            tokens = await service.generate_article_stream(
+                exam_type="TOEIC", topic="Travel", difficulty="Intermediate", word_count=200
+            )
+            rpm.assert_awaited_once_with()
+            tpm.assert_awaited_once()
+        
+        assert [token async for token in tokens] == ["Streamed"]
+        assert healthy.stream_completion.call_args.kwargs["max_tokens"] == 350
+    
+    @pytest.mark.asyncio
+    async def test_generate_article_stream_records_breaker_outcome(self):
+        """測試串流途中提供商失敗時計入斷路器，成功時重設"""
+        async def failing_stream(**kwargs):
+            yield "partial "
+            raise GenerationTimeoutError(1)
+        
+        async def fake_stream(**kwargs):
+            yield "Streamed"
+        
+        mock_provider = Mock()
+        mock_provider.stream_completion = Mock(side_effect=failing_stream)
+        
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        breaker = service._breaker("openai")
+        
+        tokens = await service.generate_article_stream(
+            exam_type="TOEIC", topic="Travel", difficulty="Intermediate"
+        )
+        with pytest.raises(GenerationTimeoutError):
+            async for _ in tokens:
+                pass
+        assert breaker._failures == 1
+        
+        mock_provider.stream_completion = Mock(side_effect=fake_stream)
+        tokens = await service.generate_article_stream(
+            exam_type="TOEIC", topic="Travel", difficulty="Intermediate"
+        )
+        assert [token async for token in tokens] == ["Streamed"]
+        assert breaker._failures == 0
+    
+    def test_build_messages_reuses_system_message(self):
+        """測試相同系統訊息重用同一個訊息字典"""
+        first = LLMService._build_messages("Topic A", "You are a writer.")
+        second = LLMService._build_messages("Topic B", "You are a writer.")
+        
+        assert first[0] is second[0]
+        assert first[0] == {"role": "system", "content": "You are a writer."}
+        assert second[1] == {"role": "user", "content": "Topic B"}
+        assert LLMService._build_messages("Topic C") == [{"role": "user", "content": "Topic C"}]
+    
+    def test_no_providers_available(self, mock_settings):
         """測試沒有可用提供商時的處理"""
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            mock_settings.openai_api_key = ""
-            mock_settings.gemini_api_key = ""
-            
-            service = LLMService()
-            assert len(service.providers) == 0
+        mock_settings.openai_api_key = ""
+        mock_settings.gemini_api_key = ""
+        
+        service = LLMService()
+        assert len(service.providers) == 0
     
     @pytest.mark.asyncio
     async def test_generate_completion_success(self):
@@ -157,73 +468,92 @@ class TestLLMService:
             "provider": "openai"
         })
         
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            
-            service = LLMService()
-            service.providers = {"openai": mock_provider}
-            
-            result = await service.generate_completion(
-                prompt="Generate article",
-                max_tokens=100,
-                temperature=0.7
-            )
-            
-            assert result["content"] == "Test article"
-            assert result["usage"]["total_tokens"] == 30
-            mock_provider.generate_completion.assert_called_once()
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        
+        result = await service.generate_completion(
+            prompt="Generate article",
+            max_tokens=100,
+            temperature=0.7
+        )
+        
+        assert result["content"] == "Test article"
+        assert result["usage"]["total_tokens"] == 30
+        mock_provider.generate_completion.assert_called_once()
     
     @pytest.mark.asyncio
-    async def test_generate_completion_no_providers(self):
-        """測試沒有可用提供商時的錯誤處理"""
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            
-            service = LLMService()
-            service.providers = {}
-            
-            with pytest.raises(LLMServiceError) as exc_info:
-                await service.generate_completion(prompt="Generate article")
-            
-            assert "沒有可用的 LLM 提供商" in str(exc_info.value)
+    async def test_generate_completion_acquires_rate_limits(self):
+        """測試即時生成在呼叫提供商前取用 RPM 與 TPM 限流器"""
+        mock_provider = Mock()
+        mock_provider.generate_completion = AsyncMock(return_value={"content": "Test article"})
+        
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        
+        with patch('app.services.llm_service.llm_rate_limiter.acquire', new_callable=AsyncMock) as rpm, \
+             patch('app.services.llm_service.llm_token_limiter.acquire', new_callable=AsyncMock) as tpm:
+            await service.generate_completion(prompt="Generate article", max_tokens=100)
+        
+        rpm.assert_awaited_once_with()
+        tpm.assert_awaited_once_with(104)
+    
+    def test_generate_completion_no_providers(self):
+        """測試沒有可用提供商時的錯誤處理（在第一個 await 之前即拋出，不需 asyncio 標記）"""
+        service = LLMService()
+        service.providers = {}
+        
+        with pytest.raises(LLMServiceError) as exc_info:
+            asyncio.run(service.generate_completion(prompt="Generate article"))
+        
+        assert "沒有可用的 LLM 提供商" in str(exc_info.value)
     
     @pytest.mark.asyncio
-    async def test_generate_completion_timeout(self):
+    async def test_generate_completion_timeout(self, mock_settings):
         """測試請求超時處理"""
         mock_provider = Mock()
-        mock_provider.generate_completion = AsyncMock(side_effect=asyncio.TimeoutError())
+        mock_provider.generate_completion = AsyncMock(side_effect=GenerationTimeoutError(1))
         
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 1
-            mock_settings.default_llm_provider = "openai"
-            
-            service = LLMService()
-            service.providers = {"openai": mock_provider}
-            
-            with pytest.raises(GenerationTimeoutError) as exc_info:
-                await service.generate_completion(prompt="Generate article")
-            
-            assert exc_info.value.error_code == "GENERATION_TIMEOUT"
+        mock_settings.generation_timeout = 1
+        
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        
+        with pytest.raises(GenerationTimeoutError) as exc_info:
+            await service.generate_completion(prompt="Generate article")
+        
+        assert exc_info.value.error_code == "GENERATION_TIMEOUT"
+        assert mock_provider.generate_completion.call_args.kwargs["timeout"] == 1
     
     @pytest.mark.asyncio
-    async def test_generate_completion_provider_not_available(self):
-        """測試指定的提供商不可用"""
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            
+    async def test_generate_completion_overall_deadline(self, mock_settings):
+        """測試傳輸層未觸發超時時，整體時限仍會取消呼叫"""
+        async def hanging_completion(**kwargs):
+            await asyncio.sleep(10)
+        
+        mock_provider = Mock()
+        mock_provider.generate_completion = hanging_completion
+        
+        mock_settings.generation_timeout = 0.05
+        
+        with patch('app.services.llm_service._TIMEOUT_GRACE', 0):
             service = LLMService()
-            service.providers = {"openai": Mock()}
-            
-            with pytest.raises(LLMServiceError) as exc_info:
-                await service.generate_completion(
-                    prompt="Generate article",
-                    provider="gemini"
-                )
+            service.providers = {"openai": mock_provider}
             
-            assert "提供商 'gemini' 不可用" in str(exc_info.value)
+            with pytest.raises(GenerationTimeoutError):
+                await asyncio.wait_for(service.generate_completion(prompt="Generate article"), timeout=1)
+    
+    def test_generate_completion_provider_not_available(self):
+        """測試指定的提供商不可用（在第一個 await 之前即拋出，不需 asyncio 標記）"""
+        service = LLMService()
+        service.providers = {"openai": object()}
+        
+        with pytest.raises(LLMServiceError) as exc_info:
+            asyncio.run(service.generate_completion(
+                prompt="Generate article",
+                provider="gemini"
+            ))
+        
+        assert "提供商 'gemini' 不可用" in str(exc_info.value)
     
     @pytest.mark.asyncio
     async def test_generate_completion_empty_response(self):
@@ -236,52 +566,40 @@ class TestLLMService:
             "provider": "openai"
         })
         
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            
-            service = LLMService()
-            service.providers = {"openai": mock_provider}
-            
-            with pytest.raises(LLMServiceError) as exc_info:
-                await service.generate_completion(prompt="Generate article")
-            
-            assert "返回空內容" in str(exc_info.value)
+        service = LLMService()
+        service.providers = {"openai": mock_provider}
+        
+        with pytest.raises(LLMServiceError) as exc_info:
+            await service.generate_completion(prompt="Generate article")
+        
+        assert "返回空內容" in str(exc_info.value)
     
     def test_get_available_providers(self):
         """測試獲取可用提供商"""
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            
-            service = LLMService()
-            service.providers = {"openai": Mock(), "gemini": Mock()}
-            
-            providers = service.get_available_providers()
-            assert "openai" in providers
-            assert "gemini" in providers
+        service = LLMService()
+        service.providers = {"openai": object(), "gemini": object()}
+        
+        providers = service.get_available_providers()
+        assert "openai" in providers
+        assert "gemini" in providers
     
     def test_get_provider_info(self):
         """測試獲取提供商資訊"""
-        with patch('app.services.llm_service.settings') as mock_settings:
-            mock_settings.generation_timeout = 30
-            mock_settings.default_llm_provider = "openai"
-            
-            service = LLMService()
-            
-            openai_provider = OpenAIProvider("test-key", "gpt-4")
-            gemini_provider = GeminiProvider("test-key", "gemini-pro")
-            
-            service.providers = {
-                "openai": openai_provider,
-                "gemini": gemini_provider
-            }
-            
-            info = service.get_provider_info()
-            
-            assert "openai" in info
-            assert "gemini" in info
-            assert info["openai"]["provider"] == "OpenAI"
-            assert info["openai"]["model"] == "gpt-4"
-            assert info["gemini"]["provider"] == "Google Gemini"
-            assert info["gemini"]["model"] == "gemini-pro"
\ No newline at end of file
+        service = LLMService()
+        
+        openai_provider = OpenAIProvider("test-key", "gpt-4")
+        gemini_provider = GeminiProvider("test-key", "gemini-pro")
+        
+        service.providers = {
+            "openai": openai_provider,
+            "gemini": gemini_provider
+        }
+        
+        info = service.get_provider_info()
+        
+        assert "openai" in info
+        assert "gemini" in info
+        assert info["openai"]["provider"] == "OpenAI"
+        assert info["openai"]["model"] == "gpt-4"
+        assert info["gemini"]["provider"] == "Google Gemini"
+        assert info["gemini"]["model"] == "gemini-pro"
@@ -1,25 +1,82 @@
 """Phase 2 功能測試"""
 
+from unittest.mock import patch
+
+import orjson
 import pytest
-import pytest_asyncio
 from fastapi.testclient import TestClient
-from main import app
 
+from app.core.config import settings
+from app.core.exam_configs import EXAM_CONFIG_PATH, load_exam_configs
+
+
+# 以 pytest -n auto --dist=loadgroup 執行時，需要 FastAPI 應用程式的測試集中在同一個 worker
+pytestmark = pytest.mark.xdist_group("api_integration")
+
+
+# 考試配置文件在模組載入時解析一次，供各配置測試共用
+_EXAM_CONFIGS = load_exam_configs()
+_EXAM_TYPES = ["TOEIC", "GRE", "IELTS", "SAT"]
+_EXAM_TYPE_SET = frozenset(_EXAM_TYPES)
 
-@pytest.fixture
-def client():
-    """同步測試客戶端"""
-    return TestClient(app)
+# 各考試類型詳細資訊端點的路徑
+_EXAM_INFO_URLS = {exam_type: f"/api/v1/exam-types/{exam_type}" for exam_type in _EXAM_TYPES}
+
+# 模板端點中每種考試類型必須提供的欄位
+_TEMPLATE_KEYS = frozenset({"topics", "difficulties", "styles"})
+
+# 考試類型詳細資訊端點的回應欄位，以及各考試類型預期包含的內容
+_EXAM_TYPE_INFO_KEYS = frozenset({
+    "exam_type", "full_name", "description",
+    "supported_difficulties", "writing_styles", "common_topics"
+})
+_EXAM_TYPE_INFO_CASES = [
+    ("TOEIC", {"exam_type": "TOEIC"}),
+    (
+        "GRE",
+        {
+            "exam_type": "GRE",
+            "full_name": "Graduate Record Examinations",
+            "common_topics": ["Philosophy", "Psychology", "Social Sciences",
+                              "Natural Sciences", "History", "Literature", "Politics", "Art"],
+            "supported_difficulties": ["130", "140", "150", "160", "170"]
+        }
+    ),
+    ("IELTS", {"exam_type": "IELTS"}),
+    (
+        "SAT",
+        {
+            "exam_type": "SAT",
+            "full_name": "Scholastic Assessment Test",
+            "common_topics": ["U.S. History", "Social Studies", "Literature Reading",
+                              "Science (Biology, Chemistry, Physics)", "Math Vocabulary",
+                              "Writing and Analysis"],
+            "supported_difficulties": ["400", "600", "800", "1000", "1200", "1400", "1600"]
+        }
+    ),
+]
 
 
 class TestPhase2Features:
     """Phase 2 新功能測試"""
     
+    def test_lifespan_runs_repeatedly_in_one_process(self, app):
+        """測試同一進程中多次啟動與關閉後，日誌監聽器仍持續寫出日誌"""
+        from main import log_listener
+        
+        with patch.object(settings, "warmup_enabled", False):
+            for _ in range(2):
+                with TestClient(app):
+                    pass
+        
+        assert log_listener._thread is not None
+        assert log_listener._thread.is_alive()
+    
     def test_health_check(self, client):
         """測試健康檢查端點"""
         response = client.get("/health")
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
         assert data["status"] == "healthy"
         assert "app_name" in data
         assert "version" in data
@@ -28,7 +85,7 @@ class TestPhase2Features:
         """測試 LLM 提供商端點"""
         response = client.get("/api/v1/providers")
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
         
         assert "available_providers" in data
         assert "provider_info" in data
@@ -40,92 +97,44 @@ class TestPhase2Features:
         """測試考試類型端點 - 確認四種考試類型支援"""
         response = client.get("/api/v1/exam-types")
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
         
-        expected_types = ["TOEIC", "GRE", "IELTS", "SAT"]
         assert "exam_types" in data
-        assert set(data["exam_types"]) == set(expected_types)
+        assert set(data["exam_types"]) == _EXAM_TYPE_SET
         assert len(data["exam_types"]) == 4
     
     def test_templates_endpoint(self, client):
         """測試動態模板端點"""
         response = client.get("/api/v1/templates")
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
         
         assert "available_templates" in data
         assert "supported_exam_types" in data
         
         # 驗證所有四種考試類型都有模板配置
         templates = data["available_templates"]
-        expected_types = ["TOEIC", "GRE", "IELTS", "SAT"]
+        assert _EXAM_TYPE_SET <= templates.keys()
         
-        for exam_type in expected_types:
-            assert exam_type in templates
-            assert "topics" in templates[exam_type]
-            assert "difficulties" in templates[exam_type]
-            assert "styles" in templates[exam_type]
+        for exam_type in _EXAM_TYPES:
+            assert _TEMPLATE_KEYS <= templates[exam_type].keys()
             assert len(templates[exam_type]["topics"]) > 0
     
-    def test_exam_type_info_endpoints(self, client):
-        """測試各考試類型詳細資訊端點"""
-        exam_types = ["TOEIC", "GRE", "IELTS", "SAT"]
-        
-        for exam_type in exam_types:
-            response = client.get(f"/api/v1/exam-types/{exam_type}")
-            assert response.status_code == 200
-            data = response.json()
-            
-            assert data["exam_type"] == exam_type
-            assert "full_name" in data
-            assert "description" in data
-            assert "supported_difficulties" in data
-            assert "writing_styles" in data
-            assert "common_topics" in data
-    
-    def test_gre_specific_config(self, client):
-        """測試 GRE 考試類型特定配置"""
-        response = client.get("/api/v1/exam-types/GRE")
-        assert response.status_code == 200
-        data = response.json()
-        
-        # 驗證 GRE 特定配置
-        assert data["exam_type"] == "GRE"
-        assert data["full_name"] == "Graduate Record Examinations"
-        
-        # 驗證 GRE 主題
-        expected_topics = ["Philosophy", "Psychology", "Social Sciences", 
-                          "Natural Sciences", "History", "Literature", "Politics", "Art"]
-        assert all(topic in data["common_topics"] for topic in expected_topics)
-        
-        # 驗證 GRE 難度等級
-        expected_difficulties = ["130", "140", "150", "160", "170"]
-        assert all(diff in data["supported_difficulties"] for diff in expected_difficulties)
-    
-    def test_sat_specific_config(self, client):
-        """測試 SAT 考試類型特定配置"""
-        response = client.get("/api/v1/exam-types/SAT")
+    @pytest.mark.parametrize("exam_type, expected", _EXAM_TYPE_INFO_CASES)
+    def test_exam_type_info_endpoints(self, client, exam_type, expected):
+        """測試各考試類型詳細資訊端點，GRE 與 SAT 另外驗證主題與難度等級"""
+        response = client.get(_EXAM_INFO_URLS[exam_type])
         assert response.status_code == 200
-        data = response.json()
-        
-        # 驗證 SAT 特定配置
-        assert data["exam_type"] == "SAT"
-        assert data["full_name"] == "Scholastic Assessment Test"
-        
-        # 驗證 SAT 主題
-        expected_topics = ["U.S. History", "Social Studies", "Literature Reading",
-                          "Science (Biology, Chemistry, Physics)", "Math Vocabulary", "Writing and Analysis"]
-        assert all(topic in data["common_topics"] for topic in expected_topics)
+        data = orjson.loads(response.content)
         
-        # 驗證 SAT 難度等級
-        expected_difficulties = ["400", "600", "800", "1000", "1200", "1400", "1600"]
-        assert all(diff in data["supported_difficulties"] for diff in expected_difficulties)
+        assert data.keys() == _EXAM_TYPE_INFO_KEYS
+        assert expected.items() <= data.items()
     
     def test_invalid_exam_type(self, client):
         """測試無效考試類型處理"""
         response = client.get("/api/v1/exam-types/INVALID")
         assert response.status_code == 400
-        data = response.json()
+        data = orjson.loads(response.content)
         assert "error" in data
 
 
@@ -186,39 +195,90 @@ class TestArticleGeneration:
         assert response.status_code == 422
 
 
+class TestDynamicTemplate:
+    """動態模板測試"""
+    
+    def test_system_message_is_shared_prefix(self):
+        """測試系統訊息不含請求內容，相同考試類型共用同一前綴"""
+        from app.services.template_service import template_service
+        
+        first = template_service.build_dynamic_template(
+            "TOEIC", "Business Meetings", "Intermediate", 200, style="formal"
+        )
+        second = template_service.build_dynamic_template(
+            "TOEIC", "Travel", "Advanced", 300, paragraph_count=4,
+            focus_points=["airport", "hotel"]
+        )
+        
+        assert first["system_message"] == second["system_message"]
+        assert first["cache_key"] == second["cache_key"] == "exam:TOEIC"
+        assert "Business Meetings" not in first["system_message"]
+        assert "Business Meetings" in first["user_prompt"]
+        assert "formal" in first["user_prompt"]
+        assert "airport" in second["user_prompt"]
+        assert "4 clear paragraphs" in second["user_prompt"]
+    
+    def test_system_messages_share_common_prefix(self):
+        """測試不同考試類型的系統訊息以相同的固定內容開頭"""
+        from app.services.template_service import template_service, _SHARED_SYSTEM_PREFIX
+        
+        for exam_type in ["TOEIC", "GRE", "IELTS", "SAT"]:
+            template = template_service.build_dynamic_template(exam_type, "History", "Advanced", 300)
+            assert template["system_message"].startswith(_SHARED_SYSTEM_PREFIX)
+            assert exam_type not in _SHARED_SYSTEM_PREFIX
+    
+    def test_user_prompt_starts_with_fixed_header(self):
+        """測試使用者訊息以固定開頭起始，請求參數只出現在任務分隔標記之後"""
+        from app.services.template_service import template_service, _USER_PROMPT_HEADER, _TASK_DELIMITER
+        
+        template = template_service.build_dynamic_template(
+            "GRE", "Climate Policy", "Advanced", 400, style="argumentative",
+            focus_points=["carbon tax"]
+        )
+        
+        assert template["user_prompt"].startswith(_USER_PROMPT_HEADER)
+        header, task = template["user_prompt"].split(_TASK_DELIMITER)
+        assert "Climate Policy" not in header
+        assert "Climate Policy" in task and "carbon tax" in task
+    
+    def test_user_prompt_is_reused_for_same_parameters(self):
+        """測試相同參數重用已建立的使用者訊息"""
+        from app.services.template_service import template_service
+        
+        first = template_service.build_dynamic_template(
+            "SAT", "Space Exploration", "Advanced", 350, focus_points=["Mars", "budget"]
+        )
+        second = template_service.build_dynamic_template(
+            "SAT", "Space Exploration", "Advanced", 350, focus_points=["Mars", "budget"]
+        )
+        
+        assert first["user_prompt"] is second["user_prompt"]
+
+
 class TestConfigurationValidation:
     """配置驗證測試"""
     
     def test_exam_configs_file_exists(self):
         """測試考試配置文件存在"""
-        import os
-        assert os.path.exists("configs/exam_configs.json")
+        assert EXAM_CONFIG_PATH.exists()
     
     def test_exam_configs_content(self):
-        """測試考試配置文件內容"""
-        import json
-        
-        with open("configs/exam_configs.json", "r", encoding="utf-8") as f:
-            configs = json.load(f)
-        
-        assert "exam_types" in configs
-        exam_types = configs["exam_types"]
-        
-        # 驗證所有四種考試類型存在
-        expected_types = ["TOEIC", "GRE", "IELTS", "SAT"]
-        assert all(exam_type in exam_types for exam_type in expected_types)
-        
-        # 驗證每種考試類型的配置完整性
-        for exam_type, config in exam_types.items():
-            assert "name" in config
-            assert "full_name" in config
-            assert "description" in config
-            assert "supported_difficulties" in config
-            assert "default_word_count" in config
-            assert "common_topics" in config
-            assert "writing_styles" in config
-            assert "validation_rules" in config
-            assert "score_range" in config
+        """測試考試配置文件包含所有四種考試類型"""
+        assert _EXAM_TYPE_SET <= _EXAM_CONFIGS["exam_types"].keys()
+    
+    @pytest.mark.parametrize("exam_type", _EXAM_TYPES)
+    def test_exam_type_config_complete(self, exam_type):
+        """測試每種考試類型的配置完整性"""
+        config = _EXAM_CONFIGS["exam_types"][exam_type]
+        assert "name" in config
+        assert "full_name" in config
+        assert "description" in config
+        assert "supported_difficulties" in config
+        assert "default_word_count" in config
+        assert "common_topics" in config
+        assert "writing_styles" in config
+        assert "validation_rules" in config
+        assert "score_range" in config
 
 
 if __name__ == "__main__":
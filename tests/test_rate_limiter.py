@@ -0,0 +1,54 @@
+"""測試請求速率限制"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.utils.rate_limiter import AsyncRateLimiter
+
+
+class TestAsyncRateLimiter:
+    """測試權杖桶限流器"""
+
+    @pytest.mark.asyncio
+    async def test_disabled_limiter_never_waits(self):
+        """測試上限為 0 時不限制"""
+        limiter = AsyncRateLimiter(0)
+
+        with patch('app.utils.rate_limiter.asyncio.sleep') as mock_sleep:
+            for _ in range(100):
+                await limiter.acquire()
+
+        assert not limiter.enabled
+        mock_sleep.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_waits_when_bucket_is_empty(self):
+        """測試權杖用完後需等待補充"""
+        limiter = AsyncRateLimiter(2, period=0.1)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        async with limiter:
+            pass
+        async with limiter:
+            pass
+        assert loop.time() - start < 0.04
+
+        await limiter.acquire()
+        assert loop.time() - start >= 0.04
+
+    @pytest.mark.asyncio
+    async def test_token_amount_is_capped_at_capacity(self):
+        """測試單次取用超過桶容量時以桶容量計，不會永遠等待"""
+        limiter = AsyncRateLimiter(100, period=0.1)
+
+        await asyncio.wait_for(limiter.acquire(1000), timeout=1)
+        assert limiter._tokens == 0
+
+    def test_estimate_request_tokens(self):
+        """測試 TPM 預估包含 prompt 與所有候選的輸出上限"""
+        from app.services.llm_service import _estimate_request_tokens
+
+        messages = [{"role": "system", "content": "a" * 400}, {"role": "user", "content": "b" * 40}]
+        assert _estimate_request_tokens(messages, max_tokens=300) == 410
+        assert _estimate_request_tokens(messages, max_tokens=300, n=2) == 710
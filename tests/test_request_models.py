@@ -0,0 +1,54 @@
+"""測試請求數據模型"""
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.request import ArticleGenerationRequest, BatchArticleGenerationRequest
+
+
+_VALID_REQUEST = {
+    "exam_type": "TOEIC",
+    "topic": "Business Meetings",
+    "difficulty": "Intermediate",
+    "word_count": 200,
+    "paragraph_count": 3
+}
+
+
+class TestArticleGenerationRequest:
+    """測試文章生成請求模型，直接驗證而不經過 HTTP 層"""
+    
+    def test_valid_request(self):
+        """測試有效請求與欄位正規化"""
+        request = ArticleGenerationRequest(**{
+            **_VALID_REQUEST,
+            "exam_type": "toeic",
+            "topic": "  Business Meetings  ",
+            "focus_points": ["agenda", ""]
+        })
+        assert request.exam_type == "TOEIC"
+        assert request.topic == "Business Meetings"
+        assert request.focus_points == ["agenda"]
+    
+    @pytest.mark.parametrize(
+        "request_data,field",
+        [
+            ({**_VALID_REQUEST, "exam_type": "INVALID"}, "exam_type"),
+            ({"exam_type": "TOEIC"}, "topic"),
+            ({**_VALID_REQUEST, "word_count": 2000}, "word_count"),
+            ({**_VALID_REQUEST, "paragraph_count": 15}, "paragraph_count"),
+            ({**_VALID_REQUEST, "topic": "A" * 1000}, "topic")
+        ],
+        ids=["invalid_exam_type", "missing_fields", "word_count", "paragraph_count", "long_topic"]
+    )
+    def test_invalid_request(self, request_data, field):
+        """測試無效請求的驗證錯誤指向對應欄位"""
+        with pytest.raises(ValidationError) as exc_info:
+            ArticleGenerationRequest(**request_data)
+        assert field in {error["loc"][0] for error in exc_info.value.errors()}
+    
+    def test_empty_batch(self):
+        """測試空的批量請求"""
+        with pytest.raises(ValidationError) as exc_info:
+            BatchArticleGenerationRequest(requests=[])
+        assert exc_info.value.errors()[0]["loc"] == ("requests",)
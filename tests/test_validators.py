@@ -1,9 +1,7 @@
 """測試驗證器"""
 
 import pytest
-from unittest.mock import patch, mock_open, Mock
 import json
-import os
 from app.utils.validators import ExamConfigValidator
 from app.core.exceptions import ValidationError, ExamTypeNotSupportedError
 
@@ -11,7 +9,7 @@ from app.core.exceptions import ValidationError, ExamTypeNotSupportedError
 class TestExamConfigValidator:
     """測試考試配置驗證器"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def mock_exam_config(self):
         """模擬考試配置"""
         return {
@@ -54,33 +52,38 @@ class TestExamConfigValidator:
         }
     
     @pytest.fixture
+    def config_path(self, tmp_path, monkeypatch):
+        """將驗證器讀取的配置文件指向暫存目錄中的檔案，測試自行寫入內容"""
+        path = tmp_path / "exam_configs.json"
+        monkeypatch.setattr("app.utils.validators.EXAM_CONFIG_PATH", path)
+        return path
+    
+    @pytest.fixture(scope="module")
     def validator_with_config(self, mock_exam_config):
-        """創建帶有模擬配置的驗證器"""
-        mock_config_content = json.dumps(mock_exam_config)
-        with patch("builtins.open", mock_open(read_data=mock_config_content)):
-            validator = ExamConfigValidator()
-            return validator
-    
-    def test_validator_initialization(self, validator_with_config):
-        """測試驗證器初始化"""
-        assert validator_with_config.exam_configs is not None
-        assert "exam_types" in validator_with_config.exam_configs
-        assert "TOEIC" in validator_with_config.exam_configs["exam_types"]
-        assert "GRE" in validator_with_config.exam_configs["exam_types"]
-    
-    def test_load_exam_configs_file_not_found(self):
+        """創建帶有模擬配置的驗證器（直接傳入配置，不經過文件解析）"""
+        return ExamConfigValidator(mock_exam_config)
+    
+    def test_validator_initialization(self, mock_exam_config, config_path):
+        """測試驗證器從配置文件初始化"""
+        config_path.write_text(json.dumps(mock_exam_config), encoding="utf-8")
+        validator = ExamConfigValidator()
+        assert validator.exam_configs is not None
+        assert "exam_types" in validator.exam_configs
+        assert "TOEIC" in validator.exam_configs["exam_types"]
+        assert "GRE" in validator.exam_configs["exam_types"]
+    
+    def test_load_exam_configs_file_not_found(self, config_path):
         """測試配置文件不存在"""
-        with patch("builtins.open", side_effect=FileNotFoundError()):
-            with pytest.raises(ValidationError) as exc_info:
-                ExamConfigValidator()
-            assert "考試配置文件不存在" in str(exc_info.value)
+        with pytest.raises(ValidationError) as exc_info:
+            ExamConfigValidator()
+        assert "考試配置文件不存在" in str(exc_info.value)
     
-    def test_load_exam_configs_json_error(self):
+    def test_load_exam_configs_json_error(self, config_path):
         """測試配置文件格式錯誤"""
-        with patch("builtins.open", mock_open(read_data="invalid json")):
-            with pytest.raises(ValidationError) as exc_info:
-                ExamConfigValidator()
-            assert "考試配置文件格式錯誤" in str(exc_info.value)
+        config_path.write_text("invalid json", encoding="utf-8")
+        with pytest.raises(ValidationError) as exc_info:
+            ExamConfigValidator()
+        assert "考試配置文件格式錯誤" in str(exc_info.value)
     
     def test_validate_exam_type_success(self, validator_with_config):
         """測試有效考試類型驗證"""
@@ -198,13 +201,47 @@ class TestExamConfigValidator:
         with pytest.raises(ValidationError):
             validator_with_config.get_default_word_count("TOEIC", "超級")
     
+    def test_resolve_applies_defaults(self, validator_with_config):
+        """測試一次驗證所有參數並套用預設值"""
+        resolved = validator_with_config.resolve("TOEIC", "Business Meeting", "高級", style="formal")
+        
+        assert resolved.word_count == 300
+        assert resolved.paragraph_count == 3
+        assert resolved.style == "formal"
+        assert resolved.exam_info is validator_with_config.exam_configs["exam_types"]["TOEIC"]
+    
+    def test_resolve_invalid_parameters(self, validator_with_config):
+        """測試整合驗證沿用各項驗證的錯誤"""
+        with pytest.raises(ExamTypeNotSupportedError):
+            validator_with_config.resolve("UNKNOWN", "Business Meeting", "中級")
+        
+        with pytest.raises(ValidationError) as exc_info:
+            validator_with_config.resolve("TOEIC", "Business Meeting", "中級", paragraph_count=11)
+        assert "段落數" in str(exc_info.value)
+        
+        with pytest.raises(ValidationError):
+            validator_with_config.resolve("TOEIC", "Business Meeting", "中級", style="casual")
+    
     def test_config_path_construction(self):
         """測試配置文件路徑構造"""
-        with patch("builtins.open", mock_open(read_data='{"exam_types": {}}')):
-            validator = ExamConfigValidator()
-            # 檢查路徑是否正確構造
-            assert validator.config_path.endswith("exam_configs.json")
-            assert "configs" in validator.config_path
+        validator = ExamConfigValidator()
+        # 檢查路徑是否正確構造
+        assert validator.config_path.endswith("exam_configs.json")
+        assert "configs" in validator.config_path
+    
+    def test_global_instances_share_exam_configs(self):
+        """測試全域驗證器與模板服務共用同一份考試配置"""
+        from app.core.exam_configs import get_exam_configs
+        from app.services.template_service import template_service
+        from app.utils.validators import validator
+        
+        assert validator.exam_configs is get_exam_configs()
+        assert template_service.exam_configs is get_exam_configs()
+    
+    def test_validator_with_injected_configs(self, mock_exam_config, config_path):
+        """測試傳入考試配置時不讀取配置文件（配置文件不存在也不影響）"""
+        validator = ExamConfigValidator(mock_exam_config)
+        assert validator.validate_difficulty("GRE", "中") == True
     
     def test_edge_cases_whitespace_topic(self, validator_with_config):
         """測試主題空白字符處理"""